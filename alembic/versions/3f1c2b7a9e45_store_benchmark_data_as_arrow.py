@@ -0,0 +1,113 @@
+"""Store benchmark data as compressed Arrow IPC instead of a JSON text blob
+
+Revision ID: 3f1c2b7a9e45
+Revises: d9aa93d703e0
+Create Date: 2026-10-18 10:02:11.412907
+
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Union
+
+from alembic import op
+import pyarrow as pa
+import pyarrow.compute as pc
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2b7a9e45'
+down_revision: Union[str, None] = 'd9aa93d703e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+reports = sa.table(
+    'benchmark_reports',
+    sa.column('id', sa.Integer()),
+    sa.column('benchmark_data_json', sa.Text()),
+    sa.column('benchmark_data_arrow', sa.LargeBinary()),
+)
+
+
+# Vaste kopie van de opslag in app/report_storage.py zoals bij deze revisie, zodat
+# latere wijzigingen daar deze migratie niet veranderen.
+def _normalize_date(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+
+def encode_report_rows(rows: List[Dict[str, Any]]) -> bytes:
+    if rows and any("date" in row for row in rows):
+        rows = [{**row, "date": _normalize_date(row.get("date"))} for row in rows]
+    table = pa.Table.from_pylist(rows)
+
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(i, field.name, pc.dictionary_encode(table.column(i)))
+
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_report_rows(data: bytes) -> List[Dict[str, Any]]:
+    table = pa.ipc.open_file(pa.py_buffer(data)).read_all()
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    rows = table.to_pylist()
+    for row in rows:
+        if isinstance(row.get("date"), datetime):
+            row["date"] = row["date"].isoformat()
+    return rows
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('benchmark_reports') as batch_op:
+        batch_op.add_column(sa.Column('benchmark_data_arrow', sa.LargeBinary(), nullable=True))
+
+    conn = op.get_bind()
+    report_ids = [row.id for row in conn.execute(
+        sa.select(reports.c.id).where(reports.c.benchmark_data_json.isnot(None))
+    )]
+    for report_id in report_ids:
+        data_json = conn.execute(
+            sa.select(reports.c.benchmark_data_json).where(reports.c.id == report_id)
+        ).scalar()
+        try:
+            rows = json.loads(data_json)
+            encoded = encode_report_rows(rows)
+        except Exception as e:
+            print(f"Rapport {report_id} niet geconverteerd, JSON blijft behouden: {e}")
+            continue
+        conn.execute(
+            reports.update().where(reports.c.id == report_id)
+            .values(benchmark_data_arrow=encoded, benchmark_data_json=None)
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    report_ids = [row.id for row in conn.execute(
+        sa.select(reports.c.id).where(reports.c.benchmark_data_arrow.isnot(None))
+    )]
+    for report_id in report_ids:
+        data_arrow = conn.execute(
+            sa.select(reports.c.benchmark_data_arrow).where(reports.c.id == report_id)
+        ).scalar()
+        conn.execute(
+            reports.update().where(reports.c.id == report_id)
+            .values(benchmark_data_json=json.dumps(decode_report_rows(data_arrow)))
+        )
+
+    with op.batch_alter_table('benchmark_reports') as batch_op:
+        batch_op.drop_column('benchmark_data_arrow')
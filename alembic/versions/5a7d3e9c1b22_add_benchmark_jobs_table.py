@@ -0,0 +1,43 @@
+"""Add benchmark_jobs table for queued benchmark generation
+
+Revision ID: 5a7d3e9c1b22
+Revises: 8b2e4d61c0f7
+Create Date: 2026-10-18 13:05:48.220519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7d3e9c1b22'
+down_revision: Union[str, None] = '8b2e4d61c0f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('benchmark_jobs',
+    sa.Column('job_id', sa.String(), nullable=False),
+    sa.Column('user_email', sa.String(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('report_uuid', sa.String(), nullable=True),
+    sa.Column('is_update', sa.Boolean(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('progress_json', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_index(op.f('ix_benchmark_jobs_user_email'), 'benchmark_jobs', ['user_email'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_benchmark_jobs_user_email'), table_name='benchmark_jobs')
+    op.drop_table('benchmark_jobs')
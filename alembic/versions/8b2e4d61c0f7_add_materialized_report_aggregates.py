@@ -0,0 +1,39 @@
+"""Add materialized report aggregates
+
+Revision ID: 8b2e4d61c0f7
+Revises: 3f1c2b7a9e45
+Create Date: 2026-10-18 11:24:37.051236
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d61c0f7'
+down_revision: Union[str, None] = '3f1c2b7a9e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bestaande rapporten krijgen hun aggregaten bij de eerste weergave.
+    with op.batch_alter_table('benchmark_reports') as batch_op:
+        batch_op.add_column(sa.Column('kpis_json', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('trend_data_json', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('dimension_data_json', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('period_start', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('period_end', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('benchmark_reports') as batch_op:
+        batch_op.drop_column('period_end')
+        batch_op.drop_column('period_start')
+        batch_op.drop_column('dimension_data_json')
+        batch_op.drop_column('trend_data_json')
+        batch_op.drop_column('kpis_json')
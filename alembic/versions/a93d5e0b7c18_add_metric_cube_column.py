@@ -0,0 +1,31 @@
+"""Add per-property metric cube column to benchmark_reports
+
+Revision ID: a93d5e0b7c18
+Revises: f2c6a8d41e57
+Create Date: 2026-10-18 20:48:03.519622
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93d5e0b7c18'
+down_revision: Union[str, None] = 'f2c6a8d41e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bestaande rapporten krijgen een cube bij de volgende volledige generatie.
+    with op.batch_alter_table('benchmark_reports') as batch_op:
+        batch_op.add_column(sa.Column('metric_cube_arrow', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('benchmark_reports') as batch_op:
+        batch_op.drop_column('metric_cube_arrow')
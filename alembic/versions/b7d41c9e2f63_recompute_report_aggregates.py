@@ -0,0 +1,40 @@
+"""Recompute materialized report aggregates without the extra division by the number of peers
+
+Revision ID: b7d41c9e2f63
+Revises: a93d5e0b7c18
+Create Date: 2026-10-18 21:12:05.318422
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41c9e2f63'
+down_revision: Union[str, None] = 'a93d5e0b7c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+reports = sa.table(
+    'benchmark_reports',
+    sa.column('kpis_json', sa.Text()),
+    sa.column('trend_data_json', sa.Text()),
+    sa.column('dimension_data_json', sa.Text()),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # De opgeslagen KPI's en grafieken deelden de benchmark nogmaals door het aantal
+    # peers. Leegmaken: elk rapport krijgt ze opnieuw bij de eerste weergave.
+    # period_start/period_end en updated_at blijven staan.
+    op.execute(reports.update().values(kpis_json=None, trend_data_json=None, dimension_data_json=None))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Niets terug te zetten: lege aggregaten worden ook door de oude code aangevuld.
+    pass
@@ -0,0 +1,46 @@
+"""Add rolling window auto-refresh columns and user_credentials table
+
+Revision ID: c4e81f2a6d93
+Revises: 5a7d3e9c1b22
+Create Date: 2026-10-18 14:12:09.630174
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e81f2a6d93'
+down_revision: Union[str, None] = '5a7d3e9c1b22'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('benchmark_reports') as batch_op:
+        batch_op.add_column(sa.Column('rolling_window_days', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('next_refresh_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('auto_refresh_error', sa.Text(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_benchmark_reports_next_refresh_at'), ['next_refresh_at'], unique=False)
+
+    op.create_table('user_credentials',
+    sa.Column('user_email', sa.String(), nullable=False),
+    sa.Column('refresh_token_encrypted', sa.Text(), nullable=False),
+    sa.Column('scopes', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('user_email')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_credentials')
+
+    with op.batch_alter_table('benchmark_reports') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_benchmark_reports_next_refresh_at'))
+        batch_op.drop_column('auto_refresh_error')
+        batch_op.drop_column('next_refresh_at')
+        batch_op.drop_column('rolling_window_days')
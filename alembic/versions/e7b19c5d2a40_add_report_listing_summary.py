@@ -0,0 +1,66 @@
+"""Add row_count summary and owner/updated_at index for the benchmark listing
+
+Revision ID: e7b19c5d2a40
+Revises: c4e81f2a6d93
+Create Date: 2026-10-18 17:31:46.208113
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import pyarrow as pa
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b19c5d2a40'
+down_revision: Union[str, None] = 'c4e81f2a6d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+reports = sa.table(
+    'benchmark_reports',
+    sa.column('id', sa.Integer()),
+    sa.column('row_count', sa.Integer()),
+    sa.column('benchmark_data_json', sa.Text()),
+    sa.column('benchmark_data_arrow', sa.LargeBinary()),
+)
+
+
+def _arrow_row_count(data: bytes) -> int:
+    # Vaste kopie: telt de rijen van het Arrow IPC bestand zonder de data te decoderen.
+    reader = pa.ipc.open_file(pa.py_buffer(data))
+    return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('benchmark_reports') as batch_op:
+        batch_op.add_column(sa.Column('row_count', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_benchmark_reports_owner_updated', ['generated_by_email', 'updated_at', 'id'], unique=False)
+
+    # Eén rapport tegelijk inlezen; updated_at blijft ongewijzigd.
+    conn = op.get_bind()
+    report_ids = [row.id for row in conn.execute(sa.select(reports.c.id))]
+    for report_id in report_ids:
+        data_arrow, data_json = conn.execute(
+            sa.select(reports.c.benchmark_data_arrow, reports.c.benchmark_data_json).where(reports.c.id == report_id)
+        ).one()
+        try:
+            if data_arrow is not None:
+                row_count = _arrow_row_count(data_arrow)
+            else:
+                row_count = len(json.loads(data_json)) if data_json else 0
+        except Exception as e:
+            print(f"Aantal rijen van rapport {report_id} niet bepaald: {e}")
+            continue
+        conn.execute(reports.update().where(reports.c.id == report_id).values(row_count=row_count))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('benchmark_reports') as batch_op:
+        batch_op.drop_index('ix_benchmark_reports_owner_updated')
+        batch_op.drop_column('row_count')
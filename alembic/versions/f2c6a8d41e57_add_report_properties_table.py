@@ -0,0 +1,93 @@
+"""Replace property_ids_used with a normalized report_properties table
+
+Revision ID: f2c6a8d41e57
+Revises: e7b19c5d2a40
+Create Date: 2026-10-18 19:05:22.874310
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a8d41e57'
+down_revision: Union[str, None] = 'e7b19c5d2a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+reports = sa.table(
+    'benchmark_reports',
+    sa.column('id', sa.Integer()),
+    sa.column('client_a_property_id', sa.String()),
+    sa.column('benchmark_property_ids_json', sa.Text()),
+    sa.column('property_ids_used', sa.Text()),
+)
+
+report_properties = sa.table(
+    'report_properties',
+    sa.column('report_id', sa.Integer()),
+    sa.column('property_id', sa.String()),
+    sa.column('role', sa.String()),
+)
+
+
+def _links(row):
+    if row.client_a_property_id or row.benchmark_property_ids_json:
+        client_id = row.client_a_property_id
+        benchmark_ids = json.loads(row.benchmark_property_ids_json) if row.benchmark_property_ids_json else []
+    else:
+        # Zeer oude rapporten hebben alleen de CSV: klant eerst, dan de benchmarks.
+        props = [p for p in (row.property_ids_used or "").split(",") if p]
+        client_id, benchmark_ids = (props[0], props[1:]) if props else (None, [])
+    links = [(client_id, "client")] if client_id else []
+    links.extend((prop_id, "benchmark") for prop_id in benchmark_ids)
+    return list(dict.fromkeys(links))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('report_properties',
+    sa.Column('report_id', sa.Integer(), nullable=False),
+    sa.Column('property_id', sa.String(), nullable=False),
+    sa.Column('role', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['report_id'], ['benchmark_reports.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('report_id', 'property_id', 'role')
+    )
+    op.create_index('ix_report_properties_property_role', 'report_properties', ['property_id', 'role'], unique=False)
+
+    conn = op.get_bind()
+    for row in conn.execute(sa.select(
+        reports.c.id, reports.c.client_a_property_id, reports.c.benchmark_property_ids_json, reports.c.property_ids_used
+    )).all():
+        try:
+            links = _links(row)
+        except ValueError as e:
+            print(f"Properties van rapport {row.id} niet overgenomen: {e}")
+            continue
+        if links:
+            conn.execute(report_properties.insert(), [
+                {"report_id": row.id, "property_id": prop_id, "role": role} for prop_id, role in links
+            ])
+
+    with op.batch_alter_table('benchmark_reports') as batch_op:
+        batch_op.drop_column('property_ids_used')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('benchmark_reports') as batch_op:
+        batch_op.add_column(sa.Column('property_ids_used', sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    props_by_report = {}
+    for row in conn.execute(sa.select(report_properties).order_by(report_properties.c.role.desc())).all():
+        props_by_report.setdefault(row.report_id, []).append(row.property_id)
+    for report_id, props in props_by_report.items():
+        conn.execute(reports.update().where(reports.c.id == report_id).values(property_ids_used=",".join(props)))
+
+    op.drop_index('ix_report_properties_property_role', table_name='report_properties')
+    op.drop_table('report_properties')
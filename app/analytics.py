@@ -1,65 +1,423 @@
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime
-from collections import defaultdict
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Callable, NamedTuple, Awaitable
+from datetime import date, datetime
 
+import numpy as np
 from google.oauth2.credentials import Credentials
 from google.analytics.data_v1beta import BetaAnalyticsDataClient
 from google.analytics.data_v1beta.types import (
     DateRange, Dimension, Metric, RunReportRequest
 )
 
-def _fetch_ga_data_for_property(
+from .config import settings
+from .fetch_planner import MetricFetchPlanner, plan_metric_groups
+from .ga_cache import ga_response_cache, days_in_range, is_final_day
+from .ga_clients import ga_data_client_pool
+from .ga_scheduler import ga_request_scheduler
+from .metric_cube import MetricCube, benchmark_key_means, build_metric_cube, concat_cubes, metrics_with_weights, slice_days
+from .metrics import (
+    AGGREGATION_SECONDS, GA_DECODE_SECONDS, GA_FETCH_ROWS, GA_FETCH_SECONDS, GA_FETCHES_IN_FLIGHT
+)
+
+_ga_fetch_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.GA_FETCH_CONCURRENCY),
+    thread_name_prefix="ga-fetch"
+)
+
+# (property_id, rijen in deze pagina, property klaar, foutmelding)
+PropertyProgressCallback = Callable[[str, int, bool, Optional[str]], None]
+MetricCubeCallback = Callable[[Optional[MetricCube]], None]
+# (property_id, metrics, startdatum, einddatum, on_page) -> (pagina's, foutmelding)
+PropertyFetch = Callable[
+    [str, List[str], str, str, Callable[["ReportPage"], None]], Awaitable[Tuple[List["ReportPage"], Optional[str]]]
+]
+
+GA_MAX_METRICS_PER_REQUEST = 10
+
+ga_fetch_planner = MetricFetchPlanner("GA fetch", GA_MAX_METRICS_PER_REQUEST, settings.GA_FETCH_PLAN_WINDOW_SECONDS)
+
+
+class ReportPage(NamedTuple):
+    """Eén pagina rapportdata in kolomvorm: een lijst per dimensie en een
+    (rijen x metrics) float64 matrix."""
+    dimension_columns: Dict[str, List[Any]]
+    metric_names: List[str]
+    metric_values: np.ndarray
+
+    @property
+    def num_rows(self) -> int:
+        return self.metric_values.shape[0]
+
+
+def _parse_date_column(values: List[Any]) -> List[Any]:
+    parsed: Dict[Any, Any] = {}
+    for value in set(values):
+        try:
+            parsed[value] = datetime.strptime(value, "%Y%m%d")
+        except (ValueError, TypeError):
+            parsed[value] = value
+    return [parsed[value] for value in values]
+
+
+def _metric_matrix(metric_rows: List[List[Any]], num_metrics: int) -> np.ndarray:
+    if not metric_rows:
+        return np.zeros((0, num_metrics), dtype=np.float64)
+    try:
+        return np.array(metric_rows, dtype=np.float64).reshape(len(metric_rows), num_metrics)
+    except ValueError:
+        def to_float(value: Any) -> float:
+            try:
+                return float(value)
+            except (ValueError, TypeError):
+                return 0.0
+        return np.array([[to_float(v) for v in row] for row in metric_rows], dtype=np.float64).reshape(len(metric_rows), num_metrics)
+
+
+def _decode_report_page(
+    dimension_names: List[str],
+    metric_names: List[str],
+    dimension_rows: List[List[Any]],
+    metric_rows: List[List[Any]]
+) -> ReportPage:
+    if dimension_rows:
+        dimension_columns = {name: list(column) for name, column in zip(dimension_names, zip(*dimension_rows))}
+    else:
+        dimension_columns = {name: [] for name in dimension_names}
+    if "date" in dimension_columns:
+        dimension_columns["date"] = _parse_date_column(dimension_columns["date"])
+    return ReportPage(dimension_columns, list(metric_names), _metric_matrix(metric_rows, len(metric_names)))
+
+
+def _decode_report_response(response) -> ReportPage:
+    api_rows = response.rows
+    return _decode_report_page(
+        [header.name for header in response.dimension_headers],
+        [header.name for header in response.metric_headers],
+        [[value.value for value in api_row.dimension_values] for api_row in api_rows],
+        [[value.value for value in api_row.metric_values] for api_row in api_rows]
+    )
+
+
+def _decode_report_response_timed(response) -> ReportPage:
+    with GA_DECODE_SECONDS.time():
+        return _decode_report_response(response)
+
+
+def _ga_report_request(
+    property_id: str,
+    dimensions: List[Dimension],
+    metrics: List[Metric],
+    start_date_str: str,
+    end_date_str: str,
+    offset: int,
+    limit: int
+) -> RunReportRequest:
+    return RunReportRequest(
+        property=property_id,
+        dimensions=dimensions,
+        metrics=metrics,
+        date_ranges=[DateRange(start_date=start_date_str, end_date=end_date_str)],
+        keep_empty_rows=True,
+        offset=offset,
+        limit=limit,
+        return_property_quota=True
+    )
+
+
+def _encode_cached_days(pages: List[ReportPage], days: List[date]) -> Dict[date, Dict[str, Any]]:
+    rows_by_day: Dict[date, List[List[Any]]] = {d: [] for d in days}
+    dimension_names: List[str] = []
+    metric_names: List[str] = []
+    for page in pages:
+        dimension_names = list(page.dimension_columns)
+        metric_names = page.metric_names
+        encoded_columns = [
+            [v.strftime("%Y%m%d") if isinstance(v, datetime) else v for v in column]
+            for column in page.dimension_columns.values()
+        ]
+        for row_date, dim_values, metric_values in zip(
+            page.dimension_columns.get("date", []), zip(*encoded_columns), page.metric_values.tolist()
+        ):
+            if isinstance(row_date, datetime) and row_date.date() in rows_by_day:
+                rows_by_day[row_date.date()].append([list(dim_values), metric_values])
+    return {
+        d: {"dimensions": dimension_names, "metrics": metric_names, "rows": rows}
+        for d, rows in rows_by_day.items()
+    }
+
+
+def _decode_cached_day(payload: Dict[str, Any]) -> ReportPage:
+    return _decode_report_page(
+        payload["dimensions"],
+        payload["metrics"],
+        [dim_values for dim_values, _ in payload["rows"]],
+        [metric_values for _, metric_values in payload["rows"]]
+    )
+
+
+async def _run_cache_call(func: Callable, *args):
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_ga_fetch_executor, functools.partial(func, *args))
+    except Exception as e:
+        print(f"WAARSCHUWING (analytics.py): GA response cache niet beschikbaar: {e}")
+        return None
+
+
+async def _fetch_ga_data_for_property(
     data_client: BetaAnalyticsDataClient,
     property_id: str,
     dimensions: List[Dimension],
     metrics: List[Metric],
     start_date_str: str,
-    end_date_str: str
-) -> Tuple[List[Dict[str, Any]], Optional[str]]:
-    property_data_rows = []
+    end_date_str: str,
+    on_page: Optional[Callable[[ReportPage], None]] = None,
+    cache_scope: Optional[str] = None
+) -> Tuple[List[ReportPage], Optional[str]]:
+    """Haalt alle pagina's van een rapport op: eerst de eerste pagina voor
+    `row_count`, daarna de overige pagina's parallel. Elke pagina wordt bij
+    binnenkomst aan `on_page` doorgegeven.
+
+    Met een `cache_scope` (de gebruiker) worden dagen uit de lokale GA response
+    cache gelezen en wordt alleen het ontbrekende datumbereik bij de API opgevraagd."""
+    property_pages: List[ReportPage] = []
     error = None
+    if not property_id.startswith("properties/"):
+        return [], f"Ongeldig formaat property ID: {property_id}"
+
+    loop = asyncio.get_running_loop()
+    page_size = max(1, settings.GA_PAGE_SIZE)
+    dimension_names = [d.name for d in dimensions]
+    metric_names = [m.name for m in metrics]
+    cache = ga_response_cache if cache_scope else None
+    cacheable_days = days_in_range(start_date_str, end_date_str) if cache and "date" in dimension_names else None
+    fetch_start_str, fetch_end_str = start_date_str, end_date_str
+
+    async def fetch_page(offset: int) -> Tuple[ReportPage, int]:
+        # Tempo, nieuwe pogingen en quota bewaking zitten in de scheduler.
+        response = await ga_request_scheduler.run_report(data_client, _ga_report_request(
+            property_id, dimensions, metrics, fetch_start_str, fetch_end_str, offset, page_size
+        ), _ga_fetch_executor)
+        report_page = await loop.run_in_executor(_ga_fetch_executor, _decode_report_response_timed, response)
+        return report_page, response.row_count
+
+    pending_pages = []
     try:
-        if not property_id.startswith("properties/"):
-            return [], f"Ongeldig formaat property ID: {property_id}"
-
-        response = data_client.run_report(RunReportRequest(
-            property=property_id,
-            dimensions=dimensions,
-            metrics=metrics,
-            date_ranges=[DateRange(start_date=start_date_str, end_date=end_date_str)],
-            keep_empty_rows=True
-        ))
-
-        dimension_header_names = [header.name for header in response.dimension_headers]
-        metric_header_names = [header.name for header in response.metric_headers]
-
-        for api_row in response.rows:
-            row_dict = {"dimensions": {}, "metrics": {}}
-            for i, dim_value_obj in enumerate(api_row.dimension_values):
-                dim_name_from_header = dimension_header_names[i]
-                if dim_name_from_header == "date":
-                    try:
-                        dt_obj = datetime.strptime(dim_value_obj.value, "%Y%m%d")
-                        row_dict["dimensions"][dim_name_from_header] = dt_obj
-                    except ValueError:
-                        row_dict["dimensions"][dim_name_from_header] = dim_value_obj.value
-                else:
-                    row_dict["dimensions"][dim_name_from_header] = dim_value_obj.value
-            
-            for i, metric_value_obj in enumerate(api_row.metric_values):
-                metric_name_from_header = metric_header_names[i]
-                try:
-                    row_dict["metrics"][metric_name_from_header] = float(metric_value_obj.value)
-                except ValueError:
-                    row_dict["metrics"][metric_name_from_header] = 0.0
-            property_data_rows.append(row_dict)
-        
+        if cacheable_days:
+            cached_by_day = await _run_cache_call(
+                cache.get_days, cache_scope, property_id, dimension_names, metric_names, cacheable_days
+            ) or {}
+            missing_days = [d for d in cacheable_days if d not in cached_by_day]
+            for d in cacheable_days:
+                if d in cached_by_day and (not missing_days or d < missing_days[0] or d > missing_days[-1]):
+                    cached_page = _decode_cached_day(cached_by_day[d])
+                    property_pages.append(cached_page)
+                    if on_page:
+                        on_page(cached_page)
+            if not missing_days:
+                return property_pages, None
+            cacheable_days = cacheable_days[cacheable_days.index(missing_days[0]):cacheable_days.index(missing_days[-1]) + 1]
+            fetch_start_str, fetch_end_str = missing_days[0].isoformat(), missing_days[-1].isoformat()
+
+        fetched_pages = []
+        first_page, row_count = await fetch_page(0)
+        fetched_pages.append(first_page)
+        if on_page:
+            on_page(first_page)
+
+        pending_pages = [asyncio.ensure_future(fetch_page(offset)) for offset in range(page_size, row_count, page_size)]
+        for next_page in asyncio.as_completed(pending_pages):
+            report_page, _ = await next_page
+            if on_page:
+                on_page(report_page)
+        fetched_pages.extend(page.result()[0] for page in pending_pages)
+        property_pages.extend(fetched_pages)
+
+        if cacheable_days:
+            await _run_cache_call(
+                cache.put_days, cache_scope, property_id, dimension_names, metric_names,
+                _encode_cached_days(fetched_pages, cacheable_days)
+            )
+
     except Exception as e:
         print(f"ERROR (analytics.py): Fout bij ophalen/verwerken rapport voor {property_id}: {e}")
         error = str(e)
-    
-    return property_data_rows, error
+    finally:
+        for page in pending_pages:
+            page.cancel()
+
+    return property_pages, error
+
+
+def _slice_page_metrics(page: ReportPage, metric_names: List[str]) -> ReportPage:
+    positions = [page.metric_names.index(m) for m in metric_names]
+    return ReportPage(page.dimension_columns, list(metric_names), page.metric_values[:, positions])
+
+
+def _slice_fetch_result(
+    result: Tuple[List[ReportPage], Optional[str]], metric_names: List[str]
+) -> Tuple[List[ReportPage], Optional[str]]:
+    pages, error = result
+    return [_slice_page_metrics(page, metric_names) for page in pages], error
+
+
+async def _fetch_ga_data_for_property_bounded(
+    semaphore: asyncio.Semaphore,
+    data_client: BetaAnalyticsDataClient,
+    property_id: str,
+    dimensions: List[Dimension],
+    metrics: List[Metric],
+    start_date_str: str,
+    end_date_str: str,
+    on_page: Optional[Callable[[ReportPage], None]] = None,
+    cache_scope: Optional[str] = None
+) -> Tuple[List[ReportPage], Optional[str]]:
+    timeout = settings.GA_FETCH_TIMEOUT_SECONDS
+    # Dezelfde login die tegelijk dezelfde data opvraagt (bijv. meerdere rapporten op
+    # dezelfde peers) deelt één query over alle gevraagde metrics. De pool geeft per
+    # login één client.
+    base_key = (
+        id(data_client), cache_scope, property_id, tuple(d.name for d in dimensions),
+        start_date_str, end_date_str
+    )
+
+    async def fetch_group(group_metric_names: List[str], publish: Callable[[ReportPage], None]):
+        started = time.perf_counter()
+        outcome = "cancelled"
+        try:
+            with GA_FETCHES_IN_FLIGHT.track_inprogress():
+                pages, error = await _fetch_ga_data_for_property(
+                    data_client, property_id, dimensions, [Metric(name=m) for m in group_metric_names],
+                    start_date_str, end_date_str, publish, cache_scope
+                )
+            outcome = "error" if error else "ok"
+        finally:
+            GA_FETCH_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+        if not error:
+            GA_FETCH_ROWS.observe(sum(page.num_rows for page in pages))
+        return pages, error
+
+    async with semaphore:
+        try:
+            return await asyncio.wait_for(
+                ga_fetch_planner.run(
+                    base_key, [m.name for m in metrics], fetch_group, _slice_page_metrics, _slice_fetch_result, on_page
+                ),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"ERROR (analytics.py): Time-out na {timeout}s bij ophalen rapport voor {property_id}")
+            return [], f"Time-out na {timeout} seconden."
+
+
+def _slice_page_days(page: ReportPage, first_day: date, last_day: date) -> ReportPage:
+    days = [_as_day(value) for value in page.dimension_columns.get("date", [])]
+    keep = [day is not None and first_day <= day <= last_day for day in days]
+    if all(keep):
+        return page
+    dimension_columns = {
+        name: [value for value, kept in zip(column, keep) if kept] for name, column in page.dimension_columns.items()
+    }
+    return ReportPage(dimension_columns, page.metric_names, page.metric_values[np.array(keep, dtype=bool)])
+
+
+class PeerGroupFetch:
+    """Gezamenlijke GA fetch voor rapporten op dezelfde peers (zelfde login,
+    properties en dimensies) met verschillende metrics.
+
+    De metricgroepen worden vooraf ingepland over de metrics van alle rapporten; per
+    property en metricgroep loopt één query over het gezamenlijke datumbereik. Elk
+    rapport krijgt daaruit alleen zijn eigen metrics en dagen. Een mislukte query
+    raakt alleen de rapporten in die metricgroep. Bruikbaar als `property_fetch` van
+    `generate_benchmark_data_from_google`; sluit af met `close()`."""
+
+    def __init__(
+        self,
+        google_credentials: Credentials,
+        dimension_names: List[str],
+        metric_sets: List[List[str]],
+        start_date_str: str,
+        end_date_str: str,
+        cache_scope: Optional[str] = None
+    ):
+        self.data_client = ga_data_client_pool.get(google_credentials)
+        self.dimensions = [Dimension(name=d) for d in dimension_names]
+        self.start_date_str, self.end_date_str = start_date_str, end_date_str
+        self.cache_scope = cache_scope
+        cube_metric_sets = [metrics_with_weights(metrics, GA_MAX_METRICS_PER_REQUEST) for metrics in metric_sets]
+        self.metric_groups: Dict[Tuple[str, ...], List[str]] = {
+            tuple(metrics): group
+            for metrics, group in zip(cube_metric_sets, plan_metric_groups(cube_metric_sets, GA_MAX_METRICS_PER_REQUEST))
+        }
+        self._semaphore = asyncio.Semaphore(max(1, settings.GA_FETCH_CONCURRENCY))
+        self._fetches: Dict[Tuple[str, Tuple[str, ...]], asyncio.Task] = {}
+
+    async def _fetch_group(self, property_id: str, group_metric_names: List[str]) -> Tuple[List[ReportPage], Optional[str]]:
+        return await _fetch_ga_data_for_property_bounded(
+            self._semaphore, self.data_client, property_id, self.dimensions,
+            [Metric(name=m) for m in group_metric_names], self.start_date_str, self.end_date_str,
+            cache_scope=self.cache_scope
+        )
+
+    async def __call__(
+        self,
+        property_id: str,
+        metric_names: List[str],
+        start_date_str: str,
+        end_date_str: str,
+        on_page: Callable[[ReportPage], None]
+    ) -> Tuple[List[ReportPage], Optional[str]]:
+        group_metric_names = self.metric_groups.get(tuple(metric_names), metric_names)
+        key = (property_id, tuple(group_metric_names))
+        if key not in self._fetches:
+            self._fetches[key] = asyncio.ensure_future(self._fetch_group(property_id, group_metric_names))
+        # Afgeschermd: een geannuleerd rapport mag de query van de andere niet stoppen.
+        pages, error = await asyncio.shield(self._fetches[key])
+        if error:
+            return [], f"Metricgroep {', '.join(group_metric_names)}: {error}"
+
+        first_day, last_day = date.fromisoformat(start_date_str), date.fromisoformat(end_date_str)
+        report_pages = [
+            _slice_page_days(_slice_page_metrics(page, metric_names), first_day, last_day) for page in pages
+        ]
+        for page in report_pages:
+            on_page(page)
+        return report_pages, None
+
+    def close(self) -> None:
+        for fetch in self._fetches.values():
+            fetch.cancel()
+        self._fetches.clear()
+
+
+def _page_keys_and_values(
+    page: ReportPage, selected_dimension_api_names: List[str], selected_metric_api_names: List[str]
+) -> Tuple[List[Tuple], np.ndarray]:
+    num_rows = page.num_rows
+    key_columns = [page.dimension_columns.get("date") or [None] * num_rows]
+    for dim_name in selected_dimension_api_names:
+        key_columns.append(page.dimension_columns.get(dim_name) or ["(not set)"] * num_rows)
+
+    values = np.zeros((num_rows, len(selected_metric_api_names)), dtype=np.float64)
+    for target_index, m_api in enumerate(selected_metric_api_names):
+        if m_api in page.metric_names:
+            values[:, target_index] = page.metric_values[:, page.metric_names.index(m_api)]
+    return list(zip(*key_columns)), values
+
+
+def _wide_rows(
+    group: str, keys: List[Tuple], values: np.ndarray,
+    selected_dimension_api_names: List[str], selected_metric_api_names: List[str]
+) -> List[Dict[str, Any]]:
+    wide_rows = []
+    for key_tuple, metric_values in zip(keys, np.round(values, 2).tolist()):
+        output_row = {"group": group, "date": key_tuple[0]}
+        output_row.update(zip(selected_dimension_api_names, key_tuple[1:]))
+        output_row.update(zip(selected_metric_api_names, metric_values))
+        wide_rows.append(output_row)
+    return wide_rows
 
 
 async def generate_benchmark_data_from_google(
@@ -69,14 +427,20 @@ async def generate_benchmark_data_from_google(
     selected_metric_api_names: List[str],
     selected_dimension_api_names: List[str],
     start_date_str: str,
-    end_date_str: str
+    end_date_str: str,
+    cache_scope: Optional[str] = None,
+    on_property_progress: Optional[PropertyProgressCallback] = None,
+    on_metric_cube: Optional[MetricCubeCallback] = None,
+    property_fetch: Optional[PropertyFetch] = None
 ) -> List[Dict[str, Any]]:
     
-    data_client = BetaAnalyticsDataClient(credentials=google_credentials)
+    data_client = ga_data_client_pool.get(google_credentials)
     
     ga_query_dimension_names = ["date"] + selected_dimension_api_names
+    # Ratio-metrics worden gewogen gemiddeld; haal hun noemer (bijv. sessions) mee op.
+    cube_metric_names = metrics_with_weights(selected_metric_api_names, GA_MAX_METRICS_PER_REQUEST)
     
-    final_ga_metrics = [Metric(name=m) for m in selected_metric_api_names]
+    final_ga_metrics = [Metric(name=m) for m in cube_metric_names]
     final_ga_dimensions = [Dimension(name=d) for d in ga_query_dimension_names]
 
     if not final_ga_metrics:
@@ -84,94 +448,189 @@ async def generate_benchmark_data_from_google(
 
     errors_dict: Dict[str, str] = {}
     
-    processed_client_a_data: Dict[Tuple, Dict[str, Any]] = {}
-    
-    client_a_raw_rows, client_a_error = await asyncio.to_thread(
-        _fetch_ga_data_for_property,
-        data_client, client_a_property_id, final_ga_dimensions, final_ga_metrics, 
-        start_date_str, end_date_str
-    )
+    semaphore = asyncio.Semaphore(max(1, settings.GA_FETCH_CONCURRENCY))
+    all_property_ids = [client_a_property_id] + list(benchmark_property_ids or [])
+    num_metrics = len(selected_metric_api_names)
+    num_cube_metrics = len(cube_metric_names)
+
+    # Pagina's worden per property direct bij binnenkomst naar sleutels en een
+    # metric-matrix omgezet; een property telt pas mee in de benchmark als al zijn
+    # pagina's succesvol zijn opgehaald.
+    staged_property_data: Dict[str, List[Tuple[List[Tuple], np.ndarray]]] = {prop_id: [] for prop_id in all_property_ids}
+
+    def stage_page(prop_id: str) -> Callable[[ReportPage], None]:
+        staged = staged_property_data[prop_id]
+        def on_page(page: ReportPage) -> None:
+            staged.append(_page_keys_and_values(page, selected_dimension_api_names, cube_metric_names))
+            if on_property_progress:
+                on_property_progress(prop_id, page.num_rows, False, None)
+        return on_page
+
+    async def fetch_property(prop_id: str) -> Tuple[List[ReportPage], Optional[str]]:
+        if property_fetch:
+            result = await property_fetch(prop_id, cube_metric_names, start_date_str, end_date_str, stage_page(prop_id))
+        else:
+            result = await _fetch_ga_data_for_property_bounded(
+                semaphore, data_client, prop_id, final_ga_dimensions, final_ga_metrics,
+                start_date_str, end_date_str, stage_page(prop_id), cache_scope
+            )
+        if on_property_progress:
+            on_property_progress(prop_id, 0, True, result[1])
+        return result
+
+    fetch_results = await asyncio.gather(*[fetch_property(prop_id) for prop_id in all_property_ids])
+
+    client_a_pages, client_a_error = fetch_results[0]
     if client_a_error:
         errors_dict[client_a_property_id] = client_a_error
-    
-    if client_a_raw_rows:
-        for row_dict in client_a_raw_rows:
-            key_dim_values_list = [row_dict["dimensions"].get("date")]
-            for dim_name in selected_dimension_api_names: 
-                key_dim_values_list.append(row_dict["dimensions"].get(dim_name, "(not set)"))
-            
-            key_tuple = tuple(key_dim_values_list)
-            processed_client_a_data[key_tuple] = row_dict["metrics"]
-
-    aggregated_benchmark_metrics: Dict[Tuple, Dict[str, Dict[str, float]]] = defaultdict(
-        lambda: {m_api: {"sum": 0.0, "count_props": 0} for m_api in selected_metric_api_names}
-    )
-    successful_benchmark_prop_count = 0
 
+    successful_benchmark_prop_ids = []
     if benchmark_property_ids:
-        for bench_prop_id in benchmark_property_ids:
-            bench_raw_rows, bench_error = await asyncio.to_thread(
-                _fetch_ga_data_for_property,
-                data_client, bench_prop_id, final_ga_dimensions, final_ga_metrics,
-                start_date_str, end_date_str
-            )
+        for bench_prop_id, (bench_pages, bench_error) in zip(benchmark_property_ids, fetch_results[1:]):
             if bench_error:
                 errors_dict[bench_prop_id] = bench_error
                 continue
-            if not bench_raw_rows:
+            if not any(page.num_rows for page in bench_pages):
                 continue
-            
-            successful_benchmark_prop_count += 1
-            for row_dict in bench_raw_rows:
-                key_dim_values_list = [row_dict["dimensions"].get("date")]
-                for dim_name in selected_dimension_api_names:
-                    key_dim_values_list.append(row_dict["dimensions"].get(dim_name, "(not set)"))
-                key_tuple = tuple(key_dim_values_list)
-
-                for m_api, value in row_dict["metrics"].items():
-                    if m_api in selected_metric_api_names:
-                        aggregated_benchmark_metrics[key_tuple][m_api]["sum"] += value
-    
-    averaged_benchmark_data: Dict[Tuple, Dict[str, Any]] = {}
-    if successful_benchmark_prop_count > 0:
-        for key_tuple, metrics_sums_counts in aggregated_benchmark_metrics.items():
-            averaged_benchmark_data[key_tuple] = {}
-            for m_api, data in metrics_sums_counts.items():
-                if m_api in ["averageSessionDuration", "engagementRate"]:
-                    averaged_benchmark_data[key_tuple][m_api] = data["sum"] / successful_benchmark_prop_count
-                else:
-                    averaged_benchmark_data[key_tuple][m_api] = data["sum"] / successful_benchmark_prop_count
+            successful_benchmark_prop_ids.append(bench_prop_id)
+
+    # Per property bewaard, zodat naast het gemiddelde ook mediaan en kwartielen kunnen.
+    cube_property_ids = ([] if client_a_error else [client_a_property_id]) + successful_benchmark_prop_ids
+    aggregation_started = time.perf_counter()
+    metric_cube = build_metric_cube(
+        {prop_id: staged_property_data[prop_id] for prop_id in cube_property_ids},
+        ga_query_dimension_names, cube_metric_names
+    )
+    if on_metric_cube:
+        on_metric_cube(metric_cube)
+
+    client_a_keys: List[Tuple] = []
+    client_a_values = np.zeros((0, num_cube_metrics), dtype=np.float64)
+    if not client_a_error:
+        client_mask = metric_cube.property_codes == 0
+        client_a_keys = [metric_cube.keys[k] for k in metric_cube.key_codes[client_mask]]
+        client_a_values = metric_cube.values[client_mask]
+
+    benchmark_keys: List[Tuple] = []
+    averaged_benchmark_values = np.zeros((0, num_cube_metrics), dtype=np.float64)
+    if successful_benchmark_prop_ids:
+        benchmark_keys, averaged_benchmark_values = benchmark_key_means(metric_cube, successful_benchmark_prop_ids)
+    AGGREGATION_SECONDS.observe(time.perf_counter() - aggregation_started, stage="benchmark")
 
     final_wide_output: List[Dict[str, Any]] = []
-    
-    for key_tuple, metrics_values_dict in processed_client_a_data.items():
-        output_row = {"group": client_a_property_id} 
-        output_row["date"] = key_tuple[0] 
-        
-        for i, dim_name in enumerate(selected_dimension_api_names): 
-            output_row[dim_name] = key_tuple[i + 1] 
-            
-        for metric_name, value in metrics_values_dict.items():
-            if metric_name in selected_metric_api_names:
-                output_row[metric_name] = round(value, 2) if isinstance(value, (int, float)) else value
-        final_wide_output.append(output_row)
-
-    for key_tuple, metrics_values_dict in averaged_benchmark_data.items():
-        output_row = {"group": "Benchmark"}
-        output_row["date"] = key_tuple[0]
-        
-        for i, dim_name in enumerate(selected_dimension_api_names):
-            output_row[dim_name] = key_tuple[i + 1]
-            
-        for metric_name, value in metrics_values_dict.items():
-            if metric_name in selected_metric_api_names:
-                output_row[metric_name] = round(value, 2) if isinstance(value, (int, float)) else value
-        final_wide_output.append(output_row)
+    final_wide_output.extend(_wide_rows(
+        client_a_property_id, client_a_keys, client_a_values[:, :num_metrics],
+        selected_dimension_api_names, selected_metric_api_names
+    ))
+    final_wide_output.extend(_wide_rows(
+        "Benchmark", benchmark_keys, averaged_benchmark_values[:, :num_metrics],
+        selected_dimension_api_names, selected_metric_api_names
+    ))
 
     if not final_wide_output and errors_dict:
         error_summary = "; ".join([f"{prop}: {err}" for prop, err in errors_dict.items()])
         raise ValueError(f"Kon geen benchmark data genereren. Fouten: {error_summary}")
-    elif not final_wide_output and not client_a_raw_rows and successful_benchmark_prop_count == 0 :
-        pass
 
     return final_wide_output
+
+
+def _row_day(row: Dict[str, Any]) -> Optional[date]:
+    return _as_day(row.get("date"))
+
+
+def _as_day(row_date: Any) -> Optional[date]:
+    if isinstance(row_date, datetime):
+        return row_date.date()
+    if isinstance(row_date, str):
+        try:
+            return datetime.fromisoformat(row_date).date()
+        except ValueError:
+            return None
+    return None
+
+
+def _split_incremental_days(
+    existing_rows: List[Dict[str, Any]], requested_days: List[date]
+) -> Tuple[List[Dict[str, Any]], set, List[date]]:
+    """Bewaarde rijen die hergebruikt worden, hun dagen, en de dagen die opgehaald moeten worden."""
+    requested_day_set = set(requested_days)
+    today = date.today()
+    kept_rows = [
+        row for row in existing_rows
+        if (row_day := _row_day(row)) in requested_day_set and is_final_day(row_day, today)
+    ]
+    kept_days = {_row_day(row) for row in kept_rows}
+    return kept_rows, kept_days, [d for d in requested_days if d not in kept_days]
+
+
+def incremental_fetch_range(
+    existing_rows: List[Dict[str, Any]], start_date_str: str, end_date_str: str
+) -> Optional[Tuple[str, str]]:
+    """Het datumbereik (ISO) dat `refresh_benchmark_data_incrementally` bij GA opvraagt, of None."""
+    requested_days = days_in_range(start_date_str, end_date_str)
+    if not requested_days or not existing_rows:
+        return start_date_str, end_date_str
+    days_to_fetch = _split_incremental_days(existing_rows, requested_days)[2]
+    return (days_to_fetch[0].isoformat(), days_to_fetch[-1].isoformat()) if days_to_fetch else None
+
+
+async def refresh_benchmark_data_incrementally(
+    google_credentials: Credentials,
+    client_a_property_id: str,
+    benchmark_property_ids: List[str],
+    selected_metric_api_names: List[str],
+    selected_dimension_api_names: List[str],
+    start_date_str: str,
+    end_date_str: str,
+    existing_rows: List[Dict[str, Any]],
+    cache_scope: Optional[str] = None,
+    on_property_progress: Optional[PropertyProgressCallback] = None,
+    existing_cube: Optional[MetricCube] = None,
+    on_metric_cube: Optional[MetricCubeCallback] = None,
+    property_fetch: Optional[PropertyFetch] = None
+) -> List[Dict[str, Any]]:
+    """Ververst een opgeslagen rapport met dezelfde properties, metrics en dimensies.
+
+    Definitieve dagen die al in `existing_rows` staan worden hergebruikt; alleen
+    ontbrekende en nog volatiele dagen worden opgehaald. Dagen buiten het nieuwe
+    bereik vallen weg. Met `existing_cube` wordt de metric cube op dezelfde manier
+    samengevoegd; zonder krijgt `on_metric_cube` None (geen volledige cube)."""
+    requested_days = days_in_range(start_date_str, end_date_str)
+    if not requested_days or not existing_rows:
+        return await generate_benchmark_data_from_google(
+            google_credentials, client_a_property_id, benchmark_property_ids,
+            selected_metric_api_names, selected_dimension_api_names,
+            start_date_str, end_date_str, cache_scope=cache_scope,
+            on_property_progress=on_property_progress, on_metric_cube=on_metric_cube,
+            property_fetch=property_fetch
+        )
+
+    kept_rows, kept_days, days_to_fetch = _split_incremental_days(existing_rows, requested_days)
+    if not days_to_fetch:
+        if on_metric_cube:
+            on_metric_cube(slice_days(existing_cube, lambda d: _as_day(d) in kept_days) if existing_cube else None)
+        return kept_rows
+
+    fetch_start, fetch_end = days_to_fetch[0], days_to_fetch[-1]
+    fetched_cubes: List[MetricCube] = []
+    fetched_rows = await generate_benchmark_data_from_google(
+        google_credentials, client_a_property_id, benchmark_property_ids,
+        selected_metric_api_names, selected_dimension_api_names,
+        fetch_start.isoformat(), fetch_end.isoformat(), cache_scope=cache_scope,
+        on_property_progress=on_property_progress, on_metric_cube=fetched_cubes.append,
+        property_fetch=property_fetch
+    )
+    if on_metric_cube:
+        merged_cube = None
+        if existing_cube and fetched_cubes:
+            kept_cube = slice_days(
+                existing_cube, lambda d: (day := _as_day(d)) in kept_days and not (fetch_start <= day <= fetch_end)
+            )
+            merged_cube = concat_cubes(kept_cube, fetched_cubes[0])
+        on_metric_cube(merged_cube)
+    print(f"INFO (analytics.py): Incrementele refresh: {len(kept_days)} dagen hergebruikt, "
+          f"{(fetch_end - fetch_start).days + 1} dagen opgehaald.")
+
+    merged_rows = [row for row in kept_rows if not (fetch_start <= _row_day(row) <= fetch_end)]
+    merged_rows.extend(fetched_rows)
+    return merged_rows
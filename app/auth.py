@@ -1,8 +1,13 @@
+import base64
+import hashlib
 from typing import Optional
+from cryptography.fernet import Fernet, InvalidToken
 from fastapi import Request
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from .config import settings
+from .database import UserCredentialsDB
 
 def get_google_credentials_from_session(request: Request) -> Optional[Credentials]:
     creds_info = request.session.get("credentials")
@@ -49,4 +54,40 @@ def get_google_flow() -> Flow:
         client_config=client_config,
         scopes=settings.SCOPES,
         redirect_uri=settings.REDIRECT_URI
-    )
\ No newline at end of file
+    )
+
+def _credentials_fernet() -> Fernet:
+    key = hashlib.sha256(f"offline-credentials:{settings.SESSION_SECRET_KEY}".encode("utf-8")).digest()
+    return Fernet(base64.urlsafe_b64encode(key))
+
+async def save_offline_credentials(db: AsyncSession, user_email: str, credentials: Credentials, only_if_stored: bool = False) -> bool:
+    """Bewaart de refresh token (versleuteld) zodat rapporten met een rollend venster
+    zonder sessie ververst kunnen worden. Met `only_if_stored` wordt alleen een
+    bestaande token vervangen (bij opnieuw inloggen)."""
+    if not credentials.refresh_token:
+        return False
+    if only_if_stored and not await db.get(UserCredentialsDB, user_email):
+        return False
+    encrypted = _credentials_fernet().encrypt(credentials.refresh_token.encode("utf-8")).decode("ascii")
+    await db.merge(UserCredentialsDB(
+        user_email=user_email, refresh_token_encrypted=encrypted,
+        scopes=" ".join(credentials.scopes or settings.SCOPES)
+    ))
+    await db.commit()
+    return True
+
+async def load_offline_credentials(db: AsyncSession, user_email: str) -> Optional[Credentials]:
+    stored = await db.get(UserCredentialsDB, user_email)
+    if not stored:
+        return None
+    try:
+        refresh_token = _credentials_fernet().decrypt(stored.refresh_token_encrypted.encode("ascii")).decode("utf-8")
+    except InvalidToken:
+        print(f"WAARSCHUWING (auth.py): Opgeslagen credentials van {user_email} niet te ontsleutelen (SESSION_SECRET_KEY gewijzigd?).")
+        return None
+    return Credentials(
+        token=None, refresh_token=refresh_token,
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id=settings.GOOGLE_CLIENT_ID, client_secret=settings.GOOGLE_CLIENT_SECRET,
+        scopes=stored.scopes.split() if stored.scopes else settings.SCOPES
+    )
@@ -0,0 +1,191 @@
+"""Automatisch verversen van rapporten met een rollend venster ("laatste N dagen
+t/m gisteren").
+
+Elk rapport krijgt een willekeurig moment binnen het rustige venster
+(`AUTO_REFRESH_WINDOW_START_HOUR`, `AUTO_REFRESH_WINDOW_HOURS` lokale tijd), zodat het
+werk over de nacht verspreid wordt. Draai `python -m app.auto_refresh` periodiek
+(bijv. elk kwartier via cron), of zet `AUTO_REFRESH_SCHEDULER_ENABLED` aan om dit in
+de webapp zelf te doen.
+"""
+import asyncio
+import random
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from google.oauth2.credentials import Credentials
+
+from . import json_codec
+from .analytics import PeerGroupFetch, incremental_fetch_range, refresh_benchmark_data_incrementally
+from .auth import load_offline_credentials
+from .config import settings
+from .crud import (
+    claim_report_refresh,
+    get_report_metric_cube,
+    get_report_rows,
+    get_reports_due_for_refresh,
+    set_auto_refresh_error,
+    update_benchmark_report
+)
+from .database import AsyncSessionLocal, BenchmarkReportDB
+from .metric_cube import MetricCube
+
+
+def rolling_window_dates(window_days: int, today: Optional[date] = None) -> Tuple[str, str]:
+    """Start- en einddatum (ISO) van de laatste `window_days` dagen t/m gisteren."""
+    end = (today or date.today()) - timedelta(days=1)
+    start = end - timedelta(days=window_days - 1)
+    return start.isoformat(), end.isoformat()
+
+
+def next_refresh_slot(now: Optional[datetime] = None) -> datetime:
+    """Een willekeurig moment in het eerstvolgende rustige venster (als UTC)."""
+    now_local = (now or datetime.now(timezone.utc)).astimezone()
+    window_start = datetime.combine(now_local.date(), time(hour=settings.AUTO_REFRESH_WINDOW_START_HOUR), tzinfo=now_local.tzinfo)
+    if window_start <= now_local:
+        window_start += timedelta(days=1)
+    offset = random.uniform(0, settings.AUTO_REFRESH_WINDOW_HOURS * 3600)
+    return (window_start + timedelta(seconds=offset)).astimezone(timezone.utc)
+
+
+class _RefreshInput(NamedTuple):
+    report_id: int
+    db_report: BenchmarkReportDB
+    credentials: Credentials
+    benchmark_ids: List[str]
+    metrics: List[str]
+    dimensions: List[str]
+    start_date: str
+    end_date: str
+    existing_rows: List[Dict[str, Any]]
+    existing_cube: Optional[MetricCube]
+
+
+async def _load_refresh_input(report_id: int) -> Optional[_RefreshInput]:
+    async with AsyncSessionLocal() as db:
+        db_report = await db.get(BenchmarkReportDB, report_id)
+        if not db_report or not db_report.rolling_window_days:
+            return None
+        credentials = await load_offline_credentials(db, db_report.generated_by_email)
+        if not credentials:
+            await set_auto_refresh_error(db, report_id, "Geen offline toegang opgeslagen; log opnieuw in en sla het rapport op.")
+            return None
+        try:
+            benchmark_ids = json_codec.loads(db_report.benchmark_property_ids_json) if db_report.benchmark_property_ids_json else []
+            metrics = json_codec.loads(db_report.metrics_used)
+            dimensions = json_codec.loads(db_report.dimensions_used)
+            existing_rows = await asyncio.to_thread(get_report_rows, db_report)
+            existing_cube = await asyncio.to_thread(get_report_metric_cube, db_report)
+        except (ValueError, TypeError) as e:
+            await set_auto_refresh_error(db, report_id, f"Opgeslagen rapport onleesbaar: {e}")
+            return None
+
+    start_date, end_date = rolling_window_dates(db_report.rolling_window_days)
+    return _RefreshInput(
+        report_id, db_report, credentials, benchmark_ids, metrics, dimensions,
+        start_date, end_date, existing_rows, existing_cube
+    )
+
+
+async def _refresh_report(refresh: _RefreshInput, property_fetch: Optional[PeerGroupFetch] = None) -> None:
+    db_report = refresh.db_report
+    metric_cubes = []
+    try:
+        rows = await refresh_benchmark_data_incrementally(
+            refresh.credentials, db_report.client_a_property_id, refresh.benchmark_ids, refresh.metrics,
+            refresh.dimensions, refresh.start_date, refresh.end_date, refresh.existing_rows,
+            cache_scope=db_report.generated_by_email, existing_cube=refresh.existing_cube,
+            on_metric_cube=metric_cubes.append, property_fetch=property_fetch
+        )
+    except Exception as e:
+        print(f"ERROR (auto_refresh.py): Verversen van rapport {db_report.report_uuid} mislukt: {e}")
+        async with AsyncSessionLocal() as db:
+            await set_auto_refresh_error(db, refresh.report_id, str(e))
+        return
+
+    async with AsyncSessionLocal() as db:
+        await update_benchmark_report(
+            db=db, report_uuid=db_report.report_uuid, user_email=db_report.generated_by_email,
+            benchmark_results_flat_json=rows, metric_cube=metric_cubes[0] if metric_cubes else None
+        )
+        await set_auto_refresh_error(db, refresh.report_id, None)
+    print(f"INFO (auto_refresh.py): Rapport {db_report.report_uuid} ververst ({refresh.start_date} t/m {refresh.end_date}).")
+
+
+def _peer_group_fetch(refreshes: List[_RefreshInput]) -> Optional[PeerGroupFetch]:
+    """Eén ingeplande fetch over de metrics van alle rapporten in de groep, over het
+    gezamenlijke datumbereik dat ze nog missen. None bij minder dan twee rapporten die
+    iets moeten ophalen."""
+    fetching = [
+        (refresh, fetch_range) for refresh in refreshes
+        if (fetch_range := incremental_fetch_range(refresh.existing_rows, refresh.start_date, refresh.end_date))
+    ]
+    if len(fetching) < 2:
+        return None
+    first = fetching[0][0]
+    return PeerGroupFetch(
+        first.credentials, ["date"] + first.dimensions, [refresh.metrics for refresh, _ in fetching],
+        min(start for _, (start, _) in fetching), max(end for _, (_, end) in fetching),
+        cache_scope=first.db_report.generated_by_email
+    )
+
+
+async def refresh_due_reports() -> int:
+    """Ververst alle rapporten die aan de beurt zijn, met hooguit
+    `AUTO_REFRESH_CONCURRENCY` rapporten tegelijk. Geeft het aantal geclaimde rapporten terug."""
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        due = await get_reports_due_for_refresh(db, now)
+
+    semaphore = asyncio.Semaphore(max(1, settings.AUTO_REFRESH_CONCURRENCY))
+
+    async def claim(report_id: int, expected_next: Optional[datetime]) -> bool:
+        async with AsyncSessionLocal() as db:
+            claimed = await claim_report_refresh(db, report_id, expected_next, next_refresh_slot(now))
+        # Een nieuw of gewijzigd rapport is net gegenereerd en krijgt alleen een moment.
+        return claimed and expected_next is not None
+
+    async def load(report_id: int) -> Optional[_RefreshInput]:
+        async with semaphore:
+            return await _load_refresh_input(report_id)
+
+    async def refresh(refresh_input: _RefreshInput, group_fetch: Optional[PeerGroupFetch]) -> None:
+        async with semaphore:
+            await _refresh_report(refresh_input, group_fetch)
+
+    async def refresh_peer_group(reports: List[Tuple[int, Optional[datetime]]]) -> int:
+        claimed = await asyncio.gather(*[claim(report_id, next_at) for report_id, next_at in reports])
+        report_ids = [report_id for (report_id, _), ok in zip(reports, claimed) if ok]
+        if not report_ids:
+            return 0
+        await asyncio.sleep(random.uniform(0, settings.AUTO_REFRESH_JITTER_SECONDS))
+        # Eerst alle rapporten van de groep laden, zodat hun GA queries vooraf samen
+        # ingepland kunnen worden (zelfde peers, verschillende metrics).
+        refreshes = [r for r in await asyncio.gather(*[load(report_id) for report_id in report_ids]) if r]
+        group_fetch = _peer_group_fetch(refreshes)
+        try:
+            await asyncio.gather(*[refresh(refresh_input, group_fetch) for refresh_input in refreshes])
+        finally:
+            if group_fetch:
+                group_fetch.close()
+        return len(report_ids)
+
+    peer_groups: Dict[Tuple, List[Tuple[int, Optional[datetime]]]] = {}
+    for report_id, next_at, peer_set in due:
+        peer_groups.setdefault(peer_set, []).append((report_id, next_at))
+    results = await asyncio.gather(*[refresh_peer_group(reports) for reports in peer_groups.values()])
+    return sum(results)
+
+
+async def run_auto_refresh_scheduler() -> None:
+    """Controleert elke `AUTO_REFRESH_POLL_SECONDS` of er rapporten aan de beurt zijn."""
+    while True:
+        try:
+            await refresh_due_reports()
+        except Exception as e:
+            print(f"ERROR (auto_refresh.py): Scheduler ronde mislukt: {e}")
+        await asyncio.sleep(settings.AUTO_REFRESH_POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    refreshed = asyncio.run(refresh_due_reports())
+    print(f"{refreshed} rapport(en) ververst.")
@@ -0,0 +1,165 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optioneel; zonder valt de middleware terug op gzip
+    brotli = None
+
+COMPRESSIBLE_CONTENT_TYPES = (
+    "text/html", "text/css", "text/plain", "application/json",
+    "application/x-ndjson", "application/javascript", "text/javascript",
+)
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            chunk = self._compressor.process(data)
+            return chunk + (self._compressor.finish() if final else self._compressor.flush())
+        chunk = self._compressor.compress(data)
+        return chunk + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+ENCODING_ETAG_SUFFIXES = ('-gzip"', '-br"')
+
+
+def strip_encoding_suffix(tag: str) -> str:
+    """De ETag van de ongecomprimeerde representatie (zonder W/ en "-gzip"/"-br")."""
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for suffix in ENCODING_ETAG_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def _add_vary_accept_encoding(headers: MutableHeaders) -> None:
+    vary = [value.strip().lower() for value in headers.get("vary", "").split(",")]
+    if "accept-encoding" not in vary and "*" not in vary:
+        headers.add_vary_header("Accept-Encoding")
+
+
+def _without_encoding_suffixes(scope: Scope, if_none_match: str) -> Scope:
+    # Handlers (ook StaticFiles) vergelijken zo met hun eigen, ongecomprimeerde ETag.
+    stripped = ", ".join(strip_encoding_suffix(tag) for tag in if_none_match.split(",")).encode("latin-1")
+    headers = [(name, stripped if name == b"if-none-match" else value) for name, value in scope["headers"]]
+    return {**scope, "headers": headers}
+
+
+def _client_etag(etag: str, if_none_match: Optional[str]) -> str:
+    """De ETag zoals de client hem stuurde (met coderingssuffix) als die bij `etag` hoort."""
+    for tag in (if_none_match or "").split(","):
+        if tag.strip() and strip_encoding_suffix(tag) == strip_encoding_suffix(etag):
+            return tag.strip()
+    return etag
+
+
+def _negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """Comprimeert tekstuele responses boven `minimum_size` met brotli of gzip,
+    afhankelijk van Accept-Encoding. Streaming responses (NDJSON) worden per chunk
+    gecomprimeerd en geflusht.
+
+    Tekstuele responses en 304's krijgen altijd `Vary: Accept-Encoding`, ook als ze
+    niet gecomprimeerd worden. If-None-Match gaat zonder coderingssuffix naar de app;
+    een 304 krijgt de ETag terug zoals de client hem stuurde."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = _negotiate_encoding(request_headers.get("accept-encoding", ""))
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match:
+            scope = _without_encoding_suffixes(scope, if_none_match)
+
+        initial_message: Message = {}
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal initial_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                initial_message = message
+                headers = MutableHeaders(raw=message["headers"])
+                content_type = headers.get("content-type", "").split(";")[0].strip()
+                compressible = content_type in COMPRESSIBLE_CONTENT_TYPES
+                if compressible or message["status"] == 304:
+                    _add_vary_accept_encoding(headers)
+                if message["status"] == 304 and headers.get("etag"):
+                    headers["ETag"] = _client_etag(headers["etag"], if_none_match)
+                passthrough = (
+                    encoding is None
+                    or "content-encoding" in headers
+                    or not compressible
+                    or message["status"] in (204, 304)
+                )
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(initial_message)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers = MutableHeaders(raw=initial_message["headers"])
+                headers["Content-Encoding"] = encoding
+                etag = headers.get("etag")
+                if etag and etag.endswith('"'):
+                    # Elke codering is een eigen representatie met een eigen sterke ETag.
+                    headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+                del headers["Content-Length"]
+                compressed = compressor.compress(body, final=not more_body)
+                if not more_body:
+                    headers["Content-Length"] = str(len(compressed))
+                await send(initial_message)
+                await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+                return
+
+            await send({"type": "http.response.body", "body": compressor.compress(body, final=not more_body), "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
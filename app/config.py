@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 class Settings(BaseSettings):
     GOOGLE_CLIENT_ID: str = "YOUR_GOOGLE_CLIENT_ID"
@@ -7,6 +7,9 @@ class Settings(BaseSettings):
     REDIRECT_URI: str = "http://localhost:8000/auth/callback"
     SESSION_SECRET_KEY: str = "super-secret-key-for-demonstration-change-me"
     DATABASE_URL: str = "sqlite:///./benchmark_reports.db"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_SQLITE_BUSY_TIMEOUT_SECONDS: float = 30.0
 
     SCOPES: List[str] = [
         "openid",
@@ -36,6 +39,68 @@ class Settings(BaseSettings):
     DEFAULT_START_DAYS_AGO: int = 28
     DEFAULT_END_DAYS_AGO: int = 1
 
+    GA_FETCH_CONCURRENCY: int = 8
+    GA_FETCH_TIMEOUT_SECONDS: float = 120.0
+    GA_PAGE_SIZE: int = 100000
+    GA_CLIENT_POOL_MAX_SIZE: int = 50
+    GA_CLIENT_POOL_IDLE_SECONDS: int = 900
+    GA_FETCH_PLAN_WINDOW_SECONDS: float = 0.05
+    GA_REQUESTS_PER_SECOND: float = 10.0
+    GA_REQUESTS_BURST: int = 20
+    GA_RETRY_MAX_ATTEMPTS: int = 5
+    GA_RETRY_BASE_DELAY_SECONDS: float = 1.0
+    GA_RETRY_MAX_DELAY_SECONDS: float = 32.0
+    GA_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    GA_CIRCUIT_RESET_SECONDS: float = 60.0
+    GA_QUOTA_MIN_REMAINING_TOKENS: int = 50
+
+    GA_CACHE_ENABLED: bool = True
+    GA_CACHE_PATH: str = "./ga_response_cache.db"
+    GA_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    GA_CACHE_FINAL_AFTER_DAYS: int = 3
+    GA_CACHE_FINAL_TTL_SECONDS: int = 90 * 24 * 3600
+    GA_CACHE_VOLATILE_TTL_SECONDS: int = 3600
+
+    INCREMENTAL_REFRESH_ENABLED: bool = True
+    METRIC_CUBE_PERSIST: bool = True
+
+    GA_PROPERTIES_CACHE_TTL_SECONDS: int = 300
+    GA_PROPERTIES_CACHE_MAX_STALE_SECONDS: int = 3600
+
+    BENCHMARK_JOB_WORKERS: int = 2
+    BENCHMARK_JOB_FLUSH_SECONDS: float = 1.0
+    BENCHMARK_JOB_STALE_SECONDS: int = 120
+    BENCHMARK_JOB_RETENTION_SECONDS: int = 24 * 3600
+
+    ROLLING_WINDOW_MAX_DAYS: int = 730
+    AUTO_REFRESH_SCHEDULER_ENABLED: bool = False
+    AUTO_REFRESH_POLL_SECONDS: int = 300
+    AUTO_REFRESH_WINDOW_START_HOUR: int = 2
+    AUTO_REFRESH_WINDOW_HOURS: float = 4.0
+    AUTO_REFRESH_CONCURRENCY: int = 2
+    AUTO_REFRESH_JITTER_SECONDS: float = 30.0
+
+    MY_BENCHMARKS_PAGE_SIZE: int = 25
+
+    REPORT_API_MAX_PAGE_SIZE: int = 50000
+    REPORT_API_ENCODED_CACHE_BYTES: int = 64 * 1024 * 1024
+    JSON_CODEC: str = "auto"
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+
+    COMPILE_SCSS_ON_STARTUP: bool = True
+    MIGRATE_ON_STARTUP: bool = True
+    MIGRATION_LOCK_FILE: str = "./.migrations.lock"
+
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None
+
+    SLOW_REQUEST_THRESHOLD_SECONDS: float = 2.0
+    PROFILING_ADMIN_EMAILS: List[str] = []
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_PATHS: List[str] = ["/benchmarks/report/", "/benchmarks/new"]
+    PROFILE_DIR: str = "./profiles"
+    PROFILE_MAX_FILES: int = 50
+
     class Config:
         env_file = ".env"
         env_file_encoding = 'utf-8'
@@ -1,112 +1,374 @@
-import json
+import asyncio
+import time
 from datetime import datetime
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from .database import BenchmarkReportDB
-
-def json_serializer(obj: Any) -> str:
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    raise TypeError(f"Type {type(obj)} not serializable")
-
-def create_benchmark_report(
-    db: Session,
+from typing import Callable, List, Optional, Dict, Any, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy import delete, desc, func, select, tuple_, update
+import pandas as pd
+from . import json_codec
+from .database import (
+    BenchmarkReportDB,
+    ReportPropertyDB,
+    REPORT_PROPERTY_ROLE_BENCHMARK,
+    REPORT_PROPERTY_ROLE_CLIENT
+)
+import pyarrow as pa
+from .report_storage import encode_report_rows, decode_report_rows, decode_report_dataframe, decode_report_table, rows_to_table
+from .report_aggregates import build_report_aggregates
+from .metric_cube import MetricCube, decode_metric_cube, encode_metric_cube
+from .config import settings
+from .metrics import AGGREGATION_SECONDS, DB_WRITE_SECONDS, SERIALIZATION_SECONDS, SERIALIZED_BYTES
+
+# Kolommen waaruit de aggregaten worden berekend. CPU-werk gebeurt in een thread op
+# een kopie van deze waarden; het ORM object wordt alleen op de event loop aangepast.
+_REPORT_DATA_COLUMNS = (
+    "client_a_property_id", "benchmark_property_ids_json", "metrics_used", "dimensions_used",
+    "benchmark_data_json", "benchmark_data_arrow", "metric_cube_arrow", "rolling_window_days"
+)
+
+def _report_columns(db_report: BenchmarkReportDB) -> Dict[str, Any]:
+    return {name: getattr(db_report, name) for name in _REPORT_DATA_COLUMNS}
+
+def _assign_columns(db_report: BenchmarkReportDB, columns: Dict[str, Any]) -> None:
+    for name, value in columns.items():
+        setattr(db_report, name, value)
+
+def _aggregate_columns(report: Dict[str, Any]) -> Dict[str, Any]:
+    """Gematerialiseerde aggregaten (en row_count) voor de kolomwaarden in `report`."""
+    benchmark_ids = json_codec.loads(report["benchmark_property_ids_json"]) if report["benchmark_property_ids_json"] else []
+    df = _report_dataframe(report["benchmark_data_arrow"], report["benchmark_data_json"])
+    with AGGREGATION_SECONDS.time(stage="report"):
+        aggregates = build_report_aggregates(
+            df, report["client_a_property_id"], benchmark_ids,
+            json_codec.loads(report["metrics_used"]), json_codec.loads(report["dimensions_used"]),
+            metric_cube=_report_metric_cube(report["metric_cube_arrow"], report["dimensions_used"])
+        )
+    columns: Dict[str, Any] = {"row_count": len(df)}
+    if aggregates is None:
+        columns.update(kpis_json=None, trend_data_json=None, dimension_data_json=None, period_start=None, period_end=None)
+        return columns
+    started = time.perf_counter()
+    columns["kpis_json"] = json_codec.dumps_str(aggregates["kpis"])
+    columns["trend_data_json"] = json_codec.dumps_str(aggregates["trend_data"])
+    columns["dimension_data_json"] = json_codec.dumps_str(aggregates["dimension_data"])
+    SERIALIZATION_SECONDS.observe(time.perf_counter() - started, format="json")
+    SERIALIZED_BYTES.observe(
+        len(columns["kpis_json"]) + len(columns["trend_data_json"]) + len(columns["dimension_data_json"]), format="json"
+    )
+    columns["period_start"] = aggregates["period_start"]
+    columns["period_end"] = aggregates["period_end"]
+    return columns
+
+def _encode_measured(encode: Callable[[Any], bytes], value: Any, storage_format: str) -> bytes:
+    started = time.perf_counter()
+    data = encode(value)
+    SERIALIZATION_SECONDS.observe(time.perf_counter() - started, format=storage_format)
+    SERIALIZED_BYTES.observe(len(data), format=storage_format)
+    return data
+
+def _encode_metric_cube(metric_cube: Optional[MetricCube]) -> Optional[bytes]:
+    if metric_cube is None or not settings.METRIC_CUBE_PERSIST:
+        return None
+    return _encode_measured(encode_metric_cube, metric_cube, "arrow_cube")
+
+def _build_benchmark_report(
     title: str,
     client_a_property_id: Optional[str],
     benchmark_property_ids: Optional[List[str]],
     metrics_used: List[str],
     dimensions_used: List[str],
     benchmark_results_flat_json: List[Dict[str, Any]],
-    user_email: Optional[str]
-) -> BenchmarkReportDB:
+    user_email: Optional[str],
+    rolling_window_days: Optional[int] = None,
+    metric_cube: Optional[MetricCube] = None
+) -> Dict[str, Any]:
+    """Kolomwaarden van een nieuw rapport, inclusief geëncodeerde data en aggregaten."""
+    benchmark_ids_json_str = json_codec.dumps_str(benchmark_property_ids) if benchmark_property_ids else None
 
-    benchmark_ids_json_str = json.dumps(benchmark_property_ids) if benchmark_property_ids else None
-
-    all_props = []
-    if client_a_property_id:
-        all_props.append(client_a_property_id)
-    if benchmark_property_ids:
-        all_props.extend(benchmark_property_ids)
-    legacy_property_ids_used = ",".join(all_props) if all_props else None
-
-    db_report = BenchmarkReportDB(
+    columns = dict(
         title=title,
         client_a_property_id=client_a_property_id,
         benchmark_property_ids_json=benchmark_ids_json_str,
-        property_ids_used=legacy_property_ids_used,
-        metrics_used=json.dumps(metrics_used),
-        dimensions_used=json.dumps(dimensions_used),
-        benchmark_data_json=json.dumps(benchmark_results_flat_json, default=json_serializer),
-        generated_by_email=user_email
+        metrics_used=json_codec.dumps_str(metrics_used),
+        dimensions_used=json_codec.dumps_str(dimensions_used),
+        benchmark_data_json=None,
+        benchmark_data_arrow=_encode_measured(encode_report_rows, benchmark_results_flat_json, "arrow"),
+        metric_cube_arrow=_encode_metric_cube(metric_cube),
+        generated_by_email=user_email,
+        rolling_window_days=rolling_window_days or None
+    )
+    columns.update(_aggregate_columns(columns))
+    return columns
+
+async def create_benchmark_report(
+    db: AsyncSession,
+    title: str,
+    client_a_property_id: Optional[str],
+    benchmark_property_ids: Optional[List[str]],
+    metrics_used: List[str],
+    dimensions_used: List[str],
+    benchmark_results_flat_json: List[Dict[str, Any]],
+    user_email: Optional[str],
+    rolling_window_days: Optional[int] = None,
+    metric_cube: Optional[MetricCube] = None
+) -> BenchmarkReportDB:
+    # Encoderen en aggregeren is CPU-werk en gebeurt buiten de event loop.
+    columns = await asyncio.to_thread(
+        _build_benchmark_report, title, client_a_property_id, benchmark_property_ids,
+        metrics_used, dimensions_used, benchmark_results_flat_json, user_email, rolling_window_days,
+        metric_cube
     )
-    db.add(db_report)
-    db.commit()
-    db.refresh(db_report)
+    db_report = BenchmarkReportDB(**columns)
+    with DB_WRITE_SECONDS.time(operation="create"):
+        db.add(db_report)
+        await db.flush()
+        await _sync_report_properties(db, db_report)
+        await db.commit()
+    await db.refresh(db_report)
     return db_report
 
-def get_benchmark_report_by_uuid(db: Session, report_uuid: str) -> Optional[BenchmarkReportDB]:
-    return db.query(BenchmarkReportDB).filter(BenchmarkReportDB.report_uuid == report_uuid).first()
+def _report_property_links(db_report: BenchmarkReportDB) -> List[Tuple[str, str]]:
+    links = []
+    if db_report.client_a_property_id:
+        links.append((db_report.client_a_property_id, REPORT_PROPERTY_ROLE_CLIENT))
+    benchmark_ids = json_codec.loads(db_report.benchmark_property_ids_json) if db_report.benchmark_property_ids_json else []
+    links.extend((prop_id, REPORT_PROPERTY_ROLE_BENCHMARK) for prop_id in benchmark_ids)
+    return list(dict.fromkeys(links))
 
-def get_benchmark_reports_by_user_email(db: Session, user_email: str) -> List[BenchmarkReportDB]:
-    return db.query(BenchmarkReportDB).filter(BenchmarkReportDB.generated_by_email == user_email).order_by(desc(BenchmarkReportDB.updated_at)).all()
+async def _sync_report_properties(db: AsyncSession, db_report: BenchmarkReportDB) -> None:
+    """Schrijft de report_properties rijen opnieuw op basis van het rapport (binnen de lopende transactie)."""
+    await db.execute(delete(ReportPropertyDB).where(ReportPropertyDB.report_id == db_report.id))
+    db.add_all([
+        ReportPropertyDB(report_id=db_report.id, property_id=prop_id, role=role)
+        for prop_id, role in _report_property_links(db_report)
+    ])
 
-def update_benchmark_report(
-    db: Session,
-    report_uuid: str,
+async def get_reports_using_property(
+    db: AsyncSession,
+    property_id: str,
+    role: Optional[str] = None,
+    user_email: Optional[str] = None
+) -> List[Any]:
+    """(id, report_uuid, title, generated_by_email, updated_at, role) van alle rapporten
+    die `property_id` gebruiken, via de index op report_properties."""
+    query = (
+        select(
+            BenchmarkReportDB.id, BenchmarkReportDB.report_uuid, BenchmarkReportDB.title,
+            BenchmarkReportDB.generated_by_email, BenchmarkReportDB.updated_at, ReportPropertyDB.role
+        )
+        .join(ReportPropertyDB, ReportPropertyDB.report_id == BenchmarkReportDB.id)
+        .where(ReportPropertyDB.property_id == property_id)
+        .order_by(desc(BenchmarkReportDB.updated_at), desc(BenchmarkReportDB.id))
+    )
+    if role is not None:
+        query = query.where(ReportPropertyDB.role == role)
+    if user_email is not None:
+        query = query.where(BenchmarkReportDB.generated_by_email == user_email)
+    return list((await db.execute(query)).all())
+
+def get_report_rows(db_report: BenchmarkReportDB) -> List[Dict[str, Any]]:
+    if db_report.benchmark_data_arrow is not None:
+        return decode_report_rows(db_report.benchmark_data_arrow)
+    return json_codec.loads(db_report.benchmark_data_json) if db_report.benchmark_data_json else []
+
+def get_report_table(db_report: BenchmarkReportDB) -> pa.Table:
+    if db_report.benchmark_data_arrow is not None:
+        return decode_report_table(db_report.benchmark_data_arrow)
+    return rows_to_table(json_codec.loads(db_report.benchmark_data_json) if db_report.benchmark_data_json else [])
+
+def _report_metric_cube(metric_cube_arrow: Optional[bytes], dimensions_used: str) -> Optional[MetricCube]:
+    if metric_cube_arrow is None:
+        return None
+    return decode_metric_cube(metric_cube_arrow, ["date"] + json_codec.loads(dimensions_used))
+
+def get_report_metric_cube(db_report: BenchmarkReportDB) -> Optional[MetricCube]:
+    return _report_metric_cube(db_report.metric_cube_arrow, db_report.dimensions_used)
+
+def _report_dataframe(benchmark_data_arrow: Optional[bytes], benchmark_data_json: Optional[str]) -> pd.DataFrame:
+    if benchmark_data_arrow is not None:
+        return decode_report_dataframe(benchmark_data_arrow)
+    return pd.DataFrame(json_codec.loads(benchmark_data_json) if benchmark_data_json else [])
+
+def get_report_dataframe(db_report: BenchmarkReportDB) -> pd.DataFrame:
+    return _report_dataframe(db_report.benchmark_data_arrow, db_report.benchmark_data_json)
+
+async def materialize_report_aggregates(db: AsyncSession, db_report: BenchmarkReportDB) -> BenchmarkReportDB:
+    """Vult ontbrekende aggregaten aan voor rapporten die vóór de materialisatie zijn opgeslagen,
+    zonder `updated_at` te wijzigen."""
+    _assign_columns(db_report, await asyncio.to_thread(_aggregate_columns, _report_columns(db_report)))
+    db_report.updated_at = db_report.updated_at
+    flag_modified(db_report, "updated_at")
+    await db.commit()
+    await db.refresh(db_report)
+    return db_report
+
+async def get_benchmark_report_by_uuid(db: AsyncSession, report_uuid: str) -> Optional[BenchmarkReportDB]:
+    result = await db.execute(select(BenchmarkReportDB).filter(BenchmarkReportDB.report_uuid == report_uuid))
+    return result.scalars().first()
+
+# Alleen wat het overzicht toont; de rapportdata en aggregaten blijven in de database.
+REPORT_SUMMARY_COLUMNS = (
+    BenchmarkReportDB.id, BenchmarkReportDB.report_uuid, BenchmarkReportDB.title,
+    BenchmarkReportDB.created_at, BenchmarkReportDB.updated_at, BenchmarkReportDB.row_count,
+    BenchmarkReportDB.period_start, BenchmarkReportDB.period_end,
+    BenchmarkReportDB.rolling_window_days, BenchmarkReportDB.auto_refresh_error
+)
+
+async def get_benchmark_report_summaries_by_user_email(
+    db: AsyncSession,
     user_email: str,
-    title: Optional[str] = None,
-    client_a_property_id: Optional[str] = None,
-    benchmark_property_ids: Optional[List[str]] = None,
-    metrics_used: Optional[List[str]] = None,
-    dimensions_used: Optional[List[str]] = None,
-    benchmark_results_flat_json: Optional[List[Dict[str, Any]]] = None
-) -> Optional[BenchmarkReportDB]:
-    db_report = db.query(BenchmarkReportDB).filter(
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None
+) -> Tuple[List[Any], Optional[Tuple[datetime, int]]]:
+    """Eén pagina rapport-samenvattingen, nieuwste eerst. `after` is de
+    (updated_at, id) van de laatste rij van de vorige pagina; geeft ook die sleutel
+    voor de volgende pagina terug (None op de laatste pagina)."""
+    query = (
+        select(*REPORT_SUMMARY_COLUMNS)
+        .where(BenchmarkReportDB.generated_by_email == user_email)
+        .order_by(desc(BenchmarkReportDB.updated_at), desc(BenchmarkReportDB.id))
+        .limit(limit + 1)
+    )
+    if after is not None:
+        query = query.where(tuple_(BenchmarkReportDB.updated_at, BenchmarkReportDB.id) < tuple_(*after))
+    rows = list((await db.execute(query)).all())
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1].updated_at, rows[-1].id)
+
+async def count_benchmark_reports_by_user_email(db: AsyncSession, user_email: str) -> int:
+    result = await db.execute(select(func.count()).where(BenchmarkReportDB.generated_by_email == user_email))
+    return result.scalar_one()
+
+async def get_reports_due_for_refresh(db: AsyncSession, now: datetime) -> List[Any]:
+    """(id, next_refresh_at, peer_set) van rapporten met een rollend venster die aan de
+    beurt zijn of nog geen moment hebben gekregen. Rapporten met dezelfde `peer_set`
+    (eigenaar, properties, dimensies en venster) vragen dezelfde GA data op."""
+    result = await db.execute(
+        select(
+            BenchmarkReportDB.id, BenchmarkReportDB.next_refresh_at,
+            BenchmarkReportDB.generated_by_email, BenchmarkReportDB.client_a_property_id,
+            BenchmarkReportDB.benchmark_property_ids_json, BenchmarkReportDB.dimensions_used,
+            BenchmarkReportDB.rolling_window_days
+        )
+        .filter(BenchmarkReportDB.rolling_window_days.isnot(None))
+        .filter((BenchmarkReportDB.next_refresh_at.is_(None)) | (BenchmarkReportDB.next_refresh_at <= now))
+        .order_by(BenchmarkReportDB.next_refresh_at)
+    )
+    return [(row[0], row[1], tuple(row[2:])) for row in result.all()]
+
+async def claim_report_refresh(
+    db: AsyncSession, report_id: int, expected_next_refresh_at: Optional[datetime], next_refresh_at: datetime
+) -> bool:
+    """Verzet `next_refresh_at` alleen als geen ander proces dat al deed; zo ververst
+    precies één worker het rapport."""
+    condition = (
+        BenchmarkReportDB.next_refresh_at.is_(None) if expected_next_refresh_at is None
+        else BenchmarkReportDB.next_refresh_at == expected_next_refresh_at
+    )
+    result = await db.execute(
+        update(BenchmarkReportDB)
+        .where(BenchmarkReportDB.id == report_id, condition)
+        .values(next_refresh_at=next_refresh_at, updated_at=BenchmarkReportDB.updated_at)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+async def set_auto_refresh_error(db: AsyncSession, report_id: int, error: Optional[str]) -> None:
+    await db.execute(
+        update(BenchmarkReportDB)
+        .where(BenchmarkReportDB.id == report_id)
+        .values(auto_refresh_error=error, updated_at=BenchmarkReportDB.updated_at)
+    )
+    await db.commit()
+
+async def _get_owned_report(db: AsyncSession, report_uuid: str, user_email: str) -> Optional[BenchmarkReportDB]:
+    result = await db.execute(select(BenchmarkReportDB).filter(
         BenchmarkReportDB.report_uuid == report_uuid,
         BenchmarkReportDB.generated_by_email == user_email
-    ).first()
-
-    if not db_report:
-        return None
+    ))
+    return result.scalars().first()
 
+def _report_update_columns(
+    report: Dict[str, Any],
+    title: Optional[str],
+    client_a_property_id: Optional[str],
+    benchmark_property_ids: Optional[List[str]],
+    metrics_used: Optional[List[str]],
+    dimensions_used: Optional[List[str]],
+    benchmark_results_flat_json: Optional[List[Dict[str, Any]]],
+    rolling_window_days: Optional[int] = None,
+    metric_cube: Optional[MetricCube] = None
+) -> Dict[str, Any]:
+    """Gewijzigde kolomwaarden voor een update van het rapport met kolomwaarden `report`."""
+    changes: Dict[str, Any] = {}
     if title is not None:
-        db_report.title = title
+        changes["title"] = title
+
+    # 0 zet het rollende venster uit; None laat het ongemoeid.
+    if rolling_window_days is not None and (rolling_window_days or None) != report["rolling_window_days"]:
+        changes["rolling_window_days"] = rolling_window_days or None
+        changes["next_refresh_at"] = None
+        changes["auto_refresh_error"] = None
 
     if client_a_property_id is not None:
-        db_report.client_a_property_id = client_a_property_id
+        changes["client_a_property_id"] = client_a_property_id
     if benchmark_property_ids is not None:
-        db_report.benchmark_property_ids_json = json.dumps(benchmark_property_ids)
-
-    all_props_update = []
-    current_client_a = client_a_property_id if client_a_property_id is not None else db_report.client_a_property_id
-    current_benchmark_list = benchmark_property_ids if benchmark_property_ids is not None else (json.loads(db_report.benchmark_property_ids_json) if db_report.benchmark_property_ids_json else [])
-
-    if current_client_a:
-        all_props_update.append(current_client_a)
-    if current_benchmark_list:
-        all_props_update.extend(current_benchmark_list)
-    db_report.property_ids_used = ",".join(all_props_update) if all_props_update else None
+        changes["benchmark_property_ids_json"] = json_codec.dumps_str(benchmark_property_ids)
 
     if metrics_used is not None:
-        db_report.metrics_used = json.dumps(metrics_used)
+        changes["metrics_used"] = json_codec.dumps_str(metrics_used)
     if dimensions_used is not None:
-        db_report.dimensions_used = json.dumps(dimensions_used)
+        changes["dimensions_used"] = json_codec.dumps_str(dimensions_used)
     if benchmark_results_flat_json is not None:
-        db_report.benchmark_data_json = json.dumps(benchmark_results_flat_json, default=json_serializer)
+        changes["benchmark_data_arrow"] = _encode_measured(encode_report_rows, benchmark_results_flat_json, "arrow")
+        changes["benchmark_data_json"] = None
+        # Een cube hoort bij precies deze rijen; zonder nieuwe cube vervalt de oude.
+        changes["metric_cube_arrow"] = _encode_metric_cube(metric_cube)
+
+    if any(arg is not None for arg in (client_a_property_id, benchmark_property_ids, metrics_used, dimensions_used, benchmark_results_flat_json)):
+        changes.update(_aggregate_columns({**report, **changes}))
+    return changes
+
+async def update_benchmark_report(
+    db: AsyncSession,
+    report_uuid: str,
+    user_email: str,
+    title: Optional[str] = None,
+    client_a_property_id: Optional[str] = None,
+    benchmark_property_ids: Optional[List[str]] = None,
+    metrics_used: Optional[List[str]] = None,
+    dimensions_used: Optional[List[str]] = None,
+    benchmark_results_flat_json: Optional[List[Dict[str, Any]]] = None,
+    rolling_window_days: Optional[int] = None,
+    metric_cube: Optional[MetricCube] = None
+) -> Optional[BenchmarkReportDB]:
+    db_report = await _get_owned_report(db, report_uuid, user_email)
 
-    db.commit()
-    db.refresh(db_report)
+    if not db_report:
+        return None
+
+    changes = await asyncio.to_thread(
+        _report_update_columns, _report_columns(db_report), title, client_a_property_id, benchmark_property_ids,
+        metrics_used, dimensions_used, benchmark_results_flat_json, rolling_window_days, metric_cube
+    )
+    _assign_columns(db_report, changes)
+    with DB_WRITE_SECONDS.time(operation="update"):
+        if client_a_property_id is not None or benchmark_property_ids is not None:
+            await _sync_report_properties(db, db_report)
+        await db.commit()
+    await db.refresh(db_report)
     return db_report
 
-def delete_benchmark_report(db: Session, report_uuid: str, user_email: str) -> bool:
-    db_report = db.query(BenchmarkReportDB).filter(
-        BenchmarkReportDB.report_uuid == report_uuid,
-        BenchmarkReportDB.generated_by_email == user_email
-    ).first()
+async def delete_benchmark_report(db: AsyncSession, report_uuid: str, user_email: str) -> bool:
+    db_report = await _get_owned_report(db, report_uuid, user_email)
 
     if db_report:
-        db.delete(db_report)
-        db.commit()
+        # SQLite handhaaft ON DELETE CASCADE alleen met PRAGMA foreign_keys.
+        await db.execute(delete(ReportPropertyDB).where(ReportPropertyDB.report_id == db_report.id))
+        await db.delete(db_report)
+        await db.commit()
         return True
     return False
@@ -1,7 +1,9 @@
+import importlib.util
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, LargeBinary, Boolean, Index, ForeignKey
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
 from .config import settings
@@ -15,6 +17,30 @@ if DATABASE_URL.startswith("sqlite"):
 engine = create_engine(DATABASE_URL, **engine_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _async_database_url(url: str) -> str:
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:") or url.startswith("postgres:"):
+        # Niet in requirements.txt (de standaard is SQLite): direct duidelijk falen.
+        if importlib.util.find_spec("asyncpg") is None:
+            raise RuntimeError("DATABASE_URL wijst naar PostgreSQL, maar de async driver ontbreekt: pip install asyncpg")
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+ASYNC_DATABASE_URL = _async_database_url(DATABASE_URL)
+
+# Elke worker heeft een eigen pool; totaal aantal connecties is dus
+# workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+async_engine_args = {"pool_pre_ping": True}
+if ASYNC_DATABASE_URL.startswith("sqlite"):
+    async_engine_args["connect_args"] = {"timeout": settings.DB_SQLITE_BUSY_TIMEOUT_SECONDS}
+else:
+    async_engine_args["pool_size"] = settings.DB_POOL_SIZE
+    async_engine_args["max_overflow"] = settings.DB_MAX_OVERFLOW
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **async_engine_args)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 class BenchmarkReportDB(Base):
@@ -28,13 +54,62 @@ class BenchmarkReportDB(Base):
     client_a_property_id = Column(String, nullable=True)
     benchmark_property_ids_json = Column(Text, nullable=True)
 
-    property_ids_used = Column(Text, nullable=True)
-
     metrics_used = Column(Text)
     dimensions_used = Column(Text)
 
     benchmark_data_json = Column(Text)
+    benchmark_data_arrow = Column(LargeBinary, nullable=True)
+    # Waarden per property (zie metric_cube.py) voor mediaan/kwartielen in de benchmark.
+    metric_cube_arrow = Column(LargeBinary, nullable=True)
+
+    kpis_json = Column(Text, nullable=True)
+    trend_data_json = Column(Text, nullable=True)
+    dimension_data_json = Column(Text, nullable=True)
+    period_start = Column(DateTime, nullable=True)
+    period_end = Column(DateTime, nullable=True)
     generated_by_email = Column(String, nullable=True, index=True)
+    row_count = Column(Integer, nullable=True)
+
+    # Rollend venster: de laatste N dagen t/m gisteren, automatisch ververst.
+    rolling_window_days = Column(Integer, nullable=True)
+    next_refresh_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    auto_refresh_error = Column(Text, nullable=True)
+
+    # Keyset paginering van "Mijn Benchmarks": WHERE generated_by_email ORDER BY updated_at, id.
+    __table_args__ = (Index("ix_benchmark_reports_owner_updated", "generated_by_email", "updated_at", "id"),)
+
+REPORT_PROPERTY_ROLE_CLIENT = "client"
+REPORT_PROPERTY_ROLE_BENCHMARK = "benchmark"
+
+class ReportPropertyDB(Base):
+    """Welke GA properties een rapport gebruikt, als klant of als benchmark."""
+    __tablename__ = "report_properties"
+    report_id = Column(Integer, ForeignKey("benchmark_reports.id", ondelete="CASCADE"), primary_key=True)
+    property_id = Column(String, primary_key=True)
+    role = Column(String, primary_key=True)
+
+    __table_args__ = (Index("ix_report_properties_property_role", "property_id", "role"),)
+
+class BenchmarkJobDB(Base):
+    __tablename__ = "benchmark_jobs"
+    job_id = Column(String, primary_key=True)
+    user_email = Column(String, nullable=False, index=True)
+    title = Column(String, nullable=False)
+    report_uuid = Column(String, nullable=True)
+    is_update = Column(Boolean, nullable=False, default=False)
+    status = Column(String, nullable=False)
+    error = Column(Text, nullable=True)
+    progress_json = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class UserCredentialsDB(Base):
+    __tablename__ = "user_credentials"
+    user_email = Column(String, primary_key=True)
+    refresh_token_encrypted = Column(Text, nullable=False)
+    scopes = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
 def create_db_and_tables():
     Base.metadata.create_all(bind=engine)
@@ -1,9 +1,6 @@
-from sqlalchemy.orm import Session
-from .database import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import AsyncSessionLocal
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
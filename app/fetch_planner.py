@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+from .single_flight import Publish, SingleFlight
+
+T = TypeVar("T")
+
+# (metrics van de gezamenlijke query, publish) -> resultaat van die query
+GroupFetch = Callable[[List[str], Publish], Awaitable[T]]
+# (resultaat of tussenresultaat, gevraagde metrics) -> alleen die metrics
+MetricSlicer = Callable[[Any, List[str]], Any]
+
+
+def plan_metric_groups(metric_sets: List[List[str]], max_metrics: int) -> List[List[str]]:
+    """Verdeelt aanvragen over zo min mogelijk queries van hooguit `max_metrics`
+    metrics (first fit, grootste eerst). Elke aanvraag valt volledig in één query;
+    geeft per aanvraag de metrics van zijn query terug."""
+    groups: List[List[str]] = []
+    assigned: Dict[int, int] = {}
+    for index in sorted(range(len(metric_sets)), key=lambda i: -len(set(metric_sets[i]))):
+        metrics = metric_sets[index]
+        for group_index, group in enumerate(groups):
+            if len(set(group) | set(metrics)) <= max_metrics:
+                group.extend(m for m in metrics if m not in group)
+                assigned[index] = group_index
+                break
+        else:
+            groups.append(list(dict.fromkeys(metrics)))
+            assigned[index] = len(groups) - 1
+    return [groups[assigned[index]] for index in range(len(metric_sets))]
+
+
+class _PendingBatch:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.metric_sets: List[List[str]] = []
+        self.planned: asyncio.Future = loop.create_future()
+
+
+class MetricFetchPlanner:
+    """Voegt aanvragen voor dezelfde data (property, dimensies, datumbereik) met
+    verschillende metrics samen tot queries over de vereniging van hun metrics.
+
+    Aanvragen met dezelfde `base_key` die binnen `window_seconds` binnenkomen worden
+    samen ingepland. Elke query loopt via single-flight, dus wie dezelfde query nodig
+    heeft deelt hem; het resultaat wordt per aanvrager teruggesneden tot zijn eigen
+    metrics. Met één aanvraag is de query precies die aanvraag."""
+
+    def __init__(self, name: str, max_metrics: int, window_seconds: float):
+        self.max_metrics = max_metrics
+        self.window_seconds = max(0.0, window_seconds)
+        self.flights = SingleFlight(name)
+        self._pending: Dict[Hashable, _PendingBatch] = {}
+        self.merged_requests = 0
+
+    def _plan(self, base_key: Hashable, batch: _PendingBatch) -> None:
+        if self._pending.get(base_key) is batch:
+            del self._pending[base_key]
+        plan = plan_metric_groups(batch.metric_sets, self.max_metrics)
+        self.merged_requests += len(plan) - len({tuple(group) for group in plan})
+        batch.planned.set_result(plan)
+
+    async def _group_metrics(self, base_key: Hashable, metric_names: List[str]) -> List[str]:
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(base_key)
+        if batch is None or batch.loop is not loop:
+            batch = _PendingBatch(loop)
+            self._pending[base_key] = batch
+            loop.call_later(self.window_seconds, self._plan, base_key, batch)
+        index = len(batch.metric_sets)
+        batch.metric_sets.append(list(metric_names))
+        # Afgeschermd: een annulerende aanvrager mag de planning van de rest niet breken.
+        plan = await asyncio.shield(batch.planned)
+        return plan[index]
+
+    async def run(
+        self,
+        base_key: Hashable,
+        metric_names: List[str],
+        fetch: GroupFetch,
+        slice_metrics: MetricSlicer,
+        slice_result: MetricSlicer,
+        on_item: Optional[Callable[[Any], None]] = None
+    ) -> Any:
+        group_metrics = await self._group_metrics(base_key, metric_names)
+        on_group_item = None
+        if on_item:
+            on_group_item = on_item if group_metrics == metric_names else (
+                lambda item: on_item(slice_metrics(item, metric_names))
+            )
+        result = await self.flights.run(
+            (base_key, tuple(group_metrics)),
+            lambda publish: fetch(group_metrics, publish),
+            on_group_item
+        )
+        return result if group_metrics == metric_names else slice_result(result, metric_names)
@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import json_codec
+from .config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ga_response_days (
+    scope TEXT NOT NULL,
+    property_id TEXT NOT NULL,
+    dimensions_key TEXT NOT NULL,
+    metrics_key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    is_final INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    last_accessed REAL NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    PRIMARY KEY (scope, property_id, dimensions_key, metrics_key, day)
+);
+CREATE INDEX IF NOT EXISTS ix_ga_response_days_last_accessed ON ga_response_days (last_accessed);
+"""
+
+
+def _set_key(names: Iterable[str]) -> str:
+    return ",".join(sorted(set(names)))
+
+
+def is_final_day(day: date, today: Optional[date] = None) -> bool:
+    """Een dag is definitief zodra de GA verwerkingsperiode voorbij is."""
+    today = today or date.today()
+    return day <= today - timedelta(days=settings.GA_CACHE_FINAL_AFTER_DAYS)
+
+
+class GAResponseCache:
+    """Lokale SQLite cache van GA Data API antwoorden, per dag opgeslagen.
+
+    Definitieve dagen hebben een lange TTL, dagen binnen de GA verwerkingsperiode
+    een korte. Bij overschrijden van `max_bytes` worden de minst recent gebruikte
+    dagen verwijderd.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def get_days(
+        self,
+        scope: str,
+        property_id: str,
+        dimension_names: List[str],
+        metric_names: List[str],
+        days: List[date]
+    ) -> Dict[date, Any]:
+        if not days:
+            return {}
+        now = time.time()
+        key = (scope, property_id, _set_key(dimension_names), _set_key(metric_names))
+        day_strs = [d.isoformat() for d in days]
+        hits: Dict[date, Any] = {}
+        with self._lock:
+            conn = self._connection()
+            placeholders = ",".join("?" * len(day_strs))
+            rows = conn.execute(
+                f"SELECT day, payload FROM ga_response_days "
+                f"WHERE scope = ? AND property_id = ? AND dimensions_key = ? AND metrics_key = ? "
+                f"AND expires_at > ? AND day IN ({placeholders})",
+                (*key, now, *day_strs)
+            ).fetchall()
+            if rows:
+                conn.execute(
+                    f"UPDATE ga_response_days SET last_accessed = ? "
+                    f"WHERE scope = ? AND property_id = ? AND dimensions_key = ? AND metrics_key = ? "
+                    f"AND day IN ({placeholders})",
+                    (now, *key, *day_strs)
+                )
+                conn.commit()
+        for day_str, payload in rows:
+            hits[date.fromisoformat(day_str)] = json_codec.loads(payload)
+        return hits
+
+    def put_days(
+        self,
+        scope: str,
+        property_id: str,
+        dimension_names: List[str],
+        metric_names: List[str],
+        payload_by_day: Dict[date, Any]
+    ) -> None:
+        if not payload_by_day:
+            return
+        now = time.time()
+        today = date.today()
+        key = (scope, property_id, _set_key(dimension_names), _set_key(metric_names))
+        records: List[Tuple] = []
+        for day, payload in payload_by_day.items():
+            encoded = json_codec.dumps_str(payload)
+            final = is_final_day(day, today)
+            ttl = settings.GA_CACHE_FINAL_TTL_SECONDS if final else settings.GA_CACHE_VOLATILE_TTL_SECONDS
+            records.append((*key, day.isoformat(), encoded, int(final), now + ttl, now, len(encoded)))
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO ga_response_days "
+                "(scope, property_id, dimensions_key, metrics_key, day, payload, is_final, expires_at, last_accessed, size_bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                records
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM ga_response_days WHERE expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM ga_response_days").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Ruim op tot 90% van het maximum zodat niet bij elke schrijfactie opnieuw geëvict wordt.
+        target = int(self.max_bytes * 0.9)
+        to_free = total - target
+        freed = 0
+        victims = []
+        for rowid, size in conn.execute("SELECT rowid, size_bytes FROM ga_response_days ORDER BY last_accessed ASC"):
+            victims.append((rowid,))
+            freed += size
+            if freed >= to_free:
+                break
+        conn.executemany("DELETE FROM ga_response_days WHERE rowid = ?", victims)
+
+
+ga_response_cache: Optional[GAResponseCache] = (
+    GAResponseCache(settings.GA_CACHE_PATH, settings.GA_CACHE_MAX_BYTES) if settings.GA_CACHE_ENABLED else None
+)
+
+
+def days_in_range(start_date_str: str, end_date_str: str) -> Optional[List[date]]:
+    """Geeft alle dagen in het bereik terug, of None als het bereik geen absolute
+    datums bevat (bijv. GA's 'yesterday' of 'NdaysAgo')."""
+    try:
+        start = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
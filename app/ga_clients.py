@@ -0,0 +1,63 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Tuple
+
+from google.oauth2.credentials import Credentials
+from google.analytics.admin_v1beta import AnalyticsAdminServiceClient
+from google.analytics.data_v1beta import BetaAnalyticsDataClient
+
+from .config import settings
+
+
+def _credentials_key(credentials: Credentials) -> str:
+    # De refresh token identificeert een login; de access token wisselt bij elke refresh.
+    identity = f"{credentials.client_id}:{credentials.refresh_token or credentials.token}"
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+class GAClientPool:
+    """Houdt per set credentials één warme API client (en dus één kanaal) vast.
+
+    Clients die langer dan `idle_seconds` niet gebruikt zijn vallen uit de pool, en
+    boven `max_size` verdwijnt de minst recent gebruikte client. Uitgezette clients
+    worden niet expliciet gesloten: een lopende benchmark kan ze nog gebruiken, het
+    kanaal sluit zodra de laatste referentie verdwijnt.
+    """
+
+    def __init__(self, factory: Callable[..., Any], max_size: int, idle_seconds: float):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._clients: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, credentials: Credentials) -> Any:
+        key = _credentials_key(credentials)
+        now = time.monotonic()
+        with self._lock:
+            for stale_key in [k for k, (_, last_used) in self._clients.items() if now - last_used > self.idle_seconds]:
+                del self._clients[stale_key]
+
+            if key in self._clients:
+                client = self._clients.pop(key)[0]
+            else:
+                client = self.factory(credentials=credentials)
+            self._clients[key] = (client, now)
+
+            while len(self._clients) > max(1, self.max_size):
+                self._clients.popitem(last=False)
+        return client
+
+    def discard(self, credentials: Credentials) -> None:
+        with self._lock:
+            self._clients.pop(_credentials_key(credentials), None)
+
+
+ga_data_client_pool = GAClientPool(
+    BetaAnalyticsDataClient, settings.GA_CLIENT_POOL_MAX_SIZE, settings.GA_CLIENT_POOL_IDLE_SECONDS
+)
+ga_admin_client_pool = GAClientPool(
+    AnalyticsAdminServiceClient, settings.GA_CLIENT_POOL_MAX_SIZE, settings.GA_CLIENT_POOL_IDLE_SECONDS
+)
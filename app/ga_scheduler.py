@@ -0,0 +1,220 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+
+from google.api_core import exceptions as google_exceptions
+from google.analytics.data_v1beta import BetaAnalyticsDataClient
+from google.analytics.data_v1beta.types import RunReportRequest
+
+from .config import settings
+from .metrics import GA_REQUEST_RETRIES, GA_REQUEST_SECONDS, GA_REQUESTS_IN_FLIGHT
+
+# Tijdelijke fouten waarbij een nieuwe poging zin heeft.
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+
+# De dagelijkse GA quota gaat om middernacht Pacific Time opnieuw in.
+_GA_QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+class GAQuotaError(Exception):
+    """De property heeft (bijna) geen quota meer of staat tijdelijk uit na herhaalde fouten."""
+
+
+class TokenBucket:
+    """Verdeelt requests gelijkmatig: `rate` per seconde met pieken tot `capacity`.
+    `reserve()` geeft terug hoe lang de aanvrager moet wachten; er wordt niet onder
+    de lock gewacht, zodat de bucket in elke event loop en thread bruikbaar is."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class CircuitBreaker:
+    """Zet een property na `failure_threshold` opeenvolgende requests die ook na alle
+    nieuwe pogingen tijdelijk faalden `reset_seconds` uit. Daarna mag er één
+    proefrequest door (half-open)."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Geeft een eventuele proef vrij zonder de toestand te veranderen."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._failures >= self.failure_threshold or self._opened_at is not None:
+                self._opened_at = time.monotonic()
+
+
+class PropertyQuota:
+    """Laatst gemelde `property_quota` van een property."""
+
+    def __init__(self):
+        self.tokens_per_hour: Optional[int] = None
+        self.tokens_per_day: Optional[int] = None
+        self.tokens_per_project_per_hour: Optional[int] = None
+        self.concurrent_requests: Optional[int] = None
+        self.observed_at = 0.0
+        self.observed_day = None
+
+    def update(self, property_quota: Any) -> None:
+        def remaining(field: str) -> Optional[int]:
+            status = getattr(property_quota, field, None)
+            return status.remaining if status is not None and (status.consumed or status.remaining) else None
+        self.tokens_per_hour = remaining("tokens_per_hour")
+        self.tokens_per_day = remaining("tokens_per_day")
+        self.tokens_per_project_per_hour = remaining("tokens_per_project_per_hour")
+        self.concurrent_requests = remaining("concurrent_requests")
+        self.observed_at = time.monotonic()
+        self.observed_day = datetime.now(_GA_QUOTA_TIMEZONE).date()
+
+    def exhausted(self, min_remaining: int) -> Optional[str]:
+        """Reden om geen request meer te sturen, of None."""
+        if self.observed_day == datetime.now(_GA_QUOTA_TIMEZONE).date() and self.tokens_per_day is not None \
+                and self.tokens_per_day < min_remaining:
+            return f"dagquota bijna op ({self.tokens_per_day} tokens over)"
+        if time.monotonic() - self.observed_at < 3600:
+            for label, remaining in (("uurquota", self.tokens_per_hour), ("projectquota per uur", self.tokens_per_project_per_hour)):
+                if remaining is not None and remaining < min_remaining:
+                    return f"{label} bijna op ({remaining} tokens over)"
+        return None
+
+    def as_dict(self) -> Dict[str, Optional[int]]:
+        return {
+            "tokens_per_hour": self.tokens_per_hour,
+            "tokens_per_day": self.tokens_per_day,
+            "tokens_per_project_per_hour": self.tokens_per_project_per_hour,
+            "concurrent_requests": self.concurrent_requests,
+        }
+
+
+class GARequestScheduler:
+    """Voert GA Data API requests uit met een token bucket voor het tempo, nieuwe
+    pogingen met exponentiële backoff en jitter bij tijdelijke fouten, een circuit
+    breaker per property en bewaking van de gemelde property quota."""
+
+    def __init__(self):
+        self.bucket = TokenBucket(settings.GA_REQUESTS_PER_SECOND, settings.GA_REQUESTS_BURST)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._quotas: Dict[str, PropertyQuota] = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, property_id: str) -> CircuitBreaker:
+        with self._lock:
+            return self._breakers.setdefault(property_id, CircuitBreaker(
+                settings.GA_CIRCUIT_FAILURE_THRESHOLD, settings.GA_CIRCUIT_RESET_SECONDS
+            ))
+
+    def _quota(self, property_id: str) -> PropertyQuota:
+        with self._lock:
+            return self._quotas.setdefault(property_id, PropertyQuota())
+
+    def quota_status(self, property_id: str) -> Dict[str, Optional[int]]:
+        return self._quota(property_id).as_dict()
+
+    @staticmethod
+    def _backoff_seconds(attempt: int) -> float:
+        # "Full jitter": willekeurig tussen 0 en de exponentieel groeiende bovengrens.
+        ceiling = min(settings.GA_RETRY_MAX_DELAY_SECONDS, settings.GA_RETRY_BASE_DELAY_SECONDS * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def run_report(self, data_client: BetaAnalyticsDataClient, request: RunReportRequest, executor: Executor) -> Any:
+        property_id = request.property
+        breaker = self._breaker(property_id)
+        quota = self._quota(property_id)
+        request.return_property_quota = True
+        loop = asyncio.get_running_loop()
+        max_attempts = max(1, settings.GA_RETRY_MAX_ATTEMPTS)
+
+        # Eén keer per request: een proef (half-open) houdt zo ook zijn nieuwe pogingen.
+        if not breaker.allow():
+            raise GAQuotaError(f"{property_id} tijdelijk overgeslagen na herhaalde GA fouten.")
+
+        try:
+            for attempt in range(max_attempts):
+                reason = quota.exhausted(settings.GA_QUOTA_MIN_REMAINING_TOKENS)
+                if reason:
+                    raise GAQuotaError(f"GA quota voor {property_id}: {reason}.")
+
+                delay = self.bucket.reserve()
+                if delay:
+                    await asyncio.sleep(delay)
+                started = time.perf_counter()
+                try:
+                    with GA_REQUESTS_IN_FLIGHT.track_inprogress():
+                        response = await loop.run_in_executor(executor, data_client.run_report, request)
+                except RETRYABLE_ERRORS as e:
+                    GA_REQUEST_SECONDS.observe(time.perf_counter() - started, outcome="retryable")
+                    if attempt + 1 >= max_attempts:
+                        # Pas een request dat al zijn pogingen opmaakte telt als fout.
+                        breaker.record_failure()
+                        raise
+                    GA_REQUEST_RETRIES.inc(error=type(e).__name__)
+                    backoff = self._backoff_seconds(attempt)
+                    print(f"WAARSCHUWING (ga_scheduler.py): {type(e).__name__} voor {property_id}, "
+                          f"poging {attempt + 2}/{max_attempts} over {backoff:.1f}s")
+                    await asyncio.sleep(backoff)
+                    continue
+                except Exception:
+                    GA_REQUEST_SECONDS.observe(time.perf_counter() - started, outcome="error")
+                    raise
+                GA_REQUEST_SECONDS.observe(time.perf_counter() - started, outcome="ok")
+                breaker.record_success()
+                if getattr(response, "property_quota", None) is not None:
+                    quota.update(response.property_quota)
+                return response
+        finally:
+            # Niet-tijdelijke fouten (bijv. geen toegang), quota en annuleren zeggen niets
+            # over de property zelf: de breaker blijft zoals hij was.
+            breaker.release()
+
+
+ga_request_scheduler = GARequestScheduler()
@@ -0,0 +1,65 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request
+
+from .compression import strip_encoding_suffix
+from .database import BenchmarkReportDB
+from .report_aggregates import AGGREGATES_VERSION
+from .styling import scss_source_hash
+
+
+def _templates_version() -> str:
+    # Een nieuwe deploy met gewijzigde templates mag geen oude 304 opleveren.
+    digest = hashlib.sha256()
+    for template in sorted(Path("app/templates").glob("*.html")):
+        digest.update(template.read_bytes())
+    # Pagina's verwijzen naar de gehashte CSS; nieuwe styling is ook een nieuwe versie.
+    digest.update(scss_source_hash().encode("utf-8"))
+    # Net zo voor een andere berekening van de KPI's en grafieken.
+    digest.update(AGGREGATES_VERSION.encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+TEMPLATES_VERSION = _templates_version()
+
+
+def _updated_at_utc(db_report: BenchmarkReportDB) -> Optional[datetime]:
+    updated_at = db_report.updated_at
+    if updated_at is None:
+        return None
+    return updated_at if updated_at.tzinfo else updated_at.replace(tzinfo=timezone.utc)
+
+
+def report_etag(db_report: BenchmarkReportDB, *variant: str) -> str:
+    """Sterke validator op basis van report_uuid + updated_at en de variant van de
+    representatie (query, formaat, gebruiker)."""
+    updated_at = _updated_at_utc(db_report)
+    parts = [db_report.report_uuid, updated_at.isoformat() if updated_at else "", *variant]
+    return '"' + hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def is_not_modified(request: Request, etag: str, db_report: BenchmarkReportDB) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in {strip_encoding_suffix(tag) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    updated_at = _updated_at_utc(db_report)
+    if if_modified_since and updated_at:
+        try:
+            return updated_at.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cache_headers(etag: str, db_report: BenchmarkReportDB) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    updated_at = _updated_at_utc(db_report)
+    if updated_at:
+        headers["Last-Modified"] = format_datetime(updated_at.astimezone(timezone.utc), usegmt=True)
+    return headers
@@ -0,0 +1,187 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, select
+
+from . import json_codec
+from .config import settings
+from .database import AsyncSessionLocal, BenchmarkJobDB
+from .metrics import BENCHMARK_JOBS_IN_FLIGHT
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class BenchmarkJob:
+    """Status van één benchmark generatie: per property de voortgang, het aantal
+    opgehaalde rijen en een eventuele fout."""
+
+    def __init__(self, user_email: str, title: str, property_ids: List[str], report_uuid: Optional[str] = None):
+        self.job_id = str(uuid.uuid4())
+        self.user_email = user_email
+        self.title = title
+        self.report_uuid = report_uuid
+        self.is_update = report_uuid is not None
+        self.status = JOB_QUEUED
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.properties: Dict[str, Dict[str, Any]] = {
+            prop_id: {"status": JOB_QUEUED, "rows_fetched": 0, "error": None} for prop_id in property_ids
+        }
+
+    def property_progress(self, property_id: str, rows: int, finished: bool, error: Optional[str]) -> None:
+        progress = self.properties.setdefault(property_id, {"status": JOB_QUEUED, "rows_fetched": 0, "error": None})
+        progress["rows_fetched"] += rows
+        if finished:
+            progress["status"] = JOB_FAILED if error else JOB_DONE
+            progress["error"] = error
+        else:
+            progress["status"] = JOB_RUNNING
+
+    def to_db(self) -> BenchmarkJobDB:
+        return BenchmarkJobDB(
+            job_id=self.job_id, user_email=self.user_email, title=self.title,
+            report_uuid=self.report_uuid, is_update=self.is_update, status=self.status,
+            error=self.error, progress_json=json_codec.dumps_str(self.properties),
+            created_at=self.created_at, updated_at=datetime.now(timezone.utc), finished_at=self.finished_at
+        )
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite geeft datums zonder tijdzone terug.
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def job_status(db_job: BenchmarkJobDB) -> Dict[str, Any]:
+    properties = json_codec.loads(db_job.progress_json) if db_job.progress_json else {}
+    status, error = db_job.status, db_job.error
+    # Een onafgeronde job zonder recente flush is met zijn proces verdwenen.
+    updated_at = _as_utc(db_job.updated_at)
+    stale_after = timedelta(seconds=settings.BENCHMARK_JOB_STALE_SECONDS)
+    if status in (JOB_QUEUED, JOB_RUNNING) and updated_at and datetime.now(timezone.utc) - updated_at > stale_after:
+        status, error = JOB_FAILED, "Job onderbroken, probeer het opnieuw."
+    created_at, finished_at = _as_utc(db_job.created_at), _as_utc(db_job.finished_at)
+    return {
+        "job_id": db_job.job_id,
+        "title": db_job.title,
+        "status": status,
+        "error": error,
+        "report_uuid": db_job.report_uuid,
+        "is_update": db_job.is_update,
+        "created_at": created_at.isoformat() if created_at else None,
+        "finished_at": finished_at.isoformat() if finished_at else None,
+        "properties_done": sum(1 for p in properties.values() if p["status"] in (JOB_DONE, JOB_FAILED)),
+        "properties_total": len(properties),
+        "rows_fetched": sum(p["rows_fetched"] for p in properties.values()),
+        "properties": properties,
+    }
+
+
+JobWork = Callable[[BenchmarkJob], Awaitable[Optional[str]]]
+
+
+class BenchmarkJobQueue:
+    """Wachtrij met een vast aantal workers in het eigen proces. De POST handler
+    zet een job in de wachtrij en keert direct terug. De status staat in de
+    tabel benchmark_jobs zodat elke web worker hem kan tonen; het proces dat de
+    job uitvoert schrijft de voortgang elke `BENCHMARK_JOB_FLUSH_SECONDS` weg."""
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._active: Dict[str, BenchmarkJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _ensure_workers(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.create_task(self._worker()))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        return self._queue
+
+    async def _save(self, job: BenchmarkJob) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.merge(job.to_db())
+                await db.commit()
+        except Exception as e:
+            print(f"WAARSCHUWING (jobs.py): Status van job {job.job_id} niet opgeslagen: {e}")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.BENCHMARK_JOB_FLUSH_SECONDS)
+            for job in list(self._active.values()):
+                await self._save(job)
+
+    async def _worker(self) -> None:
+        while True:
+            job, work = await self._queue.get()
+            try:
+                await self._run(job, work)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: BenchmarkJob, work: JobWork) -> None:
+        job.status = JOB_RUNNING
+        await self._save(job)
+        try:
+            with BENCHMARK_JOBS_IN_FLIGHT.track_inprogress():
+                report_uuid = await work(job)
+            if report_uuid:
+                job.report_uuid = report_uuid
+                job.status = JOB_DONE
+                # Properties die volledig uit opgeslagen data kwamen, kregen geen voortgang.
+                for progress in job.properties.values():
+                    if progress["status"] in (JOB_QUEUED, JOB_RUNNING):
+                        progress["status"] = JOB_DONE
+            else:
+                job.status = JOB_FAILED
+                job.error = job.error or "Rapport kon niet worden opgeslagen."
+        except ValueError as e:
+            job.status = JOB_FAILED
+            job.error = str(e)
+        except Exception as e:
+            print(f"ERROR (jobs.py): Onverwachte fout in benchmark job {job.job_id}: {e}")
+            job.status = JOB_FAILED
+            job.error = f"Onverwachte serverfout: {e}"
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            await self._save(job)
+            self._active.pop(job.job_id, None)
+
+    async def submit(self, job: BenchmarkJob, work: JobWork) -> BenchmarkJob:
+        retention_cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.BENCHMARK_JOB_RETENTION_SECONDS)
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(BenchmarkJobDB).where(BenchmarkJobDB.updated_at < retention_cutoff))
+            db.add(job.to_db())
+            await db.commit()
+        self._active[job.job_id] = job
+        self._ensure_workers().put_nowait((job, work))
+        return job
+
+    async def get_status(self, job_id: str, user_email: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not user_email:
+            return None
+        # Voortgang van jobs in dit proces is actueler dan de laatste flush.
+        active_job = self._active.get(job_id)
+        if active_job:
+            return job_status(active_job.to_db()) if active_job.user_email == user_email else None
+        async with AsyncSessionLocal() as db:
+            db_job = (await db.execute(
+                select(BenchmarkJobDB).where(BenchmarkJobDB.job_id == job_id, BenchmarkJobDB.user_email == user_email)
+            )).scalar_one_or_none()
+        return job_status(db_job) if db_job else None
+
+
+benchmark_job_queue = BenchmarkJobQueue(settings.BENCHMARK_JOB_WORKERS)
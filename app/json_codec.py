@@ -0,0 +1,81 @@
+"""Eén JSON codec voor opslag, API responses en template data.
+
+Gebruikt orjson als dat geïnstalleerd is (datetimes, numpy getallen en dataclasses
+worden native geëncodeerd) en anders de standaard `json` module met een fallback
+voor datetimes. Kies expliciet met `JSON_CODEC=orjson|stdlib`.
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+
+import numpy as np
+from fastapi.responses import JSONResponse, Response
+
+from .config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _stdlib_default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+class _StdlibCodec:
+    name = "stdlib"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, default=_stdlib_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: Any) -> Any:
+        return json.loads(data)
+
+
+class _OrjsonCodec:
+    name = "orjson"
+    _options = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, option=self._options)
+
+    def loads(self, data: Any) -> Any:
+        return orjson.loads(data)
+
+
+def _select_codec(preference: str):
+    if preference == "stdlib":
+        return _StdlibCodec()
+    if preference == "orjson" and orjson is None:
+        raise RuntimeError("JSON_CODEC=orjson maar orjson is niet geïnstalleerd.")
+    return _OrjsonCodec() if orjson is not None else _StdlibCodec()
+
+
+codec = _select_codec(settings.JSON_CODEC)
+
+
+def dumps(obj: Any) -> bytes:
+    return codec.dumps(obj)
+
+
+def dumps_str(obj: Any) -> str:
+    return codec.dumps(obj).decode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    return codec.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EncodedJSONResponse(Response):
+    """Response voor JSON die al als bytes klaarligt (bijv. in een worker thread geëncodeerd)."""
+    media_type = "application/json"
@@ -1,49 +1,64 @@
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Request, Response
 from starlette.middleware.sessions import SessionMiddleware
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
 from .database import create_db_and_tables
 from .config import settings
 from .routes import ui, api
-from .styling import compile_scss
-
-from alembic.config import Config
-from alembic import command
-import traceback
-
-compile_scss()
-
-print("="*50)
-print("CONTROLEREN EN UITVOEREN DATABASE MIGRATIES")
-print("="*50)
-try:
-    alembic_cfg = Config("alembic.ini")
-    alembic_cfg.set_main_option("script_location", "alembic")
-    command.upgrade(alembic_cfg, "head")
-    print("✅ Migraties succesvol gecontroleerd en uitgevoerd.")
-except Exception as e:
-    print("❌ FOUT TIJDENS UITVOEREN VAN DATABASE MIGRATIES:")
-    print(traceback.format_exc())
-finally:
-    print("="*50)
-    print("Applicatie wordt nu verder opgestart...")
+from .styling import CachedStaticFiles, compile_scss
+from .migrations import run_migrations
+from .auto_refresh import run_auto_refresh_scheduler
+from .compression import CompressionMiddleware
+from .request_timing import RequestTimingMiddleware
+from .json_codec import FastJSONResponse
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+
+import asyncio
+import secrets
+from contextlib import asynccontextmanager, suppress
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Niet bij import: reloads en imports (tests, CLI) hoeven hier niet op te wachten.
+    if settings.COMPILE_SCSS_ON_STARTUP:
+        await asyncio.to_thread(compile_scss)
+    if settings.MIGRATE_ON_STARTUP:
+        await asyncio.to_thread(run_migrations)
+
+    auto_refresh_task = None
+    if settings.AUTO_REFRESH_SCHEDULER_ENABLED:
+        auto_refresh_task = asyncio.create_task(run_auto_refresh_scheduler())
+    try:
+        yield
+    finally:
+        if auto_refresh_task:
+            auto_refresh_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await auto_refresh_task
 
 
 app = FastAPI(
     title="Google Analytics Benchmark Tool",
     description="Een tool om benchmarks te genereren en op te slaan van Google Analytics data.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
 
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+# Binnen de SessionMiddleware, zodat de profiler de ingelogde gebruiker kent.
+app.add_middleware(RequestTimingMiddleware)
+
 app.add_middleware(
     SessionMiddleware,
     secret_key=settings.SESSION_SECRET_KEY
 )
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
 
 app.include_router(ui.router, tags=["User Interface"])
 app.include_router(api.router, tags=["API"])
@@ -52,6 +67,16 @@ app.include_router(api.router, tags=["API"])
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics", tags=["API Health"], include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404)
+    if settings.METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Ongeldige metrics token.")
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE, headers={"Cache-Control": "no-store"})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
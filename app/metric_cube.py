@@ -0,0 +1,308 @@
+"""Per-property metric cube en benchmark statistieken.
+
+De cube bewaart de waarden van elke property afzonderlijk in compacte vorm: één
+rij per (property, sleutel) met een property-code, een sleutel-code en een
+float64 rij met alle metrics. Sleutels zijn (date, *dimensies), zoals in de
+rapportdata. Daarop worden per gewenst niveau (totaal, per dag, per dimensie)
+in één keer mediaan, kwartielen, getrimd gemiddelde en gewogen gemiddelde
+berekend, zonder opnieuw naar GA te gaan.
+
+Ratio-metrics (engagementRate, averageSessionDuration, ...) zijn niet optelbaar;
+die worden gewogen met hun noemer-metric (`RATIO_METRIC_WEIGHTS`) samengevoegd.
+"""
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from .report_storage import decode_report_table, encode_table
+
+# Ratio-metric -> optelbare metric waarmee hij gewogen wordt.
+RATIO_METRIC_WEIGHTS: Dict[str, str] = {
+    "engagementRate": "sessions",
+    "bounceRate": "sessions",
+    "averageSessionDuration": "sessions",
+    "purchaserRate": "totalUsers",
+    "averageRevenuePerUser": "totalUsers",
+    "averagePurchaseRevenue": "transactions",
+}
+
+PROPERTY_COLUMN = "__property"
+DEFAULT_TRIM_FRACTION = 0.1
+
+
+class MetricCube(NamedTuple):
+    property_ids: List[str]
+    dimension_names: List[str]
+    keys: List[Tuple]
+    metric_names: List[str]
+    property_codes: np.ndarray
+    key_codes: np.ndarray
+    values: np.ndarray
+
+    @property
+    def num_cells(self) -> int:
+        return self.values.shape[0]
+
+
+class CubeRollup(NamedTuple):
+    """Dichte (properties x groepen x metrics) matrix op een grover niveau.
+    Ontbrekende optelbare waarden zijn 0, ontbrekende ratio's NaN."""
+    property_ids: List[str]
+    group_names: List[str]
+    group_keys: List[Tuple]
+    metric_names: List[str]
+    values: np.ndarray
+
+
+def metrics_with_weights(metric_names: List[str], max_metrics: int) -> List[str]:
+    """De gevraagde metrics, aangevuld met de weegmetrics van ratio-metrics zolang
+    het maximum per GA request dat toelaat."""
+    result = list(metric_names)
+    for metric in metric_names:
+        weight = RATIO_METRIC_WEIGHTS.get(metric)
+        if weight and weight not in result and len(result) < max_metrics:
+            result.append(weight)
+    return result
+
+
+def _weight_positions(metric_names: List[str]) -> Dict[int, int]:
+    return {
+        i: metric_names.index(RATIO_METRIC_WEIGHTS[m])
+        for i, m in enumerate(metric_names)
+        if m in RATIO_METRIC_WEIGHTS and RATIO_METRIC_WEIGHTS[m] in metric_names
+    }
+
+
+def _ratio_mask(metric_names: List[str]) -> np.ndarray:
+    return np.array([m in RATIO_METRIC_WEIGHTS for m in metric_names], dtype=bool)
+
+
+def build_metric_cube(
+    property_blocks: Dict[str, Iterable[Tuple[List[Tuple], np.ndarray]]],
+    dimension_names: List[str],
+    metric_names: List[str]
+) -> MetricCube:
+    """Bouwt de cube uit per property (sleutels, metric-matrix) blokken. Dubbele
+    sleutels binnen een property worden samengevoegd."""
+    property_ids = list(property_blocks)
+    key_index: Dict[Tuple, int] = {}
+    prop_code_blocks, key_code_blocks, value_blocks = [], [], [np.zeros((0, len(metric_names)), dtype=np.float64)]
+    for prop_code, blocks in enumerate(property_blocks.values()):
+        for keys, values in blocks:
+            key_code_blocks.append(np.fromiter(
+                (key_index.setdefault(key, len(key_index)) for key in keys), dtype=np.intp, count=len(keys)
+            ))
+            prop_code_blocks.append(np.full(len(keys), prop_code, dtype=np.intp))
+            value_blocks.append(values)
+    cube = MetricCube(
+        property_ids, list(dimension_names), list(key_index), list(metric_names),
+        np.concatenate(prop_code_blocks) if prop_code_blocks else np.zeros(0, dtype=np.intp),
+        np.concatenate(key_code_blocks) if key_code_blocks else np.zeros(0, dtype=np.intp),
+        np.vstack(value_blocks)
+    )
+    return _combine_duplicate_cells(cube)
+
+
+def _aggregate(
+    values: np.ndarray, targets: np.ndarray, size: int, metric_names: List[str], additive_divisor: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Voegt rijen samen per doel-index. Optelbare metrics worden opgeteld (en
+    eventueel door `additive_divisor` gedeeld), ratio's gewogen met hun noemer of,
+    zonder noemer, gemiddeld. Geeft (waarden, aantal rijen per doel) terug."""
+    num_metrics = len(metric_names)
+    sums = np.zeros((size, num_metrics), dtype=np.float64)
+    np.add.at(sums, targets, values)
+    counts = np.bincount(targets, minlength=size).astype(np.float64)
+    result = sums / additive_divisor if additive_divisor else sums.copy()
+
+    ratio = _ratio_mask(metric_names)
+    if ratio.any():
+        with np.errstate(invalid="ignore", divide="ignore"):
+            plain_means = sums[:, ratio] / counts[:, None]
+        result[:, ratio] = plain_means
+        for ratio_pos, weight_pos in _weight_positions(metric_names).items():
+            numerator = np.bincount(targets, weights=values[:, ratio_pos] * values[:, weight_pos], minlength=size)
+            denominator = np.bincount(targets, weights=values[:, weight_pos], minlength=size)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                weighted = numerator / denominator
+            result[:, ratio_pos] = np.where(denominator > 0, weighted, result[:, ratio_pos])
+    return result, counts
+
+
+def _combine_duplicate_cells(cube: MetricCube) -> MetricCube:
+    if cube.num_cells == 0:
+        return cube
+    num_keys = max(len(cube.keys), 1)
+    cells = cube.property_codes * num_keys + cube.key_codes
+    unique_cells, targets = np.unique(cells, return_inverse=True)
+    if len(unique_cells) == cube.num_cells:
+        return cube
+    values, _ = _aggregate(cube.values, targets, len(unique_cells), cube.metric_names)
+    return cube._replace(
+        property_codes=unique_cells // num_keys, key_codes=unique_cells % num_keys, values=values
+    )
+
+
+def _group_codes(cube: MetricCube, group_by: Sequence[str]) -> Tuple[List[Tuple], np.ndarray]:
+    positions = [cube.dimension_names.index(name) for name in group_by]
+    group_index: Dict[Tuple, int] = {}
+    key_to_group = np.fromiter(
+        (group_index.setdefault(tuple(key[p] for p in positions), len(group_index)) for key in cube.keys),
+        dtype=np.intp, count=len(cube.keys)
+    )
+    return list(group_index), key_to_group
+
+
+def _property_selection(cube: MetricCube, property_ids: Optional[Sequence[str]]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """(geselecteerde ids, masker op de cellen, nieuwe property-code per cel)."""
+    if property_ids is None:
+        return list(cube.property_ids), np.ones(cube.num_cells, dtype=bool), cube.property_codes
+    selected = [p for p in property_ids if p in cube.property_ids]
+    remap = np.full(len(cube.property_ids), -1, dtype=np.intp)
+    for new_code, prop_id in enumerate(selected):
+        remap[cube.property_ids.index(prop_id)] = new_code
+    new_codes = remap[cube.property_codes] if cube.num_cells else cube.property_codes
+    mask = new_codes >= 0
+    return selected, mask, new_codes[mask]
+
+
+def rollup(cube: MetricCube, group_by: Sequence[str] = (), property_ids: Optional[Sequence[str]] = None) -> CubeRollup:
+    """Aggregeert de cube naar `group_by` (een subset van de dimensies, bijv. []
+    voor totalen of ["date"] per dag) voor de gegeven properties."""
+    selected, mask, prop_codes = _property_selection(cube, property_ids)
+    group_keys, key_to_group = _group_codes(cube, group_by)
+    if not group_keys and not group_by:
+        group_keys = [()]
+    num_groups, num_metrics = len(group_keys), len(cube.metric_names)
+    targets = prop_codes * num_groups + key_to_group[cube.key_codes[mask]]
+    values, counts = _aggregate(cube.values[mask], targets, len(selected) * num_groups, cube.metric_names)
+    values[counts == 0] = np.where(_ratio_mask(cube.metric_names), np.nan, 0.0)
+    return CubeRollup(selected, list(group_by), group_keys, cube.metric_names, values.reshape(len(selected), num_groups, num_metrics))
+
+
+def benchmark_key_means(cube: MetricCube, peer_ids: Sequence[str]) -> Tuple[List[Tuple], np.ndarray]:
+    """Benchmark per sleutel zoals in de rapportdata: optelbare metrics als som
+    gedeeld door het aantal peers, ratio's gewogen over de peers met data."""
+    selected, mask, _ = _property_selection(cube, peer_ids)
+    key_codes = cube.key_codes[mask]
+    used_keys, targets = np.unique(key_codes, return_inverse=True)
+    values, _ = _aggregate(cube.values[mask], targets, len(used_keys), cube.metric_names, additive_divisor=max(len(selected), 1))
+    return [cube.keys[k] for k in used_keys], values
+
+
+def benchmark_statistics(
+    rolled: CubeRollup, peer_ids: Sequence[str], trim_fraction: float = DEFAULT_TRIM_FRACTION
+) -> Dict[str, np.ndarray]:
+    """Verdeling over de peers per (groep, metric), alles uit één sortering:
+    count, mean, median, p25, p75, trimmed_mean en weighted_mean (ratio's gewogen
+    met hun noemer, optelbare metrics gelijk aan mean)."""
+    peer_positions = [rolled.property_ids.index(p) for p in peer_ids if p in rolled.property_ids]
+    peer_values = rolled.values[peer_positions]
+    sorted_values = np.sort(peer_values, axis=0)
+    valid = ~np.isnan(sorted_values)
+    n = valid.sum(axis=0)
+    filled = np.where(valid, sorted_values, 0.0)
+    cumulative = np.concatenate([np.zeros((1,) + filled.shape[1:]), np.cumsum(filled, axis=0)])
+
+    def at(array: np.ndarray, index: np.ndarray) -> np.ndarray:
+        return np.take_along_axis(array, index[None], axis=0)[0]
+
+    def quantile(q: float) -> np.ndarray:
+        if not len(peer_positions):
+            return np.full(n.shape, np.nan)
+        position = q * np.maximum(n - 1, 0)
+        low = np.floor(position).astype(np.intp)
+        high = np.ceil(position).astype(np.intp)
+        fraction = position - low
+        return at(filled, low) * (1 - fraction) + at(filled, high) * fraction
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        trim = np.floor(n * trim_fraction).astype(np.intp)
+        mean = at(cumulative, n) / n
+        trimmed_mean = (at(cumulative, n - trim) - at(cumulative, trim)) / (n - 2 * trim)
+
+        weighted_mean = mean.copy()
+        for ratio_pos, weight_pos in _weight_positions(rolled.metric_names).items():
+            ratio_values = peer_values[:, :, ratio_pos]
+            weights = np.where(np.isnan(ratio_values), 0.0, peer_values[:, :, weight_pos])
+            weight_total = weights.sum(axis=0)
+            weighted = np.nansum(ratio_values * weights, axis=0) / weight_total
+            weighted_mean[:, ratio_pos] = np.where(weight_total > 0, weighted, mean[:, ratio_pos])
+
+    stats = {
+        "count": n, "mean": mean, "median": quantile(0.5), "p25": quantile(0.25), "p75": quantile(0.75),
+        "trimmed_mean": trimmed_mean, "weighted_mean": weighted_mean,
+    }
+    empty = n == 0
+    for name, values in stats.items():
+        if name != "count":
+            values[empty] = np.nan
+    return stats
+
+
+def statistics_by_metric(rolled: CubeRollup, peer_ids: Sequence[str], metric_names: Sequence[str]) -> List[Dict[str, Any]]:
+    """Statistieken per groep als lijst dicts: {group: {...}, metric: {stat: waarde}}."""
+    stats = benchmark_statistics(rolled, peer_ids)
+    result = []
+    for g, group_key in enumerate(rolled.group_keys):
+        entry: Dict[str, Any] = {"group": dict(zip(rolled.group_names, group_key))}
+        for metric in metric_names:
+            if metric not in rolled.metric_names:
+                continue
+            m = rolled.metric_names.index(metric)
+            entry[metric] = {
+                name: (int(values[g, m]) if name == "count" else (None if np.isnan(values[g, m]) else float(values[g, m])))
+                for name, values in stats.items()
+            }
+        result.append(entry)
+    return result
+
+
+def slice_days(cube: MetricCube, keep_day: Any) -> MetricCube:
+    """Alleen de cellen waarvan `keep_day(date)` waar is."""
+    date_pos = cube.dimension_names.index("date")
+    keep_key = np.fromiter((bool(keep_day(key[date_pos])) for key in cube.keys), dtype=bool, count=len(cube.keys))
+    mask = keep_key[cube.key_codes] if cube.num_cells else np.zeros(0, dtype=bool)
+    return cube._replace(property_codes=cube.property_codes[mask], key_codes=cube.key_codes[mask], values=cube.values[mask])
+
+
+def concat_cubes(first: MetricCube, second: MetricCube) -> Optional[MetricCube]:
+    """Voegt twee cubes met dezelfde dimensies en metrics samen (None als ze niet passen)."""
+    if first.dimension_names != second.dimension_names or set(first.metric_names) != set(second.metric_names):
+        return None
+    if first.metric_names != second.metric_names:
+        second = second._replace(
+            metric_names=first.metric_names,
+            values=second.values[:, [second.metric_names.index(m) for m in first.metric_names]]
+        )
+    blocks: Dict[str, List[Tuple[List[Tuple], np.ndarray]]] = {}
+    for cube in (first, second):
+        for code, prop_id in enumerate(cube.property_ids):
+            mask = cube.property_codes == code
+            blocks.setdefault(prop_id, []).append(([cube.keys[k] for k in cube.key_codes[mask]], cube.values[mask]))
+    return build_metric_cube(blocks, first.dimension_names, first.metric_names)
+
+
+def encode_metric_cube(cube: MetricCube) -> bytes:
+    """Lange Arrow tabel (property, dimensies, metrics), zelfde opslag als de rapportdata."""
+    columns: Dict[str, Any] = {PROPERTY_COLUMN: pa.array([cube.property_ids[c] for c in cube.property_codes], type=pa.string())}
+    for position, name in enumerate(cube.dimension_names):
+        columns[name] = pa.array([cube.keys[k][position] for k in cube.key_codes])
+    for position, name in enumerate(cube.metric_names):
+        columns[name] = pa.array(cube.values[:, position], type=pa.float64())
+    return encode_table(pa.table(columns))
+
+
+def decode_metric_cube(data: bytes, dimension_names: List[str]) -> MetricCube:
+    table = decode_report_table(data)
+    metric_names = [name for name in table.column_names if name != PROPERTY_COLUMN and name not in dimension_names]
+    property_ids, property_codes = np.unique(np.array(table.column(PROPERTY_COLUMN).to_pylist(), dtype=object), return_inverse=True)
+    cell_keys = list(zip(*[table.column(name).to_pylist() for name in dimension_names])) if dimension_names else [()] * table.num_rows
+    key_index: Dict[Tuple, int] = {}
+    key_codes = np.fromiter((key_index.setdefault(key, len(key_index)) for key in cell_keys), dtype=np.intp, count=len(cell_keys))
+    values = np.column_stack([table.column(name).to_numpy() for name in metric_names]) if metric_names else np.zeros((table.num_rows, 0))
+    return MetricCube(
+        [str(p) for p in property_ids], list(dimension_names), list(key_index), metric_names,
+        property_codes.astype(np.intp), key_codes, values.astype(np.float64)
+    )
@@ -0,0 +1,186 @@
+"""Prometheus metrics zonder extra dependency: counters, gauges en histogrammen
+in het geheugen van dit proces, als tekst (exposition format 0.0.4) op `/metrics`.
+
+Elke worker houdt zijn eigen waarden bij; Prometheus telt ze bij het scrapen per
+instance op. Labels bewust met weinig waarden (uitkomst, formaat), nooit per
+property of gebruiker.
+"""
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+ROW_BUCKETS = (0, 10, 100, 1000, 10000, 50000, 100000, 250000, 1000000)
+BYTE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 50 * 1024 ** 2, 100 * 1024 ** 2)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} verwacht labels {self.labelnames}, kreeg {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """De sample regels van deze metric in exposition format."""
+
+    def render(self) -> str:
+        documentation = self.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+        lines = [f"# HELP {self.name} {documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _ValueMetric(_Metric):
+    """Eén waarde per labelcombinatie (counter en gauge)."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(v)}" for key, v in items]
+
+
+class Counter(_ValueMetric):
+    kind = "counter"
+
+
+class Gauge(_ValueMetric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        if not labelnames:
+            self._values[()] = 0.0
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per labelcombinatie: tellingen per bucket (niet cumulatief), som.
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# --- GA ophalen ---
+GA_FETCH_SECONDS = Histogram(
+    "apigen_ga_property_fetch_seconds", "Duur van het ophalen van alle pagina's van één property.", ["outcome"]
+)
+GA_FETCH_ROWS = Histogram(
+    "apigen_ga_property_fetch_rows", "Aantal rijen dat één property opleverde.", buckets=ROW_BUCKETS
+)
+GA_FETCHES_IN_FLIGHT = Gauge("apigen_ga_property_fetches_in_flight", "Property fetches die nu lopen.")
+GA_REQUEST_SECONDS = Histogram(
+    "apigen_ga_request_seconds", "Duur van één run_report request naar de GA Data API.", ["outcome"]
+)
+GA_REQUESTS_IN_FLIGHT = Gauge("apigen_ga_requests_in_flight", "run_report requests die nu lopen.")
+GA_REQUEST_RETRIES = Counter("apigen_ga_request_retries_total", "Nieuwe pogingen na tijdelijke GA fouten.", ["error"])
+GA_DECODE_SECONDS = Histogram("apigen_ga_decode_seconds", "Omzetten van één GA antwoord naar een ReportPage.")
+
+# --- Benchmark opbouwen en opslaan ---
+AGGREGATION_SECONDS = Histogram(
+    "apigen_aggregation_seconds", "Aggregatie van benchmark data.", ["stage"]
+)
+SERIALIZATION_SECONDS = Histogram("apigen_serialization_seconds", "Serialiseren van rapportdata.", ["format"])
+SERIALIZED_BYTES = Histogram(
+    "apigen_serialized_bytes", "Grootte van geserialiseerde rapportdata.", ["format"], buckets=BYTE_BUCKETS
+)
+DB_WRITE_SECONDS = Histogram("apigen_db_write_seconds", "Wegschrijven van een rapport naar de database.", ["operation"])
+RENDER_SECONDS = Histogram("apigen_render_seconds", "Renderen van een HTML pagina.", ["template"])
+BENCHMARK_JOBS_IN_FLIGHT = Gauge("apigen_benchmark_jobs_in_flight", "Benchmark jobs die nu draaien.")
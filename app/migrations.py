@@ -0,0 +1,62 @@
+"""Database migraties als aparte stap: `python -m app.migrations`.
+
+Draai dit één keer per deploy vóór het starten van de workers. Met
+`MIGRATE_ON_STARTUP` doet elke worker het bij het opstarten zelf; een lock-bestand
+zorgt dan dat er maar één tegelijk migreert en de rest daarna alleen ziet dat de
+database al op head staat.
+"""
+import fcntl
+import traceback
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from .config import settings
+from .database import engine
+
+
+def _alembic_config() -> Config:
+    alembic_cfg = Config("alembic.ini")
+    alembic_cfg.set_main_option("script_location", "alembic")
+    # Dezelfde database als de app (en `_is_at_head`), niet de URL uit alembic.ini.
+    alembic_cfg.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+    return alembic_cfg
+
+
+def _is_at_head(alembic_cfg: Config) -> bool:
+    heads = set(ScriptDirectory.from_config(alembic_cfg).get_heads())
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    return current == heads
+
+
+def run_migrations() -> bool:
+    """Brengt de database naar head. Geeft False terug als migreren mislukte."""
+    alembic_cfg = _alembic_config()
+    try:
+        if _is_at_head(alembic_cfg):
+            print("INFO (migrations.py): Database staat al op de laatste migratie.")
+            return True
+        with open(settings.MIGRATION_LOCK_FILE, "w") as lock_file:
+            # Wacht tot een andere worker klaar is en controleer daarna opnieuw.
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if _is_at_head(alembic_cfg):
+                    print("INFO (migrations.py): Database is intussen door een ander proces gemigreerd.")
+                    return True
+                print("INFO (migrations.py): Database migraties uitvoeren...")
+                command.upgrade(alembic_cfg, "head")
+                print("✅ Migraties succesvol gecontroleerd en uitgevoerd.")
+                return True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    except Exception:
+        print("❌ FOUT TIJDENS UITVOEREN VAN DATABASE MIGRATIES:")
+        print(traceback.format_exc())
+        return False
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if run_migrations() else 1)
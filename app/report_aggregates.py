@@ -0,0 +1,115 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .config import settings
+from .metric_cube import RATIO_METRIC_WEIGHTS, MetricCube, rollup, statistics_by_metric
+
+# Ophogen als de berekening verandert: gecachte rapportpagina's worden dan ongeldig.
+AGGREGATES_VERSION = "2"
+
+
+def build_report_aggregates(
+    df: pd.DataFrame,
+    client_id: Optional[str],
+    benchmark_ids: Optional[List[str]],
+    metrics: List[str],
+    dimensions: List[str],
+    metric_cube: Optional[MetricCube] = None
+) -> Optional[Dict[str, Any]]:
+    """Berekent de KPI's, trends (dag/week/maand) en dimensie-uitsplitsingen van
+    het interactieve rapport. Geeft None terug als er geen data is. Met een metric
+    cube krijgt elke KPI ook de verdeling over de benchmark properties."""
+    if df.empty:
+        return None
+
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'])
+
+    client_df = df[df['group'] == client_id].copy()
+    benchmark_df = df[df['group'] == 'Benchmark'].copy()
+
+    # De Benchmark rijen zijn al gemiddelden per peer (zie benchmark_key_means):
+    # KPI's en grafieken tellen ze op zonder nogmaals te delen.
+    kpis = {}
+    for metric in metrics:
+        client_total = client_df[metric].sum()
+        bench_average = benchmark_df[metric].sum()
+
+        diff = ((client_total - bench_average) / bench_average * 100) if bench_average > 0 else 0
+
+        kpis[metric] = {
+            "client_value": float(client_total),
+            "bench_value": float(bench_average),
+            "diff_percentage": round(float(diff), 1)
+        }
+
+    if metric_cube is not None:
+        peer_ids = [prop_id for prop_id in metric_cube.property_ids if prop_id != client_id]
+        totals = rollup(metric_cube)
+        distribution = statistics_by_metric(totals, peer_ids, metrics)[0]
+        for metric in metrics:
+            if metric not in distribution:
+                continue
+            kpis[metric]["bench_distribution"] = distribution[metric]
+            # Ratio's zijn niet op te tellen: gebruik het gewogen totaal van de klant
+            # en het gewogen gemiddelde van de benchmark. Optelbare metrics houden de
+            # som van de Benchmark rijen; die is gelijk aan het gemiddelde van de
+            # totalen per peer (de "mean" van de verdeling).
+            if metric not in RATIO_METRIC_WEIGHTS:
+                continue
+            if client_id not in totals.property_ids or distribution[metric]["weighted_mean"] is None:
+                continue
+            client_value = float(totals.values[totals.property_ids.index(client_id), 0, totals.metric_names.index(metric)])
+            bench_value = distribution[metric]["weighted_mean"]
+            if np.isnan(client_value):
+                continue
+            diff = ((client_value - bench_value) / bench_value * 100) if bench_value > 0 else 0
+            kpis[metric].update({
+                "client_value": client_value, "bench_value": bench_value, "diff_percentage": round(float(diff), 1)
+            })
+
+    trend_data = {}
+    if 'date' in df.columns:
+        client_df_resample = client_df.set_index('date')
+        benchmark_df_resample = benchmark_df.set_index('date')
+
+        for metric in metrics:
+            trend_data[metric] = {}
+            for period, period_name in [('D', 'day'), ('W', 'week'), ('M', 'month')]:
+                client_resampled = client_df_resample[metric].resample(period).sum().reset_index()
+                benchmark_resampled = benchmark_df_resample[metric].resample(period).sum().reset_index()
+
+                trend_data[metric][period_name] = {
+                    "labels": client_resampled['date'].dt.strftime('%Y-%m-%d').tolist(),
+                    "client_data": client_resampled[metric].tolist(),
+                    "benchmark_data": benchmark_resampled[metric].tolist()
+                }
+
+    dimension_data = {}
+    dimensions_in_report = [d for d in dimensions if d != 'date']
+    for dim in dimensions_in_report:
+        if dim in df.columns:
+            for metric in metrics:
+                client_dim = client_df.groupby(dim)[metric].sum().reset_index()
+                bench_dim = benchmark_df.groupby(dim)[metric].sum().reset_index()
+
+                merged_df = pd.merge(client_dim, bench_dim, on=dim, how='outer', suffixes=('_client', '_bench')).fillna(0)
+
+                chart_key = f"{dim}_{metric}"
+                dimension_data[chart_key] = {
+                    "metric_title": settings.AVAILABLE_METRICS.get(metric, metric),
+                    "dimension_title": settings.AVAILABLE_DIMENSIONS.get(dim, dim),
+                    "labels": merged_df[dim].tolist(),
+                    "client_data": merged_df[metric + '_client'].tolist(),
+                    "benchmark_data": merged_df[metric + '_bench'].tolist()
+                }
+
+    return {
+        "kpis": kpis,
+        "trend_data": trend_data,
+        "dimension_data": dimension_data,
+        "period_start": df['date'].min().to_pydatetime(),
+        "period_end": df['date'].max().to_pydatetime()
+    }
@@ -0,0 +1,113 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Rapportdata wordt kolomsgewijs opgeslagen als Arrow IPC bestand: dimensie- en
+# groepskolommen dictionary-encoded, metrics als float64, gecomprimeerd met zstd.
+ARROW_COMPRESSION = "zstd"
+
+
+def _normalize_date(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+
+def rows_to_table(rows: List[Dict[str, Any]]) -> pa.Table:
+    if rows and any("date" in row for row in rows):
+        rows = [{**row, "date": _normalize_date(row.get("date"))} for row in rows]
+    return pa.Table.from_pylist(rows)
+
+
+def encode_report_rows(rows: List[Dict[str, Any]]) -> bytes:
+    return encode_table(rows_to_table(rows))
+
+
+def encode_table(table: pa.Table) -> bytes:
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(i, field.name, pc.dictionary_encode(table.column(i)))
+
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=ARROW_COMPRESSION)
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _read_table(data: bytes) -> pa.Table:
+    table = pa.ipc.open_file(pa.py_buffer(data)).read_all()
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    return table
+
+
+def report_row_count(data: bytes) -> int:
+    reader = pa.ipc.open_file(pa.py_buffer(data))
+    return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def decode_report_table(data: bytes) -> pa.Table:
+    return _read_table(data)
+
+
+def _table_rows(table: pa.Table) -> List[Dict[str, Any]]:
+    rows = table.to_pylist()
+    for row in rows:
+        if isinstance(row.get("date"), datetime):
+            row["date"] = row["date"].isoformat()
+    return rows
+
+
+def decode_report_rows(data: bytes) -> List[Dict[str, Any]]:
+    """Geeft de rijen terug in dezelfde vorm als de oude JSON opslag (datums als ISO string)."""
+    return _table_rows(_read_table(data))
+
+
+def filter_report_table(
+    table: pa.Table,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    groups: Optional[List[str]] = None,
+    dimension_filters: Optional[List[Tuple[str, str]]] = None,
+    metrics: Optional[List[str]] = None,
+    metric_names: Optional[List[str]] = None
+) -> pa.Table:
+    """Filtert op datumbereik (inclusief), groep en dimensiewaarden en houdt van de
+    metrics in `metric_names` alleen de subset `metrics` over."""
+    mask = None
+
+    def combine(condition):
+        nonlocal mask
+        mask = condition if mask is None else pc.and_(mask, condition)
+
+    if "date" in table.column_names and pa.types.is_timestamp(table.schema.field("date").type):
+        date_type = table.schema.field("date").type
+        if start_date is not None:
+            combine(pc.greater_equal(table["date"], pa.scalar(start_date, type=date_type)))
+        if end_date is not None:
+            combine(pc.less_equal(table["date"], pa.scalar(end_date, type=date_type)))
+    if groups and "group" in table.column_names:
+        combine(pc.is_in(table["group"], value_set=pa.array(groups, type=table.schema.field("group").type)))
+    for dim_name, dim_value in dimension_filters or []:
+        if dim_name not in table.column_names:
+            raise ValueError(f"Onbekende dimensie: {dim_name}")
+        combine(pc.equal(table[dim_name].cast(pa.string()), dim_value))
+
+    if mask is not None:
+        table = table.filter(pc.fill_null(mask, False))
+    if metrics is not None and metric_names is not None:
+        dropped = [name for name in metric_names if name not in metrics and name in table.column_names]
+        table = table.drop_columns(dropped)
+    return table
+
+
+def decode_report_dataframe(data: bytes) -> pd.DataFrame:
+    return _read_table(data).to_pandas()
@@ -0,0 +1,152 @@
+"""Tijdmeting per request, een log van trage requests en een profiler op verzoek.
+
+Elke request komt in de histogram `apigen_http_request_seconds` (route, methode,
+status) en krijgt een `Server-Timing` header. Duurt een request langer dan
+`SLOW_REQUEST_THRESHOLD_SECONDS`, dan volgt één JSON regel in de log.
+
+Profileren gebeurt alleen op verzoek: met de header `X-Profile: 1` door een gebruiker
+uit `PROFILING_ADMIN_EMAILS`, of voor een fractie `PROFILE_SAMPLE_RATE` van de
+requests op `PROFILE_PATHS`. cProfile volgt de event loop thread, dus werk in
+`asyncio.to_thread` valt erbuiten en gelijktijdige requests lopen erdoorheen. De
+tracemalloc piek geldt voor het hele proces. Er loopt steeds maar één profiel
+tegelijk. Het resultaat komt in `PROFILE_DIR` (.prof voor pstats/snakeviz en een
+.txt samenvatting); de naam staat in de header `X-Profile-Id`.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import json_codec
+from .config import settings
+from .metrics import Histogram
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "apigen_http_request_seconds", "Duur van een HTTP request (tot de laatste byte).", ["route", "method", "status"]
+)
+
+PROFILE_HEADER = "x-profile"
+_profile_lock = threading.Lock()
+
+
+def _route_template(scope: Scope) -> str:
+    # Het routepatroon (/benchmarks/report/{report_uuid}) houdt de labels beperkt.
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    return "/static" if scope.get("path", "").startswith("/static/") else "(geen route)"
+
+
+def _wants_profile(scope: Scope) -> bool:
+    path = scope.get("path", "")
+    if Headers(scope=scope).get(PROFILE_HEADER) == "1":
+        user_email = (scope.get("session") or {}).get("user_email")
+        return bool(user_email) and user_email in settings.PROFILING_ADMIN_EMAILS
+    return (
+        settings.PROFILE_SAMPLE_RATE > 0
+        and any(path.startswith(prefix) for prefix in settings.PROFILE_PATHS)
+        and random.random() < settings.PROFILE_SAMPLE_RATE
+    )
+
+
+def _prune_profiles(directory: str) -> None:
+    files = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory) if name.endswith((".prof", ".txt"))),
+        key=os.path.getmtime
+    )
+    # Per profiel twee bestanden.
+    for path in files[:max(0, len(files) - 2 * settings.PROFILE_MAX_FILES)]:
+        os.remove(path)
+
+
+def _new_profile_id() -> str:
+    return f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def _store_profile(profile_id: str, profiler: cProfile.Profile, summary: dict) -> None:
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    base_path = os.path.join(settings.PROFILE_DIR, profile_id)
+    profiler.dump_stats(f"{base_path}.prof")
+
+    stats_text = io.StringIO()
+    pstats.Stats(profiler, stream=stats_text).sort_stats("cumulative").print_stats(30)
+    with open(f"{base_path}.txt", "w") as f:
+        f.write(json_codec.dumps_str(summary) + "\n\n" + stats_text.getvalue())
+    _prune_profiles(settings.PROFILE_DIR)
+
+
+class RequestTimingMiddleware:
+    """Meet elke HTTP request en profileert op verzoek (zie module docstring).
+    Moet binnen de SessionMiddleware staan om de gebruiker te kunnen zien."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler: Optional[cProfile.Profile] = None
+        profile_id: Optional[str] = None
+        started_tracemalloc = False
+        if _wants_profile(scope) and _profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profile_id = _new_profile_id()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracemalloc = True
+            tracemalloc.reset_peak()
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_timed(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f"app;dur={(time.perf_counter() - started) * 1000:.1f}")
+                if profile_id:
+                    headers["X-Profile-Id"] = profile_id
+            await send(message)
+
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, send_timed)
+        finally:
+            duration = time.perf_counter() - started
+            route = _route_template(scope)
+            if profiler is not None:
+                profiler.disable()
+                peak = tracemalloc.get_traced_memory()[1]
+                if started_tracemalloc:
+                    tracemalloc.stop()
+                try:
+                    _store_profile(profile_id, profiler, {
+                        "method": scope["method"], "route": route, "path": scope["path"], "status": status_code,
+                        "duration_ms": round(duration * 1000, 1), "tracemalloc_peak_bytes": peak,
+                    })
+                    print(f"INFO (request_timing.py): Profiel {profile_id} opgeslagen voor {scope['method']} {scope['path']}")
+                except OSError as e:
+                    print(f"WAARSCHUWING (request_timing.py): Profiel niet opgeslagen: {e}")
+                finally:
+                    _profile_lock.release()
+
+            HTTP_REQUEST_SECONDS.observe(duration, route=route, method=scope["method"], status=str(status_code))
+            if duration >= settings.SLOW_REQUEST_THRESHOLD_SECONDS:
+                print("WAARSCHUWING (request_timing.py): Trage request " + json_codec.dumps_str({
+                    "method": scope["method"], "route": route, "path": scope["path"], "status": status_code,
+                    "duration_ms": round(duration * 1000, 1), "profile_id": profile_id,
+                }))
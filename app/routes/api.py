@@ -1,47 +1,262 @@
-import json
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import base64
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+import pyarrow as pa
+import pyarrow.compute as pc
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import json_codec
+from ..config import settings
 from ..dependencies import get_db
-from ..crud import get_benchmark_report_by_uuid
+from ..crud import get_benchmark_report_by_uuid, get_report_metric_cube, get_report_table, get_reports_using_property
+from ..database import BenchmarkReportDB
+from ..http_cache import cache_headers, is_not_modified, report_etag
+from ..jobs import benchmark_job_queue
+from ..json_codec import EncodedJSONResponse, FastJSONResponse
+from ..metric_cube import rollup, statistics_by_metric
+from ..report_storage import filter_report_table
 
 router = APIRouter(prefix="/api/v1")
 
+# Geëncodeerde JSON documenten per ETag, zodat herhaalde opvragingen zonder
+# decoderen en zonder Python dicts beantwoord worden.
+_encoded_reports: "OrderedDict[str, bytes]" = OrderedDict()
+_encoded_reports_lock = threading.Lock()
+
+def _get_encoded_report(etag: str) -> Optional[bytes]:
+    with _encoded_reports_lock:
+        body = _encoded_reports.get(etag)
+        if body is not None:
+            _encoded_reports.move_to_end(etag)
+        return body
+
+def _store_encoded_report(etag: str, body: bytes) -> None:
+    max_bytes = settings.REPORT_API_ENCODED_CACHE_BYTES
+    if len(body) > max_bytes // 4:
+        return
+    with _encoded_reports_lock:
+        _encoded_reports[etag] = body
+        total = sum(len(cached) for cached in _encoded_reports.values())
+        while total > max_bytes and _encoded_reports:
+            _, evicted = _encoded_reports.popitem(last=False)
+            total -= len(evicted)
+
+def _report_version(db_report: BenchmarkReportDB) -> str:
+    return db_report.updated_at.isoformat() if db_report.updated_at else ""
+
+def _encode_cursor(offset: int, version: str) -> str:
+    payload = json_codec.dumps({"offset": offset, "version": version})
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+def _decode_cursor(cursor: str, version: str) -> int:
+    try:
+        payload = json_codec.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        offset = int(payload["offset"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Ongeldige cursor.")
+    if payload.get("version") != version or offset < 0:
+        raise HTTPException(status_code=409, detail="Rapport is gewijzigd sinds deze cursor is uitgegeven; begin opnieuw.")
+    return offset
+
+def _parse_date(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Ongeldige {name}, verwacht JAAR-MM-DD.")
+
+def _split_values(values: Optional[List[str]]) -> List[str]:
+    return [part.strip() for value in values or [] for part in value.split(",") if part.strip()]
+
+def _period_in_data(db_report: BenchmarkReportDB, table: pa.Table) -> Optional[Dict[str, str]]:
+    if db_report.period_start and db_report.period_end:
+        return {"start_date": db_report.period_start.isoformat(), "end_date": db_report.period_end.isoformat()}
+    if "date" not in table.column_names or table.num_rows == 0:
+        return None
+    bounds = pc.min_max(table["date"]).as_py()
+    if not bounds["min"] or not bounds["max"]:
+        return None
+    return {"start_date": bounds["min"].isoformat(), "end_date": bounds["max"].isoformat()}
+
+def _ndjson_lines(table: pa.Table) -> Iterator[bytes]:
+    for batch in table.to_batches(max_chunksize=1000):
+        yield b"".join(json_codec.dumps(row) + b"\n" for row in batch.to_pylist())
+
+def _encode_report_document(envelope: Dict[str, Any], page_table: pa.Table) -> bytes:
+    return json_codec.dumps({**envelope, "benchmark_data": page_table.to_pylist()})
+
 @router.get("/report/{report_uuid}", name="get_saved_report_api")
-async def get_saved_report_api(report_uuid: str, db: Session = Depends(get_db)):
-    db_report = get_benchmark_report_by_uuid(db=db, report_uuid=report_uuid)
+async def get_saved_report_api(
+    request: Request,
+    report_uuid: str,
+    start_date: Optional[str] = Query(None, description="Eerste dag (JAAR-MM-DD), inclusief."),
+    end_date: Optional[str] = Query(None, description="Laatste dag (JAAR-MM-DD), inclusief."),
+    group: Optional[List[str]] = Query(None, description="'client', 'benchmark' of een property id."),
+    dimension: Optional[List[str]] = Query(None, description="Filter als naam:waarde, bijv. country:Netherlands."),
+    metrics: Optional[List[str]] = Query(None, description="Subset van metrics (herhaald of komma-gescheiden)."),
+    limit: Optional[int] = Query(None, ge=1, le=settings.REPORT_API_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    response_format: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    db_report = await get_benchmark_report_by_uuid(db=db, report_uuid=report_uuid)
     if not db_report:
         raise HTTPException(status_code=404, detail="Benchmark rapport niet gevonden.")
 
+    wants_ndjson = response_format == "ndjson" or "application/x-ndjson" in request.headers.get("accept", "")
+    etag = report_etag(db_report, "ndjson" if wants_ndjson else "json", str(sorted(request.query_params.multi_items())))
+    http_cache_headers = cache_headers(etag, db_report)
+    if is_not_modified(request, etag, db_report):
+        return Response(status_code=304, headers=http_cache_headers)
+    encoded_body = _get_encoded_report(etag)
+    if encoded_body is not None:
+        return EncodedJSONResponse(encoded_body, headers=http_cache_headers)
+
     try:
-        report_data_from_db: List[dict] = json.loads(db_report.benchmark_data_json)
-        metrics_used = json.loads(db_report.metrics_used)
-        dimensions_used = json.loads(db_report.dimensions_used)
+        metrics_used = json_codec.loads(db_report.metrics_used)
+        dimensions_used = json_codec.loads(db_report.dimensions_used)
         client_a_prop = db_report.client_a_property_id
-        benchmark_props = json.loads(db_report.benchmark_property_ids_json) if db_report.benchmark_property_ids_json else []
-
-    except json.JSONDecodeError:
+        benchmark_props = json_codec.loads(db_report.benchmark_property_ids_json) if db_report.benchmark_property_ids_json else []
+        report_table: pa.Table = await asyncio.to_thread(get_report_table, db_report)
+    except ValueError:
         raise HTTPException(status_code=500, detail="Fout bij het parsen van opgeslagen rapportdata.")
 
-    min_date, max_date = None, None
-    if report_data_from_db and isinstance(report_data_from_db, list) and len(report_data_from_db) > 0:
-        all_dates = sorted(list(set(item["date"] for item in report_data_from_db if "date" in item and item["date"] is not None)))
-        if all_dates:
-            min_date = all_dates[0]
-            max_date = all_dates[-1]
+    group_aliases = {"client": client_a_prop, "benchmark": "Benchmark"}
+    groups = [group_aliases.get(g.lower(), g) for g in _split_values(group)] or None
+
+    dimension_filters: List[Tuple[str, str]] = []
+    for dim_filter in dimension or []:
+        dim_name, separator, dim_value = dim_filter.partition(":")
+        if not separator or dim_name not in dimensions_used:
+            raise HTTPException(status_code=400, detail=f"Ongeldig dimensiefilter '{dim_filter}', verwacht naam:waarde met naam uit {dimensions_used}.")
+        dimension_filters.append((dim_name, dim_value))
 
-    response_data = {
+    selected_metrics = _split_values(metrics) or None
+    unknown_metrics = [m for m in selected_metrics or [] if m not in metrics_used]
+    if unknown_metrics:
+        raise HTTPException(status_code=400, detail=f"Onbekende metrics: {', '.join(unknown_metrics)}")
+
+    version = _report_version(db_report)
+    offset = _decode_cursor(cursor, version) if cursor else 0
+
+    filtered_table = await asyncio.to_thread(
+        filter_report_table, report_table, _parse_date(start_date, "start_date"), _parse_date(end_date, "end_date"),
+        groups, dimension_filters, selected_metrics, metrics_used
+    )
+    total_rows = filtered_table.num_rows
+    page_table = filtered_table.slice(offset, limit) if limit is not None else filtered_table.slice(offset)
+    next_offset = offset + page_table.num_rows
+    next_cursor = _encode_cursor(next_offset, version) if next_offset < total_rows else None
+
+    if wants_ndjson:
+        headers = {**http_cache_headers, "X-Total-Rows": str(total_rows)}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return StreamingResponse(_ndjson_lines(page_table), media_type="application/x-ndjson", headers=headers)
+
+    envelope: Dict[str, Any] = {
         "report_uuid": db_report.report_uuid,
         "title": db_report.title,
-        "created_at": db_report.created_at.isoformat() if db_report.created_at else None,
-        "updated_at": db_report.updated_at.isoformat() if db_report.updated_at else None,
+        "created_at": db_report.created_at,
+        "updated_at": db_report.updated_at,
         "generated_by_email": db_report.generated_by_email,
         "client_a_property_id": client_a_prop,
         "benchmark_property_ids": benchmark_props,
         "metrics_used_api_names": metrics_used,
         "dimensions_used_api_names": dimensions_used,
-        "period_in_data": {"start_date": min_date, "end_date": max_date} if min_date and max_date else None,
-        "benchmark_data": report_data_from_db
+        "period_in_data": _period_in_data(db_report, report_table),
+        "total_rows": total_rows,
+        "next_cursor": next_cursor,
+    }
+    encoded_body = await asyncio.to_thread(_encode_report_document, envelope, page_table)
+    _store_encoded_report(etag, encoded_body)
+    return EncodedJSONResponse(encoded_body, headers=http_cache_headers)
+
+@router.get("/report/{report_uuid}/statistics", name="get_report_statistics_api")
+async def get_report_statistics_api(
+    request: Request,
+    report_uuid: str,
+    group_by: Optional[List[str]] = Query(None, description="Dimensies om op te groeperen, bijv. date; leeg voor totalen."),
+    metrics: Optional[List[str]] = Query(None, description="Subset van metrics (herhaald of komma-gescheiden)."),
+    db: AsyncSession = Depends(get_db)
+):
+    """Verdeling van de benchmark properties (mediaan, p25/p75, getrimd en gewogen
+    gemiddelde) uit de opgeslagen metric cube, zonder GA opnieuw te bevragen."""
+    db_report = await get_benchmark_report_by_uuid(db=db, report_uuid=report_uuid)
+    if not db_report:
+        raise HTTPException(status_code=404, detail="Benchmark rapport niet gevonden.")
+
+    etag = report_etag(db_report, "statistics", str(sorted(request.query_params.multi_items())))
+    http_cache_headers = cache_headers(etag, db_report)
+    if is_not_modified(request, etag, db_report):
+        return Response(status_code=304, headers=http_cache_headers)
+
+    try:
+        metrics_used = json_codec.loads(db_report.metrics_used)
+        metric_cube = await asyncio.to_thread(get_report_metric_cube, db_report)
+    except ValueError:
+        raise HTTPException(status_code=500, detail="Fout bij het parsen van opgeslagen rapportdata.")
+    if metric_cube is None:
+        raise HTTPException(status_code=404, detail="Dit rapport heeft nog geen metric cube; genereer het opnieuw.")
+
+    group_names = _split_values(group_by)
+    unknown_dimensions = [d for d in group_names if d not in metric_cube.dimension_names]
+    if unknown_dimensions:
+        raise HTTPException(status_code=400, detail=f"Onbekende dimensies: {', '.join(unknown_dimensions)}")
+    selected_metrics = _split_values(metrics) or metrics_used
+    unknown_metrics = [m for m in selected_metrics if m not in metrics_used]
+    if unknown_metrics:
+        raise HTTPException(status_code=400, detail=f"Onbekende metrics: {', '.join(unknown_metrics)}")
+
+    peer_ids = [prop_id for prop_id in metric_cube.property_ids if prop_id != db_report.client_a_property_id]
+    statistics = await asyncio.to_thread(
+        lambda: statistics_by_metric(rollup(metric_cube, group_names), peer_ids, selected_metrics)
+    )
+    return FastJSONResponse({
+        "report_uuid": db_report.report_uuid,
+        "benchmark_property_ids": peer_ids,
+        "group_by": group_names,
+        "statistics": statistics,
+    }, headers=http_cache_headers)
+
+@router.get("/jobs/{job_id}", name="get_benchmark_job_status_api")
+async def get_benchmark_job_status_api(request: Request, job_id: str):
+    job = await benchmark_job_queue.get_status(job_id, request.session.get("user_email"))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job niet gevonden.")
+    return job
+
+@router.get("/properties/{property_id}/reports", name="get_reports_using_property_api")
+async def get_reports_using_property_api(
+    request: Request,
+    property_id: str,
+    role: Optional[str] = Query(None, pattern="^(client|benchmark)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Rapporten van de ingelogde gebruiker die deze property gebruiken."""
+    user_email = request.session.get("user_email")
+    if not user_email:
+        raise HTTPException(status_code=401, detail="Niet ingelogd.")
+    if not property_id.startswith("properties/"):
+        property_id = f"properties/{property_id}"
+    rows = await get_reports_using_property(db, property_id, role=role, user_email=user_email)
+    return {
+        "property_id": property_id,
+        "reports": [
+            {
+                "report_uuid": row.report_uuid,
+                "title": row.title,
+                "role": row.role,
+                "updated_at": row.updated_at,
+                "report_url": str(request.url_for("get_saved_report_api", report_uuid=row.report_uuid)),
+            }
+            for row in rows
+        ],
     }
-    return response_data
@@ -2,19 +2,23 @@
 from fastapi import APIRouter, Request, HTTPException, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..dependencies import get_db
 
-from ..auth import get_google_credentials_from_session, get_google_flow, store_credentials_in_session
+from ..auth import get_google_credentials_from_session, get_google_flow, store_credentials_in_session, save_offline_credentials
 from ..config import settings
+from ..ga_clients import ga_data_client_pool, ga_admin_client_pool
+from ..styling import asset_path
+from .utils import invalidate_ga_properties_cache
 from google.oauth2 import id_token as google_id_token
 from google.auth.transport import requests as google_auth_requests
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_path"] = asset_path
 
 @router.get("/", response_class=HTMLResponse, name="home_route")
-async def home(request: Request, db: Session = Depends(get_db)):
+async def home(request: Request, db: AsyncSession = Depends(get_db)):
     credentials = get_google_credentials_from_session(request)
     if credentials and request.session.get("user_email"):
         return RedirectResponse(url=str(request.url_for("my_benchmarks_page")), status_code=302)
@@ -30,7 +34,7 @@ async def login_google(request: Request):
     return RedirectResponse(url=authorization_url)
 
 @router.get("/auth/callback", name="auth_callback_route")
-async def auth_callback_google(request: Request, code: str, state: str):
+async def auth_callback_google(request: Request, code: str, state: str, db: AsyncSession = Depends(get_db)):
     session_state = request.session.pop("oauth_state", None)
     if not session_state or state != session_state:
         raise HTTPException(status_code=400, detail="Invalid OAuth state.")
@@ -41,6 +45,8 @@ async def auth_callback_google(request: Request, code: str, state: str):
         if flow.credentials and flow.credentials.id_token:
             id_info = google_id_token.verify_oauth2_token(flow.credentials.id_token, google_auth_requests.Request(), settings.GOOGLE_CLIENT_ID)
             request.session["user_email"] = id_info.get("email")
+            if id_info.get("email"):
+                await save_offline_credentials(db, id_info["email"], flow.credentials, only_if_stored=True)
     except Exception as e:
         print(f"Error fetching token: {e}")
         raise HTTPException(status_code=500, detail=f"Kon token niet ophalen: {e}")
@@ -48,5 +54,10 @@ async def auth_callback_google(request: Request, code: str, state: str):
 
 @router.get("/logout", name="logout_route")
 async def logout(request: Request):
+    invalidate_ga_properties_cache(request.session.get("user_email"))
+    credentials = get_google_credentials_from_session(request)
+    if credentials:
+        ga_data_client_pool.discard(credentials)
+        ga_admin_client_pool.discard(credentials)
     request.session.clear()
     return RedirectResponse(url=str(request.url_for("home_route")))
@@ -1,33 +1,64 @@
-
-import json
-from typing import List, Optional
+import asyncio
+import base64
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 import urllib.parse
 from urllib.parse import unquote_plus
 
 from fastapi import APIRouter, Request, Form, Depends, HTTPException, Query
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from .. import json_codec
 from ..dependencies import get_db
-from ..auth import get_google_credentials_from_session
+from ..database import AsyncSessionLocal
+from ..auth import get_google_credentials_from_session, save_offline_credentials
 from ..config import settings
 from ..crud import (
     create_benchmark_report,
     get_benchmark_report_by_uuid,
-    get_benchmark_reports_by_user_email,
+    get_benchmark_report_summaries_by_user_email,
+    count_benchmark_reports_by_user_email,
     update_benchmark_report,
-    delete_benchmark_report
+    delete_benchmark_report,
+    get_report_rows,
+    get_report_metric_cube,
+    materialize_report_aggregates
 )
-from ..analytics import generate_benchmark_data_from_google
+from ..analytics import generate_benchmark_data_from_google, refresh_benchmark_data_incrementally
+from ..jobs import BenchmarkJob, benchmark_job_queue
+from ..metric_cube import MetricCube
+from ..auto_refresh import rolling_window_dates
+from ..styling import asset_path
 from .utils import _get_ga_properties
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_path"] = asset_path
+
+def _encode_listing_cursor(key: Tuple[datetime, int]) -> str:
+    updated_at, report_id = key
+    payload = json_codec.dumps({"updated_at": updated_at.isoformat() if updated_at else None, "id": report_id})
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+def _decode_listing_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not cursor:
+        return None
+    try:
+        payload = json_codec.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(payload["updated_at"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        # Een kapotte of verouderde link toont gewoon de eerste pagina.
+        return None
 
 @router.get("/benchmarks", response_class=HTMLResponse, name="my_benchmarks_page")
-async def my_benchmarks_page(request: Request, db: Session = Depends(get_db), message: Optional[str] = Query(None)):
+async def my_benchmarks_page(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    message: Optional[str] = Query(None),
+    after: Optional[str] = Query(None)
+):
     credentials = get_google_credentials_from_session(request)
     user_email = request.session.get("user_email")
     if not credentials or not user_email:
@@ -36,11 +67,19 @@ async def my_benchmarks_page(request: Request, db: Session = Depends(get_db), me
 
     decoded_message = unquote_plus(message) if message else None
 
-    benchmarks = get_benchmark_reports_by_user_email(db, user_email)
+    after_key = _decode_listing_cursor(after)
+    benchmarks, next_key = await get_benchmark_report_summaries_by_user_email(
+        db, user_email, settings.MY_BENCHMARKS_PAGE_SIZE, after_key
+    )
+    total_count = await count_benchmark_reports_by_user_email(db, user_email)
 
     return templates.TemplateResponse(
         "my_benchmarks.html",
-        {"request": request, "benchmarks": benchmarks, "user_email": user_email, "message": decoded_message}
+        {
+            "request": request, "benchmarks": benchmarks, "user_email": user_email, "message": decoded_message,
+            "total_count": total_count, "is_first_page": after_key is None,
+            "next_cursor": _encode_listing_cursor(next_key) if next_key else None
+        }
     )
 
 @router.get("/benchmarks/new", response_class=HTMLResponse, name="select_benchmark_options_page")
@@ -48,7 +87,7 @@ async def select_benchmark_options_page(request: Request, error_message_form: Op
     credentials = get_google_credentials_from_session(request)
     if not credentials: return RedirectResponse(url=str(request.url_for("home_route")), status_code=302)
 
-    ga_properties, error_message_fetch = await _get_ga_properties(credentials)
+    ga_properties, error_message_fetch = await _get_ga_properties(credentials, request.session.get("user_email"))
     if error_message_fetch and any(keyword in error_message_fetch.upper() for keyword in ["INVALID_GRANT", "TOKEN HAS BEEN EXPIRED", "UNAUTHENTICATED", "PERMISSION_DENIED"]):
         request.session.clear()
         redirect_url = str(request.url_for("home_route").include_query_params(error="auth_failed_properties"))
@@ -67,6 +106,7 @@ async def select_benchmark_options_page(request: Request, error_message_form: Op
         "error_message_fetch": error_message_fetch,
         "error_message_form": decoded_error_form,
         "benchmark_title": "", "client_a_property_id_db": None, "benchmark_property_ids_db": [],
+        "rolling_window_days_db": None, "max_rolling_window_days": settings.ROLLING_WINDOW_MAX_DAYS,
         "form_action_url": request.url_for('generate_and_save_benchmark_route'),
         "submit_button_text": "Genereer & Sla Nieuwe Benchmark Op", "report_uuid": None
     }
@@ -80,7 +120,7 @@ async def generate_and_save_benchmark_endpoint(
     selected_metrics: Optional[List[str]] = Form(None),
     selected_dimensions: Optional[List[str]] = Form(None),
     start_date: str = Form(...), end_date: str = Form(...),
-    db: Session = Depends(get_db)
+    rolling_window_days: Optional[str] = Form(None)
 ):
     credentials = get_google_credentials_from_session(request)
     user_email = request.session.get("user_email")
@@ -95,6 +135,11 @@ async def generate_and_save_benchmark_endpoint(
     elif not benchmark_property_ids: error_form = "Selecteer a.u.b. ten minste één Benchmark property."
     elif client_a_property_id in benchmark_property_ids: error_form = "Klant A property mag niet ook een Benchmark property zijn."
     elif not selected_metrics: error_form = "Selecteer a.u.b. ten minste één metric."
+    window_days = None
+    try:
+        window_days = _parse_rolling_window_days(rolling_window_days)
+        if window_days: start_date, end_date = rolling_window_dates(window_days)
+    except ValueError: error_form = f"Rollend venster moet tussen 1 en {settings.ROLLING_WINDOW_MAX_DAYS} dagen liggen."
     try:
         if start_date > end_date: raise ValueError("Startdatum mag niet na de einddatum liggen.")
     except (ValueError, TypeError): error_form = f"Ongeldige datums opgegeven."
@@ -103,41 +148,44 @@ async def generate_and_save_benchmark_endpoint(
         redirect_url = str(request.url_for("select_benchmark_options_page").include_query_params(error_message_form=urllib.parse.quote_plus(error_form)))
         return RedirectResponse(url=redirect_url, status_code=303)
 
-    try:
+    property_ids = [client_a_property_id] + benchmark_property_ids
+    job = BenchmarkJob(user_email, benchmark_title, property_ids)
+
+    async def generate_and_create(job: BenchmarkJob) -> Optional[str]:
+        metric_cubes = []
         benchmark_results_flat = await generate_benchmark_data_from_google(
             credentials, client_a_property_id, benchmark_property_ids,
-            selected_metrics, actual_selected_dimensions, start_date, end_date
+            selected_metrics, actual_selected_dimensions, start_date, end_date,
+            cache_scope=user_email, on_property_progress=job.property_progress,
+            on_metric_cube=metric_cubes.append
         )
-    except ValueError as e:
-        redirect_url = str(request.url_for("select_benchmark_options_page").include_query_params(error_message_form=urllib.parse.quote_plus(f"Fout bij genereren: {e}")))
-        return RedirectResponse(url=redirect_url, status_code=303)
-    except Exception as e:
-        print(f"Onverwachte fout bij genereren benchmark data: {e}")
-        redirect_url = str(request.url_for("select_benchmark_options_page").include_query_params(error_message_form=urllib.parse.quote_plus(f"Onverwachte serverfout: {e}")))
-        return RedirectResponse(url=redirect_url, status_code=303)
-
-    db_report_obj = create_benchmark_report(
-        db=db, title=benchmark_title, client_a_property_id=client_a_property_id,
-        benchmark_property_ids=benchmark_property_ids, metrics_used=selected_metrics,
-        dimensions_used=actual_selected_dimensions, benchmark_results_flat_json=benchmark_results_flat,
-        user_email=user_email
-    )
-
-    redirect_url = str(request.url_for("my_benchmarks_page").include_query_params(message=urllib.parse.quote_plus(f"Benchmark '{db_report_obj.title}' succesvol aangemaakt!")))
-    return RedirectResponse(url=redirect_url, status_code=303)
+        async with AsyncSessionLocal() as job_db:
+            if window_days:
+                await save_offline_credentials(job_db, user_email, credentials)
+            db_report_obj = await create_benchmark_report(
+                db=job_db, title=benchmark_title, client_a_property_id=client_a_property_id,
+                benchmark_property_ids=benchmark_property_ids, metrics_used=selected_metrics,
+                dimensions_used=actual_selected_dimensions, benchmark_results_flat_json=benchmark_results_flat,
+                user_email=user_email, rolling_window_days=window_days,
+                metric_cube=metric_cubes[0] if metric_cubes else None
+            )
+        return db_report_obj.report_uuid
+
+    await benchmark_job_queue.submit(job, generate_and_create)
+    return _job_accepted_response(request, job)
 
 @router.get("/benchmarks/edit/{report_uuid}", response_class=HTMLResponse, name="edit_benchmark_page")
-async def edit_benchmark_page(request: Request, report_uuid: str, db: Session = Depends(get_db), error_message_form: Optional[str] = Query(None)):
+async def edit_benchmark_page(request: Request, report_uuid: str, db: AsyncSession = Depends(get_db), error_message_form: Optional[str] = Query(None)):
     credentials = get_google_credentials_from_session(request)
     user_email = request.session.get("user_email")
     if not credentials or not user_email:
         return RedirectResponse(str(request.url_for("home_route").include_query_params(error="not_logged_in")), status_code=302)
 
-    benchmark = get_benchmark_report_by_uuid(db, report_uuid)
+    benchmark = await get_benchmark_report_by_uuid(db, report_uuid)
     if not benchmark or benchmark.generated_by_email != user_email:
         raise HTTPException(status_code=404, detail="Benchmark niet gevonden of geen eigenaar.")
 
-    ga_properties, error_message_fetch = await _get_ga_properties(credentials)
+    ga_properties, error_message_fetch = await _get_ga_properties(credentials, user_email)
     if error_message_fetch and any(keyword in error_message_fetch.upper() for keyword in ["INVALID_GRANT", "TOKEN HAS BEEN EXPIRED", "UNAUTHENTICATED", "PERMISSION_DENIED"]):
         request.session.clear()
         return RedirectResponse(str(request.url_for("home_route").include_query_params(error="auth_failed_properties_edit")), status_code=302)
@@ -146,18 +194,21 @@ async def edit_benchmark_page(request: Request, report_uuid: str, db: Session =
 
     try:
         client_a_prop_db = benchmark.client_a_property_id
-        benchmark_props_db = json.loads(benchmark.benchmark_property_ids_json) if benchmark.benchmark_property_ids_json else []
-        metrics_db = json.loads(benchmark.metrics_used)
-        dimensions_db = json.loads(benchmark.dimensions_used)
-        opgeslagen_data = json.loads(benchmark.benchmark_data_json)
+        benchmark_props_db = json_codec.loads(benchmark.benchmark_property_ids_json) if benchmark.benchmark_property_ids_json else []
+        metrics_db = json_codec.loads(benchmark.metrics_used)
+        dimensions_db = json_codec.loads(benchmark.dimensions_used)
         start_date_db = (datetime.now() - timedelta(days=settings.DEFAULT_START_DAYS_AGO)).strftime("%Y-%m-%d")
         end_date_db = (datetime.now() - timedelta(days=settings.DEFAULT_END_DAYS_AGO)).strftime("%Y-%m-%d")
-        if opgeslagen_data and isinstance(opgeslagen_data, list) and len(opgeslagen_data) > 0 and "date" in opgeslagen_data[0]:
-            all_dates = sorted(list(set(item["date"] for item in opgeslagen_data if "date" in item and item["date"] is not None)))
-            if all_dates:
-                start_date_db = all_dates[0]
-                end_date_db = all_dates[-1]
-    except (json.JSONDecodeError, TypeError) as e:
+        # De periode staat sinds de materialisatie in het rapport; oudere rapporten
+        # krijgen hem hier eenmalig.
+        if benchmark.period_start is None and benchmark.kpis_json is None:
+            benchmark = await materialize_report_aggregates(db, benchmark)
+        if benchmark.period_start and benchmark.period_end:
+            start_date_db = benchmark.period_start.strftime("%Y-%m-%d")
+            end_date_db = benchmark.period_end.strftime("%Y-%m-%d")
+        if benchmark.rolling_window_days:
+            start_date_db, end_date_db = rolling_window_dates(benchmark.rolling_window_days)
+    except (ValueError, TypeError) as e:
         print(f"Error parsing data for edit page: {e}")
         return RedirectResponse(str(request.url_for("my_benchmarks_page").include_query_params(message=urllib.parse.quote_plus("Fout bij laden benchmark data voor bewerken."))), status_code=303)
 
@@ -170,6 +221,7 @@ async def edit_benchmark_page(request: Request, report_uuid: str, db: Session =
         "error_message_form": decoded_error_form,
         "benchmark_title": benchmark.title, "client_a_property_id_db": client_a_prop_db,
         "benchmark_property_ids_db": benchmark_props_db, "report_uuid": report_uuid,
+        "rolling_window_days_db": benchmark.rolling_window_days, "max_rolling_window_days": settings.ROLLING_WINDOW_MAX_DAYS,
         "form_action_url": request.url_for('update_benchmark_endpoint', report_uuid=report_uuid),
         "submit_button_text": "Sla Wijzigingen Op"
     }
@@ -183,14 +235,15 @@ async def update_benchmark_endpoint(
     selected_metrics: Optional[List[str]] = Form(None),
     selected_dimensions: Optional[List[str]] = Form(None),
     start_date: str = Form(...), end_date: str = Form(...),
-    db: Session = Depends(get_db)
+    rolling_window_days: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_db)
 ):
     credentials = get_google_credentials_from_session(request)
     user_email = request.session.get("user_email")
     if not credentials or not user_email:
         return RedirectResponse(str(request.url_for("home_route").include_query_params(error="not_logged_in")), status_code=302)
 
-    benchmark_to_update = get_benchmark_report_by_uuid(db, report_uuid)
+    benchmark_to_update = await get_benchmark_report_by_uuid(db, report_uuid)
     if not benchmark_to_update or benchmark_to_update.generated_by_email != user_email:
         raise HTTPException(status_code=404, detail="Benchmark niet gevonden of geen eigenaar voor update.")
 
@@ -201,6 +254,11 @@ async def update_benchmark_endpoint(
     elif not benchmark_property_ids: error_form = "Selecteer a.u.b. ten minste één Benchmark property."
     elif client_a_property_id in benchmark_property_ids: error_form = "Klant A property mag niet ook een Benchmark property zijn."
     elif not selected_metrics: error_form = "Selecteer a.u.b. ten minste één metric."
+    window_days = None
+    try:
+        window_days = _parse_rolling_window_days(rolling_window_days)
+        if window_days: start_date, end_date = rolling_window_dates(window_days)
+    except ValueError: error_form = f"Rollend venster moet tussen 1 en {settings.ROLLING_WINDOW_MAX_DAYS} dagen liggen."
     try:
         if start_date > end_date: raise ValueError("Startdatum mag niet na de einddatum liggen.")
     except (ValueError, TypeError): error_form = f"Ongeldige datums opgegeven."
@@ -209,41 +267,118 @@ async def update_benchmark_endpoint(
         redirect_url = str(request.url_for("edit_benchmark_page", report_uuid=report_uuid).include_query_params(error_message_form=urllib.parse.quote_plus(error_form)))
         return RedirectResponse(url=redirect_url, status_code=303)
 
+    property_ids = [client_a_property_id] + benchmark_property_ids
+    job = BenchmarkJob(user_email, benchmark_title, property_ids, report_uuid=report_uuid)
+
+    async def regenerate_and_update(job: BenchmarkJob) -> Optional[str]:
+        existing_rows, existing_cube = None, None
+        if settings.INCREMENTAL_REFRESH_ENABLED:
+            async with AsyncSessionLocal() as job_db:
+                existing_rows, existing_cube = await _rows_for_incremental_refresh(
+                    job_db, report_uuid, client_a_property_id, benchmark_property_ids,
+                    selected_metrics, actual_selected_dimensions
+                )
+
+        metric_cubes = []
+        if existing_rows:
+            new_benchmark_results_flat = await refresh_benchmark_data_incrementally(
+                credentials, client_a_property_id, benchmark_property_ids,
+                selected_metrics, actual_selected_dimensions, start_date, end_date,
+                existing_rows, cache_scope=user_email, on_property_progress=job.property_progress,
+                existing_cube=existing_cube, on_metric_cube=metric_cubes.append
+            )
+        else:
+            new_benchmark_results_flat = await generate_benchmark_data_from_google(
+                credentials, client_a_property_id, benchmark_property_ids,
+                selected_metrics, actual_selected_dimensions, start_date, end_date,
+                cache_scope=user_email, on_property_progress=job.property_progress,
+                on_metric_cube=metric_cubes.append
+            )
+
+        async with AsyncSessionLocal() as job_db:
+            if window_days:
+                await save_offline_credentials(job_db, user_email, credentials)
+            updated_report = await update_benchmark_report(
+                db=job_db, report_uuid=report_uuid, user_email=user_email, title=benchmark_title,
+                client_a_property_id=client_a_property_id, benchmark_property_ids=benchmark_property_ids,
+                metrics_used=selected_metrics, dimensions_used=actual_selected_dimensions,
+                benchmark_results_flat_json=new_benchmark_results_flat, rolling_window_days=window_days or 0,
+                metric_cube=metric_cubes[0] if metric_cubes else None
+            )
+        if not updated_report:
+            job.error = "Fout bij bijwerken benchmark in database."
+            return None
+        return updated_report.report_uuid
+
+    await benchmark_job_queue.submit(job, regenerate_and_update)
+    return _job_accepted_response(request, job)
+
+async def _rows_for_incremental_refresh(
+    db: AsyncSession, report_uuid: str, client_a_property_id: str, benchmark_property_ids: List[str],
+    selected_metrics: List[str], selected_dimensions: List[str]
+) -> Tuple[Optional[List[dict]], Optional[MetricCube]]:
+    """Geeft de opgeslagen rijen en metric cube terug als het rapport met dezelfde
+    properties, metrics en dimensies is gegenereerd; anders (None, None) (volledige refresh)."""
+    stored_report = await get_benchmark_report_by_uuid(db, report_uuid)
+    if not stored_report:
+        return None, None
     try:
-        new_benchmark_results_flat = await generate_benchmark_data_from_google(
-            credentials, client_a_property_id, benchmark_property_ids,
-            selected_metrics, actual_selected_dimensions, start_date, end_date
+        stored_benchmark_ids = json_codec.loads(stored_report.benchmark_property_ids_json) if stored_report.benchmark_property_ids_json else []
+        same_configuration = (
+            stored_report.client_a_property_id == client_a_property_id
+            and set(stored_benchmark_ids) == set(benchmark_property_ids)
+            and set(json_codec.loads(stored_report.metrics_used)) == set(selected_metrics)
+            and json_codec.loads(stored_report.dimensions_used) == selected_dimensions
         )
-    except ValueError as e:
-        redirect_url = str(request.url_for("edit_benchmark_page", report_uuid=report_uuid).include_query_params(error_message_form=urllib.parse.quote_plus(f"Fout bij hergenereren data: {e}")))
-        return RedirectResponse(url=redirect_url, status_code=303)
-    except Exception as e:
-        print(f"Onverwachte fout bij hergenereren data voor update: {e}")
-        redirect_url = str(request.url_for("edit_benchmark_page", report_uuid=report_uuid).include_query_params(error_message_form=urllib.parse.quote_plus(f"Onverwachte serverfout bij update: {e}")))
-        return RedirectResponse(url=redirect_url, status_code=303)
+        if same_configuration:
+            rows = await asyncio.to_thread(get_report_rows, stored_report)
+            return rows, await asyncio.to_thread(get_report_metric_cube, stored_report)
+    except (ValueError, TypeError) as e:
+        print(f"Opgeslagen data niet bruikbaar voor incrementele refresh, volledige refresh: {e}")
+    return None, None
+
+def _parse_rolling_window_days(value: Optional[str]) -> Optional[int]:
+    if value is None or not value.strip():
+        return None
+    window_days = int(value)
+    if not 1 <= window_days <= settings.ROLLING_WINDOW_MAX_DAYS:
+        raise ValueError(f"Ongeldig rollend venster: {window_days}")
+    return window_days
+
+def _job_accepted_response(request: Request, job: BenchmarkJob):
+    status_url = str(request.url_for("get_benchmark_job_status_api", job_id=job.job_id))
+    if "application/json" in request.headers.get("accept", ""):
+        return JSONResponse({"job_id": job.job_id, "status_url": status_url}, status_code=202)
+    return RedirectResponse(url=str(request.url_for("benchmark_job_page", job_id=job.job_id)), status_code=303)
+
+@router.get("/benchmarks/jobs/{job_id}", response_class=HTMLResponse, name="benchmark_job_page")
+async def benchmark_job_page(request: Request, job_id: str):
+    user_email = request.session.get("user_email")
+    if not user_email or not get_google_credentials_from_session(request):
+        return RedirectResponse(str(request.url_for("home_route").include_query_params(error="not_logged_in")), status_code=302)
 
-    updated_report = update_benchmark_report(
-        db=db, report_uuid=report_uuid, user_email=user_email, title=benchmark_title,
-        client_a_property_id=client_a_property_id, benchmark_property_ids=benchmark_property_ids,
-        metrics_used=selected_metrics, dimensions_used=actual_selected_dimensions,
-        benchmark_results_flat_json=new_benchmark_results_flat
-    )
+    job = await benchmark_job_queue.get_status(job_id, user_email)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job niet gevonden.")
 
-    if updated_report:
-        redirect_url = str(request.url_for("my_benchmarks_page").include_query_params(message=urllib.parse.quote_plus(f"Benchmark '{updated_report.title}' succesvol bijgewerkt!")))
-        return RedirectResponse(url=redirect_url, status_code=303)
+    if job["is_update"]:
+        retry_url = request.url_for("edit_benchmark_page", report_uuid=job["report_uuid"])
     else:
-        redirect_url = str(request.url_for("my_benchmarks_page").include_query_params(message=urllib.parse.quote_plus("Fout bij bijwerken benchmark in database.")))
-        return RedirectResponse(url=redirect_url, status_code=303)
+        retry_url = request.url_for("select_benchmark_options_page")
+
+    return templates.TemplateResponse(
+        "benchmark_job.html",
+        {"request": request, "user_email": user_email, "job": job, "retry_url": retry_url}
+    )
 
 @router.post("/benchmarks/delete/{report_uuid}", name="delete_benchmark_endpoint")
-async def delete_benchmark_endpoint(request: Request, report_uuid: str, db: Session = Depends(get_db)):
+async def delete_benchmark_endpoint(request: Request, report_uuid: str, db: AsyncSession = Depends(get_db)):
     user_email = request.session.get("user_email")
     if not user_email or not get_google_credentials_from_session(request):
         return RedirectResponse(str(request.url_for("home_route").include_query_params(error="not_logged_in")), status_code=302)
 
     try:
-        benchmark_to_delete = get_benchmark_report_by_uuid(db, report_uuid)
+        benchmark_to_delete = await get_benchmark_report_by_uuid(db, report_uuid)
 
         if not benchmark_to_delete or benchmark_to_delete.generated_by_email != user_email:
             error_message = urllib.parse.quote_plus("Verwijderen mislukt: Benchmark niet gevonden of geen eigenaar.")
@@ -252,7 +387,7 @@ async def delete_benchmark_endpoint(request: Request, report_uuid: str, db: Sess
 
         title_deleted = benchmark_to_delete.title
 
-        deleted = delete_benchmark_report(db, report_uuid, user_email)
+        deleted = await delete_benchmark_report(db, report_uuid, user_email)
 
         if deleted:
             message = urllib.parse.quote_plus(f"Benchmark '{title_deleted}' succesvol verwijderd!")
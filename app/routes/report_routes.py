@@ -1,107 +1,48 @@
-
-import json
 from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from .. import json_codec
 from ..dependencies import get_db
 from ..auth import get_google_credentials_from_session
 from ..config import settings
-from ..crud import get_benchmark_report_by_uuid
-from .utils import _get_ga_properties
+from ..crud import get_benchmark_report_by_uuid, materialize_report_aggregates
+from ..metrics import RENDER_SECONDS
+from ..http_cache import TEMPLATES_VERSION, cache_headers, is_not_modified, report_etag
+from ..styling import asset_path
+from .utils import _get_ga_property_name
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_path"] = asset_path
 
 @router.get("/benchmarks/report/{report_uuid}", response_class=HTMLResponse, name="interactive_report_page")
-async def interactive_report_page(request: Request, report_uuid: str, db: Session = Depends(get_db)):
+async def interactive_report_page(request: Request, report_uuid: str, db: AsyncSession = Depends(get_db)):
     user_email = request.session.get("user_email")
     if not user_email:
         return RedirectResponse(str(request.url_for("home_route").include_query_params(error="not_logged_in")), status_code=302)
 
-    report = get_benchmark_report_by_uuid(db, report_uuid)
+    report = await get_benchmark_report_by_uuid(db, report_uuid)
     if not report or report.generated_by_email != user_email:
         raise HTTPException(status_code=404, detail="Benchmark niet gevonden of geen eigenaar.")
 
+    etag = report_etag(report, "html", user_email, TEMPLATES_VERSION)
+    if is_not_modified(request, etag, report):
+        return Response(status_code=304, headers=cache_headers(etag, report))
+
     try:
-        data = json.loads(report.benchmark_data_json)
-        if not data:
+        if report.kpis_json is None:
+            report = await materialize_report_aggregates(db, report)
+        if report.kpis_json is None:
             return templates.TemplateResponse("error.html", {"request": request, "message": "Dit rapport bevat geen data."}, status_code=404)
 
-        df = pd.DataFrame(data)
-        df['date'] = pd.to_datetime(df['date'])
-
         client_id = report.client_a_property_id
-        benchmark_ids = json.loads(report.benchmark_property_ids_json)
-        num_benchmark_properties = len(benchmark_ids) if benchmark_ids else 1
-
-        client_df = df[df['group'] == client_id].copy()
-        benchmark_df = df[df['group'] == 'Benchmark'].copy()
-
-        metrics = json.loads(report.metrics_used)
-
-        kpis = {}
-        for metric in metrics:
-            client_total = client_df[metric].sum()
-            bench_total_sum = benchmark_df[metric].sum()
-            bench_average = bench_total_sum / num_benchmark_properties
-
-            diff = ((client_total - bench_average) / bench_average * 100) if bench_average > 0 else 0
-
-            kpis[metric] = {
-                "client_value": client_total,
-                "bench_value": bench_average,
-                "diff_percentage": round(diff, 1)
-            }
-
-        trend_data = {}
-        if 'date' in df.columns:
-            client_df_resample = client_df.set_index('date')
-            benchmark_df_resample = benchmark_df.set_index('date')
-
-            for metric in metrics:
-                trend_data[metric] = {}
-                for period, period_name in [('D', 'day'), ('W', 'week'), ('M', 'month')]:
-                    client_resampled = client_df_resample[metric].resample(period).sum().reset_index()
-                    benchmark_resampled_sum = benchmark_df_resample[metric].resample(period).sum().reset_index()
-
-                    benchmark_resampled_avg = benchmark_resampled_sum.copy()
-                    benchmark_resampled_avg[metric] = benchmark_resampled_avg[metric] / num_benchmark_properties
-
-                    trend_data[metric][period_name] = {
-                        "labels": client_resampled['date'].dt.strftime('%Y-%m-%d').tolist(),
-                        "client_data": client_resampled[metric].tolist(),
-                        "benchmark_data": benchmark_resampled_avg[metric].tolist()
-                    }
-
-        dimension_data = {}
-        dimensions_in_report = [d for d in json.loads(report.dimensions_used) if d != 'date']
-        for dim in dimensions_in_report:
-            if dim in df.columns:
-                for metric in metrics:
-                    client_dim = client_df.groupby(dim)[metric].sum().reset_index()
-                    bench_dim_sum = benchmark_df.groupby(dim)[metric].sum().reset_index()
-
-                    merged_df = pd.merge(client_dim, bench_dim_sum, on=dim, how='outer', suffixes=('_client', '_bench_sum')).fillna(0)
-
-                    merged_df[metric + '_bench_avg'] = merged_df[metric + '_bench_sum'] / num_benchmark_properties
-
-                    chart_key = f"{dim}_{metric}"
-                    dimension_data[chart_key] = {
-                        "metric_title": settings.AVAILABLE_METRICS.get(metric, metric),
-                        "dimension_title": settings.AVAILABLE_DIMENSIONS.get(dim, dim),
-                        "labels": merged_df[dim].tolist(),
-                        "client_data": merged_df[metric + '_client'].tolist(),
-                        "benchmark_data": merged_df[metric + '_bench_avg'].tolist()
-                    }
-
-        start_date = df['date'].min().strftime('%d %b %Y')
-        end_date = df['date'].max().strftime('%d %b %Y')
+        kpis = json_codec.loads(report.kpis_json)
+        start_date = report.period_start.strftime('%d %b %Y')
+        end_date = report.period_end.strftime('%d %b %Y')
 
-        ga_properties, _ = await _get_ga_properties(get_google_credentials_from_session(request))
-        client_name = next((prop['name'] for prop in ga_properties if prop['id'] == client_id), client_id)
+        client_name = await _get_ga_property_name(get_google_credentials_from_session(request), user_email, client_id)
 
         context = {
             "request": request,
@@ -110,11 +51,12 @@ async def interactive_report_page(request: Request, report_uuid: str, db: Sessio
             "period": f"{start_date} - {end_date}",
             "kpis": kpis,
             "available_metrics_map": settings.AVAILABLE_METRICS,
-            "trend_data_json": json.dumps(trend_data),
-            "dimension_data_json": json.dumps(dimension_data),
-            "json_loads": json.loads
+            "trend_data_json": report.trend_data_json,
+            "dimension_data_json": report.dimension_data_json,
+            "json_loads": json_codec.loads
         }
-        return templates.TemplateResponse("interactive_report.html", context)
+        with RENDER_SECONDS.time(template="interactive_report.html"):
+            return templates.TemplateResponse("interactive_report.html", context, headers=cache_headers(etag, report))
 
     except Exception as e:
         print(f"Error generating interactive report: {e}")
@@ -1,21 +1,95 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
 
-from google.analytics.admin_v1beta import AnalyticsAdminServiceClient
 from google.analytics.admin_v1beta.types import ListAccountSummariesRequest
 
-async def _get_ga_properties(credentials):
+from ..config import settings
+from ..ga_clients import ga_admin_client_pool
+
+# Per gebruiker: (tijdstip van ophalen, gesorteerde properties, property id -> naam).
+_ga_properties_cache: Dict[str, Tuple[float, List[Dict[str, str]], Dict[str, str]]] = {}
+_ga_properties_refresh_tasks: Dict[str, asyncio.Task] = {}
+_ga_property_name_cache: Dict[Tuple[str, str], str] = {}
+
+def _list_ga_properties(credentials) -> List[Dict[str, str]]:
     ga_properties = []
+    admin_client = ga_admin_client_pool.get(credentials)
+    summaries = admin_client.list_account_summaries(request=ListAccountSummariesRequest(page_size=200))
+    for acc_sum in summaries:
+        for prop_sum in getattr(acc_sum, 'property_summaries', []):
+            if "properties/" in prop_sum.property:
+                ga_properties.append({
+                    "id": prop_sum.property,
+                    "name": f"{prop_sum.display_name or 'N/A'} (Account: {acc_sum.display_name or 'N/A'})"
+                })
+    return sorted(ga_properties, key=lambda p: p['name'].lower())
+
+async def _fetch_and_cache_ga_properties(credentials, user_email: Optional[str]) -> List[Dict[str, str]]:
+    ga_properties = await asyncio.to_thread(_list_ga_properties, credentials)
+    if user_email:
+        _ga_properties_cache[user_email] = (time.monotonic(), ga_properties, {p["id"]: p["name"] for p in ga_properties})
+    return ga_properties
+
+def _schedule_background_refresh(credentials, user_email: str) -> None:
+    running = _ga_properties_refresh_tasks.get(user_email)
+    if running and not running.done():
+        return
+
+    async def refresh():
+        try:
+            await _fetch_and_cache_ga_properties(credentials, user_email)
+        except Exception as e:
+            print(f"Error refreshing account summaries in background: {e}")
+        finally:
+            _ga_properties_refresh_tasks.pop(user_email, None)
+
+    _ga_properties_refresh_tasks[user_email] = asyncio.create_task(refresh())
+
+async def _get_ga_properties(credentials, user_email: Optional[str] = None):
+    if user_email and user_email in _ga_properties_cache:
+        fetched_at, cached_properties, _ = _ga_properties_cache[user_email]
+        age = time.monotonic() - fetched_at
+        if age < settings.GA_PROPERTIES_CACHE_TTL_SECONDS:
+            return cached_properties, None
+        if age < settings.GA_PROPERTIES_CACHE_MAX_STALE_SECONDS:
+            _schedule_background_refresh(credentials, user_email)
+            return cached_properties, None
+
     error_message = None
+    ga_properties = []
     try:
-        admin_client = AnalyticsAdminServiceClient(credentials=credentials)
-        summaries = admin_client.list_account_summaries(request=ListAccountSummariesRequest(page_size=200))
-        for acc_sum in summaries:
-            for prop_sum in getattr(acc_sum, 'property_summaries', []):
-                if "properties/" in prop_sum.property:
-                    ga_properties.append({
-                        "id": prop_sum.property,
-                        "name": f"{prop_sum.display_name or 'N/A'} (Account: {acc_sum.display_name or 'N/A'})"
-                    })
+        ga_properties = await _fetch_and_cache_ga_properties(credentials, user_email)
     except Exception as e:
         print(f"Error fetching account summaries: {e}")
         error_message = f"Fout bij ophalen GA properties: {e}"
-    return sorted(ga_properties, key=lambda p: p['name'].lower()), error_message
+    return ga_properties, error_message
+
+def _get_property_display_name(credentials, property_id: str) -> str:
+    admin_client = ga_admin_client_pool.get(credentials)
+    return admin_client.get_property(name=property_id).display_name or property_id
+
+async def _get_ga_property_name(credentials, user_email: Optional[str], property_id: str) -> str:
+    """Geeft de weergavenaam van één property, zonder alle accounts op te sommen
+    als de lijst van de gebruiker nog niet in de cache staat."""
+    if user_email and user_email in _ga_properties_cache:
+        name = _ga_properties_cache[user_email][2].get(property_id)
+        if name:
+            return name.split(' (Account:')[0]
+    if (user_email, property_id) in _ga_property_name_cache:
+        return _ga_property_name_cache[(user_email, property_id)]
+    try:
+        name = await asyncio.to_thread(_get_property_display_name, credentials, property_id)
+    except Exception as e:
+        print(f"Error fetching property {property_id}: {e}")
+        return property_id
+    if user_email:
+        _ga_property_name_cache[(user_email, property_id)] = name
+    return name
+
+def invalidate_ga_properties_cache(user_email: Optional[str]) -> None:
+    if not user_email:
+        return
+    _ga_properties_cache.pop(user_email, None)
+    for key in [key for key in _ga_property_name_cache if key[0] == user_email]:
+        del _ga_property_name_cache[key]
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Een lopende fetch krijgt `publish` mee en meldt daarmee tussenresultaten (pagina's).
+Publish = Callable[[Any], None]
+
+
+class _Flight:
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.items: List[Any] = []
+        self.subscribers: List[Callable[[Any], None]] = []
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Voegt gelijktijdige, identieke aanroepen samen tot één lopende taak.
+
+    De eerste aanroeper start de taak; wie met dezelfde sleutel binnenkomt terwijl
+    die loopt, wacht op hetzelfde resultaat (of dezelfde exceptie). Tussenresultaten
+    gaan naar alle aanroepers; wie later aansluit krijgt eerst wat al binnen was.
+    Annuleert een aanroeper (bijv. door een time-out), dan stopt alleen zijn eigen
+    wachten; de taak zelf wordt pas geannuleerd als niemand er meer op wacht."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.started = 0
+        self.joined = 0
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def _start(self, key: Hashable, start: Callable[[Publish], Awaitable[T]]) -> _Flight:
+        flight = _Flight()
+
+        def publish(item: Any) -> None:
+            flight.items.append(item)
+            for subscriber in list(flight.subscribers):
+                try:
+                    subscriber(item)
+                except Exception as e:
+                    # Eén kapotte aanroeper mag de gedeelde taak niet breken.
+                    print(f"WAARSCHUWING (single_flight.py): Callback in {self.name} faalde: {e}")
+
+        def forget(_task: asyncio.Task) -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+        flight.task = asyncio.get_running_loop().create_task(start(publish))
+        flight.task.add_done_callback(forget)
+        self._flights[key] = flight
+        self.started += 1
+        return flight
+
+    async def run(
+        self,
+        key: Hashable,
+        start: Callable[[Publish], Awaitable[T]],
+        on_item: Optional[Callable[[Any], None]] = None
+    ) -> T:
+        flight = self._flights.get(key)
+        # Een taak hoort bij één event loop; uit een andere loop (bijv. de CLI) niet delen.
+        if flight is None or flight.task.done() or flight.task.get_loop() is not asyncio.get_running_loop():
+            flight = self._start(key, start)
+        else:
+            self.joined += 1
+
+        if on_item:
+            for item in list(flight.items):
+                on_item(item)
+            flight.subscribers.append(on_item)
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+            if on_item:
+                flight.subscribers.remove(on_item)
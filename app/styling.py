@@ -1,29 +1,102 @@
-import sass
+import hashlib
+import json
 import os
+import re
+from functools import lru_cache
+
+import sass
+from starlette.staticfiles import StaticFiles
+
+SCSS_DIR = "app/static/scss"
+CSS_DIR = "app/static/css"
+MANIFEST_FILE = os.path.join(CSS_DIR, "manifest.json")
+HASHED_ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+_HASHED_NAME = re.compile(r"^[^.]+\.[0-9a-f]{12}\.[a-z]+$")
+
+
+def scss_source_hash() -> str:
+    """Hash over alle SCSS bronbestanden (naam + inhoud)."""
+    digest = hashlib.sha256()
+    for root, _, files in sorted(os.walk(SCSS_DIR)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, SCSS_DIR).encode("utf-8"))
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _read_manifest() -> dict:
+    try:
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
 
-def compile_scss():
-    scss_dir = "app/static/scss"
-    css_dir = "app/static/css"
-    main_scss_file = os.path.join(scss_dir, "main.scss")
-    output_css_file = os.path.join(css_dir, "main.css")
+def _write_atomic(path: str, content: str) -> None:
+    # Meerdere workers kunnen tegelijk compileren; nooit een half bestand serveren.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def compile_scss(force: bool = False):
+    """Compileert main.scss alleen als de bronbestanden gewijzigd zijn. Schrijft
+    main.css én main.<hash>.css en legt de gehashte naam vast in manifest.json."""
+    main_scss_file = os.path.join(SCSS_DIR, "main.scss")
+    output_css_file = os.path.join(CSS_DIR, "main.css")
 
     if not os.path.exists(main_scss_file):
         print(f"Waarschuwing: {main_scss_file} niet gevonden. CSS wordt niet gecompileerd.")
         return
 
+    source_hash = scss_source_hash()
+    manifest = _read_manifest()
+    hashed_file = manifest.get("css/main.css")
+    if not force and manifest.get("source_hash") == source_hash and hashed_file and os.path.exists(os.path.join("app/static", hashed_file)):
+        print("SCSS ongewijzigd, compilatie overgeslagen.")
+        return
+
     print(f"Compileren van {main_scss_file} naar {output_css_file}...")
     try:
-        os.makedirs(css_dir, exist_ok=True)
+        os.makedirs(CSS_DIR, exist_ok=True)
 
         css_content = sass.compile(
             filename=main_scss_file,
             output_style='compressed'
         )
-        with open(output_css_file, "w") as f:
-            f.write(css_content)
-        print("SCSS compilatie succesvol.")
+        content_hash = hashlib.sha256(css_content.encode("utf-8")).hexdigest()[:12]
+        hashed_name = f"main.{content_hash}.css"
+        _write_atomic(output_css_file, css_content)
+        _write_atomic(os.path.join(CSS_DIR, hashed_name), css_content)
+        for old_file in os.listdir(CSS_DIR):
+            if _HASHED_NAME.match(old_file) and old_file.startswith("main.") and old_file != hashed_name:
+                os.remove(os.path.join(CSS_DIR, old_file))
+        _write_atomic(MANIFEST_FILE, json.dumps({"source_hash": source_hash, "css/main.css": f"css/{hashed_name}"}, indent=2))
+        asset_path.cache_clear()
+        print(f"SCSS compilatie succesvol ({hashed_name}).")
     except Exception as e:
         print(f"FOUT bij compileren van SCSS: {e}")
 
+
+@lru_cache(maxsize=None)
+def asset_path(path: str) -> str:
+    """Gehashte bestandsnaam voor een statisch bestand, of de gewone naam als er
+    (nog) geen manifest is. Voor in templates: `url_for('static', path=asset_path(...))`."""
+    return "/" + _read_manifest().get(path.lstrip("/"), path.lstrip("/"))
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles die gehashte bestanden (main.<hash>.css) een jaar laat cachen."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if _HASHED_NAME.match(os.path.basename(str(full_path))):
+            response.headers["Cache-Control"] = HASHED_ASSET_CACHE_CONTROL
+        return response
+
+
 if __name__ == "__main__":
-    compile_scss()
\ No newline at end of file
+    compile_scss()
@@ -0,0 +1,2 @@
+"""Offline micro-benchmarks voor de hot paths (GA decoding, aggregatie, opslag en
+rapportopbouw). Draai `python -m benchmarks.run --help`."""
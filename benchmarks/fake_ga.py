@@ -0,0 +1,121 @@
+"""Nep GA Data API client voor de benchmarks: geeft synthetische, deterministische
+`RunReportResponse`s terug, zonder netwerk of credentials."""
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+from google.analytics.data_v1beta.types import (
+    DimensionHeader, DimensionValue, MetricHeader, MetricValue, Row, RunReportRequest, RunReportResponse
+)
+
+
+@dataclass(frozen=True)
+class Scale:
+    """Omvang van een benchmark run: rijen per property = dagen x cardinaliteit^dimensies."""
+    properties: int = 10
+    days: int = 28
+    dimensions: int = 1
+    cardinality: int = 10
+    metrics: int = 4
+
+    @property
+    def rows_per_property(self) -> int:
+        return self.days * self.cardinality ** self.dimensions
+
+
+SCALES: Dict[str, Scale] = {
+    "small": Scale(properties=5, days=28, dimensions=1, cardinality=5, metrics=3),
+    "medium": Scale(properties=10, days=90, dimensions=1, cardinality=20, metrics=5),
+    "large": Scale(properties=25, days=365, dimensions=1, cardinality=30, metrics=8),
+}
+
+BENCHMARK_METRICS = [
+    "sessions", "engagedSessions", "screenPageViews", "totalUsers", "newUsers",
+    "transactions", "eventCount", "engagementRate", "bounceRate", "averageSessionDuration",
+]
+BENCHMARK_DIMENSIONS = ["deviceCategory", "country", "sessionDefaultChannelGroup"]
+
+
+def property_ids(scale: Scale) -> List[str]:
+    return [f"properties/{100000 + i}" for i in range(scale.properties)]
+
+
+def metric_names(scale: Scale) -> List[str]:
+    return BENCHMARK_METRICS[:scale.metrics]
+
+
+def dimension_names(scale: Scale) -> List[str]:
+    return BENCHMARK_DIMENSIONS[:scale.dimensions]
+
+
+def date_range(scale: Scale, end: date = date(2024, 12, 31)) -> Tuple[str, str]:
+    return (end - timedelta(days=scale.days - 1)).isoformat(), end.isoformat()
+
+
+class FakeDataClient:
+    """Beantwoordt `run_report` met rijen voor elke combinatie van dag en
+    dimensiewaarden. Metricwaarden hangen alleen af van property, rij en metric, dus
+    elke run (en elke pagina-indeling) geeft dezelfde data. Antwoorden worden per
+    request bewaard: de eerste (opwarm)run betaalt het opbouwen van de protobufs."""
+
+    def __init__(self, cardinality: int, latency_seconds: float = 0.0):
+        self.cardinality = cardinality
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+        self._responses: Dict[Tuple, RunReportResponse] = {}
+
+    def _rows(self, request: RunReportRequest) -> List[Row]:
+        dims = [d.name for d in request.dimensions]
+        mets = [m.name for m in request.metrics]
+        start = date.fromisoformat(request.date_ranges[0].start_date)
+        end = date.fromisoformat(request.date_ranges[0].end_date)
+        other_dims = [d for d in dims if d != "date"]
+        combos = int(self.cardinality ** len(other_dims))
+        num_rows = ((end - start).days + 1) * combos
+
+        rng = np.random.default_rng(zlib.crc32(request.property.encode("utf-8")))
+        values = rng.gamma(2.0, 50.0, size=(num_rows, len(mets))).round()
+        for i, name in enumerate(mets):
+            if name.endswith("Rate"):
+                values[:, i] = rng.uniform(0.2, 0.8, size=num_rows)
+
+        rows = []
+        for index in range(num_rows):
+            day = start + timedelta(days=index // combos)
+            combo = index % combos
+            dim_values = []
+            for name in dims:
+                if name == "date":
+                    dim_values.append(DimensionValue(value=day.strftime("%Y%m%d")))
+                else:
+                    dim_values.append(DimensionValue(value=f"{name}-{combo % self.cardinality}"))
+                    combo //= self.cardinality
+            rows.append(Row(
+                dimension_values=dim_values,
+                metric_values=[MetricValue(value=repr(float(v))) for v in values[index]]
+            ))
+        return rows
+
+    def run_report(self, request: RunReportRequest) -> RunReportResponse:
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        key = (
+            request.property, tuple(d.name for d in request.dimensions), tuple(m.name for m in request.metrics),
+            request.date_ranges[0].start_date, request.date_ranges[0].end_date, request.offset, request.limit
+        )
+        response = self._responses.get(key)
+        if response is None:
+            all_rows = self._rows(request)
+            limit = request.limit or len(all_rows)
+            response = RunReportResponse(
+                dimension_headers=[DimensionHeader(name=d.name) for d in request.dimensions],
+                metric_headers=[MetricHeader(name=m.name) for m in request.metrics],
+                rows=all_rows[request.offset:request.offset + limit],
+                row_count=len(all_rows)
+            )
+            self._responses[key] = response
+        return response
@@ -0,0 +1,267 @@
+"""Draait de benchmark scenario's tegen de nep GA client en vergelijkt met een baseline.
+
+    python -m benchmarks.run                    # scale "medium", vergelijk met baseline
+    python -m benchmarks.run --scale large --repeat 3
+    python -m benchmarks.run --save-baseline    # huidige meting als nieuwe baseline
+
+Per scenario: mediaan en minimum van `--repeat` runs (na één opwarmrun) en de
+tracemalloc piek van één extra run. Een scenario dat meer dan `--tolerance` trager of
+groter is dan de baseline (bij dezelfde scale) laat het script met exit code 1 stoppen.
+Geheugen van pyarrow buffers valt buiten tracemalloc en telt dus niet mee.
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+# Instellingen moeten vóór het importeren van de app vastliggen (settings en engine
+# worden bij import gelezen): geen GA cache, geen tempo-limiet, eigen database.
+_BENCH_DIR = tempfile.mkdtemp(prefix="apigen-bench-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_BENCH_DIR}/bench.db",
+    "GA_CACHE_ENABLED": "false",
+    "GA_REQUESTS_PER_SECOND": "0",
+    "GA_FETCH_PLAN_WINDOW_SECONDS": "0",
+})
+
+from google.oauth2.credentials import Credentials  # noqa: E402
+
+from app import json_codec  # noqa: E402
+from app.analytics import (  # noqa: E402
+    _decode_report_response,
+    _ga_report_request,
+    _page_keys_and_values,
+    generate_benchmark_data_from_google,
+)
+from app.config import settings  # noqa: E402
+from app.crud import _build_benchmark_report, create_benchmark_report  # noqa: E402
+from app.database import AsyncSessionLocal, create_db_and_tables  # noqa: E402
+from app.ga_clients import ga_data_client_pool  # noqa: E402
+from app.metric_cube import benchmark_key_means, build_metric_cube, metrics_with_weights, rollup, statistics_by_metric  # noqa: E402
+from app.report_aggregates import build_report_aggregates  # noqa: E402
+from app.report_storage import decode_report_dataframe, encode_report_rows  # noqa: E402
+from google.analytics.data_v1beta.types import Dimension, Metric  # noqa: E402
+
+from .fake_ga import SCALES, FakeDataClient, Scale, date_range, dimension_names, metric_names, property_ids  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+BENCH_USER = "benchmark@example.com"
+
+
+class BenchContext:
+    """Alles wat de scenario's delen; de opwarmrun van `generate` vult rows en cube."""
+
+    def __init__(self, scale: Scale, latency_seconds: float):
+        self.scale = scale
+        self.client = FakeDataClient(scale.cardinality, latency_seconds)
+        self.credentials = Credentials(token="bench", refresh_token="bench", client_id="bench")
+        ga_data_client_pool.factory = lambda credentials: self.client
+        ga_data_client_pool.discard(self.credentials)
+
+        self.property_ids = property_ids(scale)
+        self.metrics = metric_names(scale)
+        self.dimensions = dimension_names(scale)
+        self.start_date, self.end_date = date_range(scale)
+        self.cube_metrics = metrics_with_weights(self.metrics, 10)
+        self.query_dimensions = ["date"] + self.dimensions
+
+        self.responses = [
+            self.client.run_report(_ga_report_request(
+                prop_id, [Dimension(name=d) for d in self.query_dimensions],
+                [Metric(name=m) for m in self.cube_metrics], self.start_date, self.end_date,
+                0, settings.GA_PAGE_SIZE
+            ))
+            for prop_id in self.property_ids
+        ]
+        pages = [_decode_report_response(response) for response in self.responses]
+        self.blocks = {
+            prop_id: [_page_keys_and_values(page, self.dimensions, self.cube_metrics)]
+            for prop_id, page in zip(self.property_ids, pages)
+        }
+        self.rows: List[Dict[str, Any]] = []
+        self.cube = None
+        self.report_arrow: bytes = b""
+
+
+def bench_decode_pages(ctx: BenchContext) -> None:
+    for response in ctx.responses:
+        _decode_report_response(response)
+
+
+def bench_generate(ctx: BenchContext) -> None:
+    cubes = []
+    ctx.rows = asyncio.run(generate_benchmark_data_from_google(
+        ctx.credentials, ctx.property_ids[0], ctx.property_ids[1:], ctx.metrics, ctx.dimensions,
+        ctx.start_date, ctx.end_date, on_metric_cube=cubes.append
+    ))
+    ctx.cube = cubes[0] if cubes else None
+
+
+def bench_aggregate_cube(ctx: BenchContext) -> None:
+    cube = build_metric_cube(ctx.blocks, ctx.query_dimensions, ctx.cube_metrics)
+    benchmark_key_means(cube, ctx.property_ids[1:])
+    statistics_by_metric(rollup(cube, ["date"]), ctx.property_ids[1:], ctx.metrics)
+
+
+def bench_encode_rows_json(ctx: BenchContext) -> None:
+    json_codec.dumps(ctx.rows)
+
+
+def bench_encode_rows_arrow(ctx: BenchContext) -> None:
+    ctx.report_arrow = encode_report_rows(ctx.rows)
+
+
+def bench_build_report(ctx: BenchContext) -> None:
+    _build_benchmark_report(
+        "Benchmark", ctx.property_ids[0], ctx.property_ids[1:], ctx.metrics, ctx.dimensions,
+        ctx.rows, BENCH_USER, metric_cube=ctx.cube
+    )
+
+
+def bench_persist_report(ctx: BenchContext) -> None:
+    async def persist():
+        async with AsyncSessionLocal() as db:
+            await create_benchmark_report(
+                db, "Benchmark", ctx.property_ids[0], ctx.property_ids[1:], ctx.metrics, ctx.dimensions,
+                ctx.rows, BENCH_USER, metric_cube=ctx.cube
+            )
+    asyncio.run(persist())
+
+
+def bench_report_aggregates(ctx: BenchContext) -> None:
+    df = decode_report_dataframe(ctx.report_arrow)
+    build_report_aggregates(df, ctx.property_ids[0], ctx.property_ids[1:], ctx.metrics, ctx.dimensions, metric_cube=ctx.cube)
+
+
+# Volgorde telt: latere scenario's gebruiken de uitkomst van eerdere.
+SCENARIOS: Dict[str, Callable[[BenchContext], None]] = {
+    "decode_pages": bench_decode_pages,
+    "generate": bench_generate,
+    "aggregate_cube": bench_aggregate_cube,
+    "encode_rows_json": bench_encode_rows_json,
+    "encode_rows_arrow": bench_encode_rows_arrow,
+    "build_report": bench_build_report,
+    "persist_report": bench_persist_report,
+    "report_aggregates": bench_report_aggregates,
+}
+
+
+def measure(func: Callable[[BenchContext], None], ctx: BenchContext, repeat: int) -> Dict[str, float]:
+    func(ctx)  # opwarmen
+    timings = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        func(ctx)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        func(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"median_seconds": statistics.median(timings), "min_seconds": min(timings), "peak_bytes": peak}
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], tolerance: float, min_delta_seconds: float) -> List[str]:
+    """Regressies t.o.v. de baseline, als leesbare regels."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        slower = result["median_seconds"] - base["median_seconds"]
+        if result["median_seconds"] > base["median_seconds"] * (1 + tolerance) and slower > min_delta_seconds:
+            regressions.append(
+                f"{name}: {result['median_seconds'] * 1000:.1f} ms, baseline {base['median_seconds'] * 1000:.1f} ms"
+            )
+        if result["peak_bytes"] > base["peak_bytes"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: piek {result['peak_bytes'] / 2**20:.1f} MiB, baseline {base['peak_bytes'] / 2**20:.1f} MiB"
+            )
+    return regressions
+
+
+def _format_row(name: str, result: Dict[str, float], base: Optional[Dict[str, float]]) -> str:
+    change = ""
+    if base:
+        change = f"{(result['median_seconds'] / base['median_seconds'] - 1) * 100:+7.1f}%"
+    return (f"{name:<20} {result['median_seconds'] * 1000:>10.1f} {result['min_seconds'] * 1000:>10.1f} "
+            f"{result['peak_bytes'] / 2**20:>10.1f}  {change}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="medium")
+    for field in dataclasses.fields(Scale):
+        parser.add_argument(f"--{field.name}", type=int, help=f"overschrijft {field.name} van de scale")
+    parser.add_argument("--latency", type=float, default=0.0, help="gesimuleerde GA latency per request (s)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=list(SCENARIOS), help="alleen deze scenario's (plus hun voorgangers)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="toegestane verslechtering (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="kleinere vertragingen tellen niet als regressie")
+    args = parser.parse_args(argv)
+
+    overrides = {f.name: getattr(args, f.name) for f in dataclasses.fields(Scale) if getattr(args, f.name) is not None}
+    scale = dataclasses.replace(SCALES[args.scale], **overrides)
+    print(f"Scale: {dataclasses.asdict(scale)} ({scale.rows_per_property * scale.properties} GA rijen)")
+
+    create_db_and_tables()
+    ctx = BenchContext(scale, args.latency)
+
+    selected = list(SCENARIOS)
+    if args.only:
+        last = max(selected.index(name) for name in args.only)
+        selected = selected[:last + 1]
+
+    baseline: Dict[str, Any] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    same_scale = baseline.get("scale") == dataclasses.asdict(scale) and baseline.get("latency", 0.0) == args.latency
+    if baseline and not same_scale and not args.save_baseline:
+        print("Baseline is met een andere scale gemeten; alleen meten, niet vergelijken.")
+
+    print(f"{'scenario':<20} {'median ms':>10} {'min ms':>10} {'piek MiB':>10}  t.o.v. baseline")
+    results: Dict[str, Dict[str, float]] = {}
+    for name in selected:
+        results[name] = measure(SCENARIOS[name], ctx, args.repeat)
+        if not args.only or name in args.only:
+            print(_format_row(name, results[name], baseline.get("results", {}).get(name) if same_scale else None))
+    if args.only:
+        results = {name: results[name] for name in args.only}
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "scale": dataclasses.asdict(scale),
+                "latency": args.latency,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Baseline opgeslagen in {args.baseline}.")
+        return 0
+
+    if same_scale:
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms / 1000)
+        if regressions:
+            print("\n❌ REGRESSIES t.o.v. baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\n✅ Geen regressies t.o.v. baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
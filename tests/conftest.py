@@ -0,0 +1,61 @@
+import os
+import tempfile
+import zlib
+from datetime import date, timedelta
+
+import pytest
+from google.analytics.data_v1beta.types import (
+    DimensionHeader, DimensionValue, MetricHeader, MetricValue, Row, RunReportResponse
+)
+
+# Settings en engine worden bij import gelezen: eigen database en geen GA cache.
+_TEST_DIR = tempfile.mkdtemp(prefix="apigen-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_TEST_DIR}/tests.db",
+    "GA_CACHE_ENABLED": "false",
+    "GA_REQUESTS_PER_SECOND": "0",
+    "GA_FETCH_PLAN_WINDOW_SECONDS": "0",
+})
+
+
+class FakeDataClient:
+    """Nep GA Data API client. Metricwaarden hangen alleen af van property, dag,
+    dimensiewaarde en metric, dus elke query-indeling geeft dezelfde data."""
+
+    def __init__(self, fail_metrics=()):
+        self.fail_metrics = set(fail_metrics)
+        self.requests = []
+
+    def run_report(self, request):
+        self.requests.append(request)
+        dims = [d.name for d in request.dimensions]
+        mets = [m.name for m in request.metrics]
+        if self.fail_metrics & set(mets):
+            raise RuntimeError("metric niet beschikbaar")
+        start = date.fromisoformat(request.date_ranges[0].start_date)
+        end = date.fromisoformat(request.date_ranges[0].end_date)
+        rows = []
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            for value in ("NL", "BE"):
+                rows.append(Row(
+                    dimension_values=[DimensionValue(value=day.strftime("%Y%m%d") if d == "date" else value) for d in dims],
+                    metric_values=[
+                        MetricValue(value=str(zlib.crc32(f"{request.property}{day}{value}{m}".encode()) % 100))
+                        for m in mets
+                    ]
+                ))
+        page = rows[request.offset:request.offset + request.limit]
+        return RunReportResponse(
+            dimension_headers=[DimensionHeader(name=d) for d in dims],
+            metric_headers=[MetricHeader(name=m) for m in mets],
+            rows=page, row_count=len(rows)
+        )
+
+
+@pytest.fixture
+def fake_ga(monkeypatch):
+    from app.ga_clients import ga_data_client_pool
+    client = FakeDataClient()
+    monkeypatch.setattr(ga_data_client_pool, "get", lambda credentials: client)
+    return client
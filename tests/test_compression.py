@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from app.compression import CompressionMiddleware
+from app.database import BenchmarkReportDB
+from app.http_cache import cache_headers, is_not_modified, report_etag
+
+REPORT = BenchmarkReportDB(report_uuid="r-1", updated_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+ETAG = report_etag(REPORT, "json")
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+
+@app.get("/report")
+async def report(request: Request):
+    headers = cache_headers(ETAG, REPORT)
+    if is_not_modified(request, ETAG, REPORT):
+        return Response(status_code=304, headers=headers)
+    return Response(b'{"rows": [' + b"1, " * 500 + b"1]}", media_type="application/json", headers=headers)
+
+
+@app.get("/small")
+async def small():
+    return Response(b"{}", media_type="application/json")
+
+
+client = TestClient(app)
+
+
+def test_compressed_response_has_encoded_etag_and_vary():
+    response = client.get("/report", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == ETAG[:-1] + '-gzip"'
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_if_none_match_with_encoded_etag_returns_304_with_that_etag():
+    encoded_etag = ETAG[:-1] + '-gzip"'
+    response = client.get("/report", headers={"Accept-Encoding": "gzip", "If-None-Match": encoded_etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == encoded_etag
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_if_none_match_with_identity_etag_returns_304_with_that_etag():
+    response = client.get("/report", headers={"Accept-Encoding": "identity", "If-None-Match": ETAG})
+    assert response.status_code == 304
+    assert response.headers["etag"] == ETAG
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_uncompressed_responses_still_vary_on_accept_encoding():
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+
+    identity = client.get("/report", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] == ETAG
+    assert identity.headers["vary"] == "Accept-Encoding"
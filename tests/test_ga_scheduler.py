@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+from google.analytics.data_v1beta.types import RunReportRequest, RunReportResponse
+
+from app.config import settings
+from app.ga_scheduler import GAQuotaError, GARequestScheduler
+
+
+class ScriptedClient:
+    """Geeft per aanroep de volgende uitkomst: een exception wordt gegooid."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def run_report(self, request):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(settings, "GA_RETRY_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "GA_RETRY_BASE_DELAY_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "GA_CIRCUIT_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "GA_CIRCUIT_RESET_SECONDS", 60.0)
+    return GARequestScheduler()
+
+
+def run(scheduler, client):
+    with ThreadPoolExecutor(1) as executor:
+        return asyncio.run(scheduler.run_report(client, RunReportRequest(property="properties/1"), executor))
+
+
+def unavailable():
+    return google_exceptions.ServiceUnavailable("even weg")
+
+
+def test_retries_count_as_one_failure_per_request(scheduler):
+    client = ScriptedClient(unavailable(), unavailable(), RunReportResponse())
+    run(scheduler, client)
+    assert client.calls == 3
+
+    client = ScriptedClient(*[unavailable() for _ in range(3)])
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        run(scheduler, client)
+    # Drie mislukte pogingen, maar één mislukt request: de breaker (drempel 2) blijft dicht.
+    assert scheduler._breaker("properties/1").allow()
+
+
+def test_breaker_opens_after_threshold_exhausted_requests(scheduler):
+    for _ in range(2):
+        with pytest.raises(google_exceptions.ServiceUnavailable):
+            run(scheduler, ScriptedClient(*[unavailable() for _ in range(3)]))
+    with pytest.raises(GAQuotaError):
+        run(scheduler, ScriptedClient(RunReportResponse()))
+
+
+def test_half_open_probe_with_non_retryable_error_keeps_breaker_open(scheduler):
+    breaker = scheduler._breaker("properties/1")
+    for _ in range(2):
+        with pytest.raises(google_exceptions.ServiceUnavailable):
+            run(scheduler, ScriptedClient(*[unavailable() for _ in range(3)]))
+
+    breaker.reset_seconds = 0.0
+    with pytest.raises(google_exceptions.PermissionDenied):
+        run(scheduler, ScriptedClient(google_exceptions.PermissionDenied("geen toegang")))
+
+    # Niet gesloten (de fouten tellen nog) maar de proef is wel vrijgegeven.
+    assert breaker._opened_at is not None
+    assert breaker._failures == 2
+    assert not breaker._probe_in_flight
+
+    # Een volgende proef mag weer door en sluit de breaker pas bij succes.
+    run(scheduler, ScriptedClient(RunReportResponse()))
+    assert breaker._opened_at is None and breaker._failures == 0
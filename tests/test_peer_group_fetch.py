@@ -0,0 +1,57 @@
+import asyncio
+
+from google.oauth2.credentials import Credentials
+
+from app.analytics import PeerGroupFetch, generate_benchmark_data_from_google
+
+CREDENTIALS = Credentials(token="t", refresh_token="r", client_id="c")
+CLIENT = "properties/1"
+PEERS = ["properties/2", "properties/3"]
+
+
+def generate(metrics, start, end, property_fetch=None):
+    return generate_benchmark_data_from_google(
+        CREDENTIALS, CLIENT, PEERS, metrics, ["country"], start, end, property_fetch=property_fetch
+    )
+
+
+def test_one_query_per_property_for_the_group(fake_ga):
+    metric_sets = [["sessions"], ["sessions", "transactions"]]
+    ranges = [("2024-01-01", "2024-01-05"), ("2024-01-03", "2024-01-07")]
+
+    async def run():
+        solo = [await generate(m, *r) for m, r in zip(metric_sets, ranges)]
+        fake_ga.requests.clear()
+        group = PeerGroupFetch(CREDENTIALS, ["date", "country"], metric_sets, "2024-01-01", "2024-01-07")
+        try:
+            grouped = await asyncio.gather(*[generate(m, *r, property_fetch=group) for m, r in zip(metric_sets, ranges)])
+        finally:
+            group.close()
+        return solo, grouped
+
+    solo, grouped = asyncio.run(run())
+    assert grouped == solo
+    assert len(fake_ga.requests) == 1 + len(PEERS)
+    assert {tuple(m.name for m in r.metrics) for r in fake_ga.requests} == {("sessions", "transactions")}
+
+
+def test_failed_metric_group_only_fails_its_reports(fake_ga):
+    # Samen meer dan 10 metrics: twee metricgroepen.
+    metrics_a = ["sessions", "totalUsers", "newUsers", "screenPageViews", "eventCount", "transactions"]
+    metrics_b = ["activeUsers", "conversions", "purchaseRevenue", "itemsViewed", "addToCarts", "checkouts"]
+    fake_ga.fail_metrics = {"purchaseRevenue"}
+
+    async def run():
+        group = PeerGroupFetch(CREDENTIALS, ["date", "country"], [metrics_a, metrics_b], "2024-01-01", "2024-01-03")
+        try:
+            return await asyncio.gather(
+                *[generate(m, "2024-01-01", "2024-01-03", property_fetch=group) for m in (metrics_a, metrics_b)],
+                return_exceptions=True
+            )
+        finally:
+            group.close()
+
+    rows_a, error_b = asyncio.run(run())
+    assert rows_a and not isinstance(rows_a, Exception)
+    assert isinstance(error_b, ValueError)
+    assert "Metricgroep" in str(error_b) and "purchaseRevenue" in str(error_b)
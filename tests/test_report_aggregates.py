@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.analytics import _wide_rows
+from app.metric_cube import benchmark_key_means, build_metric_cube
+from app.report_aggregates import build_report_aggregates
+
+CLIENT = "properties/1"
+DAYS = [(datetime(2024, 1, 1),), (datetime(2024, 1, 2),)]
+
+
+def test_additive_bench_value_lies_within_peer_band():
+    # Twee peers met data; twee gevraagde peers leverden niets op.
+    peers_with_data = ["properties/2", "properties/3"]
+    benchmark_ids = peers_with_data + ["properties/4", "properties/5"]
+    cube = build_metric_cube({
+        CLIENT: [(DAYS, np.array([[50.0], [70.0]]))],
+        "properties/2": [(DAYS, np.array([[100.0], [100.0]]))],
+        "properties/3": [(DAYS, np.array([[110.0], [130.0]]))],
+    }, ["date"], ["sessions"])
+    bench_keys, bench_values = benchmark_key_means(cube, peers_with_data)
+    df = pd.DataFrame(
+        _wide_rows(CLIENT, DAYS, np.array([[50.0], [70.0]]), [], ["sessions"])
+        + _wide_rows("Benchmark", bench_keys, bench_values, [], ["sessions"])
+    )
+
+    aggregates = build_report_aggregates(df, CLIENT, benchmark_ids, ["sessions"], [], metric_cube=cube)
+    kpi = aggregates["kpis"]["sessions"]
+
+    band = kpi["bench_distribution"]
+    assert band["p25"] <= kpi["bench_value"] <= band["p75"]
+    assert kpi["bench_value"] == band["mean"] == 220.0
+    assert kpi["client_value"] == 120.0
+    assert kpi["diff_percentage"] == round((120.0 - 220.0) / 220.0 * 100, 1)
+    # KPI en trendgrafiek gebruiken dezelfde benchmark.
+    assert kpi["bench_value"] == sum(aggregates["trend_data"]["sessions"]["day"]["benchmark_data"])
+
+
+def test_bench_value_without_cube_matches_trend_and_dimension_charts():
+    df = pd.DataFrame([
+        {"group": CLIENT, "date": "2024-01-01", "country": "NL", "sessions": 50.0},
+        {"group": CLIENT, "date": "2024-01-02", "country": "BE", "sessions": 70.0},
+        {"group": "Benchmark", "date": "2024-01-01", "country": "NL", "sessions": 105.0},
+        {"group": "Benchmark", "date": "2024-01-02", "country": "BE", "sessions": 115.0},
+    ])
+
+    aggregates = build_report_aggregates(df, CLIENT, ["properties/2", "properties/3"], ["sessions"], ["country"])
+
+    bench_value = aggregates["kpis"]["sessions"]["bench_value"]
+    assert bench_value == 220.0
+    assert bench_value == sum(aggregates["trend_data"]["sessions"]["day"]["benchmark_data"])
+    assert bench_value == sum(aggregates["dimension_data"]["country_sessions"]["benchmark_data"])